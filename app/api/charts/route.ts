@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { loadDashboardSnapshot } from "@/lib/dashboard-snapshot"
 
 export interface ChartData {
   skillsComparison: Array<{ skill: string; avgScore: number }>
@@ -67,6 +68,13 @@ function determinePersona(student: any): string {
 export async function GET() {
   try {
     console.log("[v0] Charts API called")
+
+    // Serve the aggregates precomputed by src/aggregates.py when available
+    const snapshot = await loadDashboardSnapshot()
+    if (snapshot) {
+      return NextResponse.json(snapshot.charts)
+    }
+
     const students = generateStudentData()
     console.log("[v0] Generated", students.length, "students for charts")
 
@@ -1,5 +1,15 @@
+import http from "node:http"
 import { NextResponse } from "next/server"
 
+// Local prediction server (src/predict_server.py), e.g. http://127.0.0.1:8765
+const PREDICTION_SERVICE_URL = process.env.PREDICTION_SERVICE_URL
+const PREDICTION_TIMEOUT_MS = Number(process.env.PREDICTION_TIMEOUT_MS ?? 1000)
+// Optional model version for servers started with --model-dir (e.g. "v2"); unset uses the server default
+const PREDICTION_MODEL_VERSION = process.env.PREDICTION_MODEL_VERSION
+
+// Reused across requests so each prediction rides an already-open connection
+const predictionAgent = new http.Agent({ keepAlive: true, maxSockets: 16 })
+
 export interface PredictionRequest {
   comprehension: number
   attention: number
@@ -11,6 +21,10 @@ export interface PredictionRequest {
 export interface PredictionResponse {
   predicted_assessment_score: number
   confidence: number
+  // Present when the prediction server runs with --intervals
+  prediction_interval?: { lower: number; upper: number; level: number }
+  // Present when the prediction server runs with --explain; baseline + contributions = predicted score
+  explanation?: { baseline: number; contributions: Record<string, number> }
   input_features: PredictionRequest
   model_info: {
     model_type: string
@@ -30,12 +44,17 @@ export async function POST(request: Request) {
       }
     }
 
-    // For now, return a mock prediction since we can't easily run Python in Vercel
-    // In a real implementation, you would either:
-    // 1. Use a Python microservice
-    // 2. Convert the model to JavaScript using libraries like TensorFlow.js
-    // 3. Use a cloud ML service like AWS SageMaker or Google Cloud ML
+    // Use the real model when the local prediction server is configured
+    if (PREDICTION_SERVICE_URL) {
+      try {
+        const prediction = await requestModelPrediction(body)
+        return NextResponse.json(prediction)
+      } catch (error) {
+        console.error("Prediction service unavailable, falling back to mock prediction:", error)
+      }
+    }
 
+    // Without the prediction server (e.g. on Vercel) return a mock prediction
     const mockPrediction = calculateMockPrediction(body)
 
     return NextResponse.json(mockPrediction)
@@ -45,6 +64,49 @@ export async function POST(request: Request) {
   }
 }
 
+// Forward a prediction request to the local prediction server over a pooled keep-alive connection
+function requestModelPrediction(input: PredictionRequest): Promise<PredictionResponse> {
+  return new Promise((resolve, reject) => {
+    const payload = JSON.stringify(input)
+    const req = http.request(
+      new URL(
+        PREDICTION_MODEL_VERSION ? `/predict?version=${encodeURIComponent(PREDICTION_MODEL_VERSION)}` : "/predict",
+        PREDICTION_SERVICE_URL,
+      ),
+      {
+        method: "POST",
+        agent: predictionAgent,
+        timeout: PREDICTION_TIMEOUT_MS,
+        headers: {
+          "Content-Type": "application/json",
+          "Content-Length": Buffer.byteLength(payload),
+        },
+      },
+      (res) => {
+        let data = ""
+        res.setEncoding("utf8")
+        res.on("data", (chunk) => {
+          data += chunk
+        })
+        res.on("end", () => {
+          if (res.statusCode !== 200) {
+            reject(new Error(`Prediction service returned ${res.statusCode}: ${data}`))
+            return
+          }
+          try {
+            resolve(JSON.parse(data))
+          } catch (error) {
+            reject(error)
+          }
+        })
+      },
+    )
+    req.on("timeout", () => req.destroy(new Error("Prediction service timed out")))
+    req.on("error", reject)
+    req.end(payload)
+  })
+}
+
 // Mock prediction function that simulates the ML model
 function calculateMockPrediction(input: PredictionRequest): PredictionResponse {
   // Simple linear combination that approximates the trained model
@@ -3,6 +3,7 @@ import fs from "fs"
 import path from "path"
 import { parse } from "csv-parse/sync"
 import type { Student } from "../route"
+import { STUDENT_SERVICE_URL, requestStudentService } from "@/lib/student-service"
 
 // Function to load student data (same as in main route)
 function loadStudentData(): Student[] {
@@ -55,6 +56,19 @@ function getSampleData(): Student[] {
 export async function GET(request: Request, { params }: { params: { id: string } }) {
   try {
     const studentId = params.id
+
+    // ID lookup in the indexed store instead of parsing the whole CSV per request
+    if (STUDENT_SERVICE_URL) {
+      try {
+        const found = await requestStudentService<{ student: Student }>(`/students/${encodeURIComponent(studentId)}`)
+        if (found) {
+          return NextResponse.json(found)
+        }
+      } catch (error) {
+        console.error("Student service unavailable, falling back to data/students.csv:", error)
+      }
+    }
+
     const students = loadStudentData()
 
     const student = students.find((s) => s.student_id === studentId)
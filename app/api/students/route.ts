@@ -1,5 +1,7 @@
 import { NextResponse } from "next/server"
 import { submissions } from "../submission/route"
+import { loadDashboardSnapshot } from "@/lib/dashboard-snapshot"
+import { STUDENT_SERVICE_URL, requestStudentService, type StudentPage } from "@/lib/student-service"
 
 export interface Student {
   student_id: string
@@ -161,6 +163,27 @@ export async function GET(request: Request) {
     const search = searchParams.get("search") || ""
     const includeStats = searchParams.get("stats") === "true"
 
+    // Search and page the full data set through the indexed store when it is running
+    if (STUDENT_SERVICE_URL) {
+      try {
+        const query = new URLSearchParams()
+        for (const name of ["search", "class", "persona", "limit", "page", "after"]) {
+          const value = searchParams.get(name)
+          if (value) query.set(name, value)
+        }
+        const response: any = await requestStudentService<StudentPage>(`/students?${query}`)
+        if (response) {
+          if (includeStats) {
+            const snapshot = await loadDashboardSnapshot()
+            if (snapshot) response.stats = snapshot.stats
+          }
+          return NextResponse.json(response)
+        }
+      } catch (error) {
+        console.error("Student service unavailable, falling back to generated students:", error)
+      }
+    }
+
     const allStudents = generateStudentData()
     console.log("[v0] Generated", allStudents.length, "students")
 
@@ -189,8 +212,10 @@ export async function GET(request: Request) {
     }
 
     // Include statistics if requested
+    // Precomputed aggregates (src/aggregates.py) cover the full student data set
     if (includeStats) {
-      response.stats = calculateStats(allStudents)
+      const snapshot = await loadDashboardSnapshot()
+      response.stats = snapshot ? snapshot.stats : calculateStats(allStudents)
     }
 
     console.log("[v0] Returning", paginatedStudents.length, "students")
@@ -0,0 +1,33 @@
+import { promises as fs } from "node:fs"
+import path from "node:path"
+import type { ChartData } from "@/app/api/charts/route"
+import type { StudentStats } from "@/app/api/students/route"
+
+// Written by src/aggregates.py; the routes fall back to computing on the fly without it
+const SNAPSHOT_PATH =
+  process.env.DASHBOARD_SNAPSHOT_PATH ?? path.join(process.cwd(), "data", "dashboard_snapshot.json")
+
+export interface DashboardSnapshot {
+  stats: StudentStats
+  charts: ChartData
+  updated_at: string
+}
+
+// Parsed once per file version; a rewrite (atomic rename) changes the mtime
+let cached: { mtimeMs: number; snapshot: DashboardSnapshot } | null = null
+
+export async function loadDashboardSnapshot(): Promise<DashboardSnapshot | null> {
+  try {
+    const { mtimeMs } = await fs.stat(SNAPSHOT_PATH)
+    if (cached?.mtimeMs !== mtimeMs) {
+      const snapshot: DashboardSnapshot = JSON.parse(await fs.readFile(SNAPSHOT_PATH, "utf8"))
+      cached = { mtimeMs, snapshot }
+    }
+    return cached.snapshot
+  } catch (error) {
+    if ((error as NodeJS.ErrnoException).code !== "ENOENT") {
+      console.error("Error reading dashboard snapshot:", error)
+    }
+    return null
+  }
+}
@@ -0,0 +1,54 @@
+import http from "node:http"
+import type { Student } from "@/app/api/students/route"
+
+// Prediction server started with --students (src/predict_server.py), e.g. http://127.0.0.1:8765
+export const STUDENT_SERVICE_URL = process.env.STUDENT_SERVICE_URL
+const STUDENT_SERVICE_TIMEOUT_MS = Number(process.env.STUDENT_SERVICE_TIMEOUT_MS ?? 1000)
+
+// Reused across requests so each lookup rides an already-open connection
+const studentAgent = new http.Agent({ keepAlive: true, maxSockets: 16 })
+
+export interface StudentPage {
+  students: Student[]
+  pagination: {
+    page: number
+    limit: number
+    total: number
+    totalPages: number
+    nextCursor: string | null
+  }
+}
+
+// GET a path from the indexed student store; resolves null on 404
+export function requestStudentService<T>(pathWithQuery: string): Promise<T | null> {
+  return new Promise((resolve, reject) => {
+    const req = http.get(
+      new URL(pathWithQuery, STUDENT_SERVICE_URL),
+      { agent: studentAgent, timeout: STUDENT_SERVICE_TIMEOUT_MS },
+      (res) => {
+        let data = ""
+        res.setEncoding("utf8")
+        res.on("data", (chunk) => {
+          data += chunk
+        })
+        res.on("end", () => {
+          if (res.statusCode === 404) {
+            resolve(null)
+            return
+          }
+          if (res.statusCode !== 200) {
+            reject(new Error(`Student service returned ${res.statusCode}: ${data}`))
+            return
+          }
+          try {
+            resolve(JSON.parse(data))
+          } catch (error) {
+            reject(error)
+          }
+        })
+      },
+    )
+    req.on("timeout", () => req.destroy(new Error("Student service timed out")))
+    req.on("error", reject)
+  })
+}
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the prediction, validation and data generation hot paths.
+
+Runs every case against generated cohorts, reports latency percentiles,
+rows/sec and peak traced memory, and compares the run with a stored JSON
+baseline. Exits with status 1 when a case is slower (or uses more memory)
+than the baseline by more than --threshold.
+
+Usage:
+    python scripts/benchmark.py --save-baseline
+    python scripts/benchmark.py --sizes 1000,100000 --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+
+# Add src and scripts directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from predict import StudentPerformancePredictor
+from generate_dataset import generate_student_dataset
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+DEFAULT_THRESHOLD = 0.2
+
+# Metrics compared against the baseline; all are "lower is better"
+COMPARED_METRICS = ('p50_ms', 'peak_memory_mb')
+
+# Batch cases keep repeating until they have run this long, to steady the p50
+MIN_REPEAT_SECONDS = 0.2
+
+# Differences below these floors are treated as noise. Calls far faster than
+# MIN_COMPARED_MS (validate_input, get_feature_importance) are therefore timed
+# as whole loops, so a regression in them still moves the p50 past the floor
+MIN_COMPARED_MS = 0.05
+MIN_COMPARED_MB = 1.0
+
+def summarize(timings, rows_per_call=1, peak_bytes=None):
+    """
+    Reduce raw timings to the reported statistics.
+
+    Args:
+        timings (list): Seconds per call
+        rows_per_call (int): Rows handled by each call, or None when calls are not row-based
+        peak_bytes (int): Peak traced allocation of one call, if measured
+
+    Returns:
+        dict: Calls, rows, latency percentiles in ms, rows/sec and peak memory
+    """
+    timings_ms = np.asarray(timings) * 1000
+    total_seconds = float(np.sum(timings))
+    rows = None if rows_per_call is None else rows_per_call * len(timings)
+    return {
+        'calls': len(timings),
+        'rows': rows,
+        'total_seconds': round(total_seconds, 4),
+        'p50_ms': round(float(np.percentile(timings_ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(timings_ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(timings_ms, 99)), 4),
+        'max_ms': round(float(timings_ms.max()), 4),
+        'rows_per_sec': round(rows / total_seconds, 1) if rows and total_seconds > 0 else None,
+        'peak_memory_mb': None if peak_bytes is None else round(peak_bytes / 2**20, 2),
+    }
+
+def time_calls(fn, arguments):
+    """Call ``fn`` once per argument and return the seconds each call took."""
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        fn(argument)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def time_repeated(fn, repeat, min_seconds=MIN_REPEAT_SECONDS):
+    """Call ``fn`` at least ``repeat`` times and for at least ``min_seconds``; return seconds per call."""
+    timings = []
+    while len(timings) < repeat or sum(timings) < min_seconds:
+        timings.extend(time_calls(lambda _: fn(), range(1)))
+    return timings
+
+def peak_memory(fn):
+    """Peak bytes traced by tracemalloc during one call of ``fn`` (run separately from timing)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_cold_start(model_path, model_info_path, repeat):
+    """Import the predictor and load the model in a fresh interpreter, ``repeat`` times."""
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    code = (
+        "import sys, time, contextlib, io\n"
+        "start = time.perf_counter()\n"
+        f"sys.path.insert(0, {src_dir!r})\n"
+        "from predict import StudentPerformancePredictor\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    StudentPerformancePredictor({model_path!r}, {model_info_path!r})\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True,
+                                text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return summarize(timings, rows_per_call=None)
+
+def run_benchmarks(args):
+    """
+    Run every benchmark case.
+
+    Returns:
+        dict: Case name -> statistics from summarize()
+    """
+    results = {}
+
+    def report(name, stats):
+        results[name] = stats
+        memory = f", peak {stats['peak_memory_mb']:.1f} MB" if stats['peak_memory_mb'] is not None else ''
+        rate = f", {stats['rows_per_sec']:,.0f} rows/sec" if stats['rows_per_sec'] else ''
+        print(f"{name:<36} p50 {stats['p50_ms']:10.3f} ms  p95 {stats['p95_ms']:10.3f} ms  "
+              f"p99 {stats['p99_ms']:10.3f} ms{rate}{memory}")
+
+    report('cold_start', bench_cold_start(args.model, args.model_info, args.cold_repeat))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = StudentPerformancePredictor(args.model, args.model_info)
+    features = predictor.feature_names
+
+    for size in args.sizes:
+        # Generation is timed at every size, then one cohort is reused below
+        report(f'generate_student_dataset[{size}]', summarize(
+            time_repeated(lambda: generate_student_dataset(size, seed=args.seed), args.repeat),
+            rows_per_call=size,
+            peak_bytes=peak_memory(lambda: generate_student_dataset(size, seed=args.seed)),
+        ))
+        records = generate_student_dataset(size, seed=args.seed)[features].to_dict('records')
+
+        def validate_all():
+            for record in records:
+                predictor.validate_input(record)
+        
+        # Out-of-range warnings are printed per row; keep them out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            validate_timings = time_repeated(validate_all, args.repeat)
+        report(f'validate_input_loop[{size}]', summarize(validate_timings, rows_per_call=size))
+        report(f'predict_batch[{size}]', summarize(
+            time_repeated(lambda: predictor.predict_batch(records, verbose=False), args.repeat),
+            rows_per_call=size,
+            peak_bytes=peak_memory(lambda: predictor.predict_batch(records, verbose=False)),
+        ))
+
+        if size == args.sizes[0]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                predict_timings = time_calls(predictor.predict, records[:args.max_calls])
+            report('predict', summarize(predict_timings))
+            def importance_loop():
+                for _ in range(args.max_calls):
+                    predictor.get_feature_importance()
+            
+            report(f'get_feature_importance_loop[{args.max_calls}]', summarize(
+                time_repeated(importance_loop, args.repeat), rows_per_call=None,
+            ))
+        del records
+
+    return results
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    Find cases that regressed against the baseline.
+
+    Args:
+        results (dict): Current case statistics
+        baseline (dict): Stored case statistics
+        threshold (float): Allowed relative increase, e.g. 0.2 for 20%
+
+    Returns:
+        list: (case, metric, baseline_value, current_value) per regression
+    """
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = baseline[name].get(metric), stats.get(metric)
+            if old is None or new is None:
+                continue
+            floor = MIN_COMPARED_MB if metric == 'peak_memory_mb' else MIN_COMPARED_MS
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+def environment_info():
+    """Interpreter and library versions recorded with each run."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark prediction, validation and generation.")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated cohort sizes (default: 1000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help=f"Minimum runs of each batch case; short cases repeat for at least "
+                             f"{MIN_REPEAT_SECONDS}s (default: 5)")
+    parser.add_argument('--cold-repeat', type=int, default=3, help="Fresh-interpreter model loads (default: 3)")
+    parser.add_argument('--max-calls', type=int, default=1000,
+                        help="Single-row predict calls timed, and get_feature_importance calls per timed loop "
+                             "(default: 1000)")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for generated cohorts (default: 42)")
+    parser.add_argument('--model', default='models/final_model.pkl', help="Model to benchmark")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f"Baseline JSON (default: {DEFAULT_BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown/memory growth before failing (default: {DEFAULT_THRESHOLD} = 20%%)")
+    parser.add_argument('--output', help="Also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        args.sizes = sorted(int(size) for size in args.sizes.split(','))
+    except ValueError:
+        parser.error("--sizes must be comma-separated integers")
+    if not args.sizes or args.sizes[0] < 1:
+        parser.error("--sizes must be positive")
+    if args.repeat < 1 or args.cold_repeat < 1 or args.max_calls < 1:
+        parser.error("--repeat, --cold-repeat and --max-calls must be at least 1")
+    if args.threshold < 0:
+        parser.error("--threshold must not be negative")
+    return args
+
+def main():
+    """Run the benchmarks and check them against the baseline."""
+    args = parse_args()
+
+    print("Benchmarking Student Performance Predictor")
+    print("=" * 60)
+    run = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'model': args.model,
+        'sizes': args.sizes,
+        'environment': environment_info(),
+        'results': run_benchmarks(args),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('environment') != run['environment']:
+        print("\nWarning: baseline was recorded in a different environment")
+
+    regressions = compare_with_baseline(run['results'], baseline['results'], args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for name, metric, old, new in regressions:
+            print(f"  {name} {metric}: {old} -> {new} ({new / old - 1:+.0%})")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
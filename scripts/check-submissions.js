@@ -11,26 +11,90 @@ const STUDENT_ROSTER = [
   // Add more students as needed
 ]
 
+// Per-file [mtimeUs, size, studentId, error] cache shared with scripts/send_reminders.py;
+// no .json suffix so it is never mistaken for a submission
+const MANIFEST_NAME = ".manifest"
+const MANIFEST_VERSION = 1
+
+function loadManifest(manifestPath) {
+  try {
+    const manifest = JSON.parse(fs.readFileSync(manifestPath, "utf-8"))
+    if (manifest && manifest.version === MANIFEST_VERSION) {
+      return manifest
+    }
+  } catch (error) {
+    // Missing or unreadable manifest: every file is parsed again
+  }
+  return { version: MANIFEST_VERSION, files: {} }
+}
+
+function readSubmission(filePath) {
+  try {
+    const submission = JSON.parse(fs.readFileSync(filePath, "utf-8"))
+    if (!submission || submission.studentId === undefined) {
+      return [null, "KeyError: 'studentId'"]
+    }
+    return [submission.studentId, null]
+  } catch (error) {
+    return [null, `${error.name}: ${error.message}`]
+  }
+}
+
+// Submitted student IDs; only files whose mtime or size changed since the last run are parsed
+function getSubmittedStudents(submissionsDir) {
+  const submittedStudents = new Set()
+  if (!fs.existsSync(submissionsDir)) {
+    return submittedStudents
+  }
+
+  const manifestPath = path.join(submissionsDir, MANIFEST_NAME)
+  const cached = loadManifest(manifestPath).files
+  const files = {}
+  let changed = 0
+
+  for (const dirent of fs.readdirSync(submissionsDir, { withFileTypes: true })) {
+    if (!dirent.name.endsWith(".json") || !dirent.isFile()) continue
+    const filePath = path.join(submissionsDir, dirent.name)
+    const stat = fs.statSync(filePath, { bigint: true })
+    const mtimeUs = Number(stat.mtimeNs / 1000n)
+    const size = Number(stat.size)
+    const previous = cached[dirent.name]
+
+    if (previous && previous[0] === mtimeUs && previous[1] === size) {
+      files[dirent.name] = previous
+    } else {
+      const [studentId, error] = readSubmission(filePath)
+      files[dirent.name] = [mtimeUs, size, studentId, error]
+      changed++
+      if (error) {
+        console.error(`Error reading ${filePath}: ${error}`)
+      }
+    }
+  }
+
+  if (changed || Object.keys(files).length !== Object.keys(cached).length) {
+    try {
+      fs.writeFileSync(`${manifestPath}.tmp`, JSON.stringify({ version: MANIFEST_VERSION, files }))
+      fs.renameSync(`${manifestPath}.tmp`, manifestPath)
+    } catch (error) {
+      console.error(`Could not update submission manifest ${manifestPath}: ${error.message}`)
+    }
+  }
+
+  for (const [, , studentId] of Object.values(files)) {
+    if (studentId !== null) {
+      submittedStudents.add(studentId)
+    }
+  }
+  return submittedStudents
+}
+
 function checkSubmissions() {
   const submissionsDir = path.join(process.cwd(), "public", "submissions")
-  let submittedStudents = []
-
-  // Check if submissions directory exists
-  if (fs.existsSync(submissionsDir)) {
-    const files = fs.readdirSync(submissionsDir)
-    const jsonFiles = files.filter((file) => file.endsWith(".json"))
-
-    // Get list of students who have submitted
-    submittedStudents = jsonFiles.map((file) => {
-      const filePath = path.join(submissionsDir, file)
-      const content = fs.readFileSync(filePath, "utf-8")
-      const submission = JSON.parse(content)
-      return submission.studentId
-    })
-  }
+  const submittedStudents = getSubmittedStudents(submissionsDir)
 
   // Find missing students
-  const missingStudents = STUDENT_ROSTER.filter((student) => !submittedStudents.includes(student.id))
+  const missingStudents = STUDENT_ROSTER.filter((student) => !submittedStudents.has(student.id))
 
   // Output results for GitHub Actions
   const missingStudentsList = missingStudents.map((student) => `${student.id}:${student.name}`).join(",")
@@ -42,7 +106,7 @@ function checkSubmissions() {
   // Log summary
   console.log(`\n📊 Submission Check Results:`)
   console.log(`Total Students: ${STUDENT_ROSTER.length}`)
-  console.log(`Submitted: ${submittedStudents.length}`)
+  console.log(`Submitted: ${submittedStudents.size}`)
   console.log(`Missing: ${missingStudents.length}`)
 
   if (missingStudents.length > 0) {
@@ -56,7 +120,7 @@ function checkSubmissions() {
 
   return {
     missingStudents,
-    submittedStudents,
+    submittedStudents: [...submittedStudents],
     totalStudents: STUDENT_ROSTER.length,
   }
 }
@@ -66,4 +130,4 @@ if (require.main === module) {
   checkSubmissions()
 }
 
-module.exports = { checkSubmissions, STUDENT_ROSTER }
+module.exports = { checkSubmissions, getSubmittedStudents, STUDENT_ROSTER }
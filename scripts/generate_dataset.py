@@ -1,60 +1,100 @@
+import argparse
+import contextlib
+import itertools
 import pandas as pd
 import numpy as np
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-# Set random seed for reproducibility
-np.random.seed(42)
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from columnar import ColumnWriter, is_columnar_path, read_table
+
+# Default seed for reproducibility
+DEFAULT_SEED = 42
+
+# Rows generated per chunk; each chunk gets its own child seed, so the data
+# depends on (seed, chunk size) but not on the number of worker processes
+DEFAULT_CHUNK_SIZE = 100000
+
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Casey", "Morgan", "Riley", "Avery", "Quinn",
+               "Blake", "Cameron", "Drew", "Emery", "Finley", "Harper", "Hayden", "Jamie",
+               "Kendall", "Logan", "Parker", "Peyton", "Reese", "Sage", "Skylar", "Tatum"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+              "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White"]
+
+# Every "First Last" combination, indexed by first * len(LAST_NAMES) + last
+FULL_NAMES = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+
+CLASSES = ['A', 'B', 'C']
+CLASS_PROBABILITIES = [0.3, 0.4, 0.3]
+# Assessment score bonus for classes A, B, C
+CLASS_EFFECTS = np.array([5, 0, -3])
+
+def generate_student_dataset(n_students=500, seed=DEFAULT_SEED, start_id=1, rng=None):
+    """
+    Generate synthetic student dataset with realistic correlations
+
+    Args:
+        n_students (int): Number of students to generate
+        seed: Seed for a new generator (int or np.random.SeedSequence)
+        start_id (int): Number of the first student ID
+        rng (np.random.Generator): Generator to draw from instead of ``seed``
+
+    Returns:
+        pd.DataFrame: One row per student
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # Generate student IDs
+    student_numbers = np.arange(start_id, start_id + n_students).astype(str)
+    if n_students:
+        student_numbers = np.char.zfill(student_numbers, 4)
+    student_ids = np.char.add('STU', student_numbers).astype(object)
 
-def generate_student_dataset(n_students=500):
-    """Generate synthetic student dataset with realistic correlations"""
-    
-    # Generate student IDs and names
-    student_ids = [f"STU{str(i).zfill(4)}" for i in range(1, n_students + 1)]
-    
     # Generate names (simple combination of first and last names)
-    first_names = ["Alex", "Jordan", "Taylor", "Casey", "Morgan", "Riley", "Avery", "Quinn", 
-                   "Blake", "Cameron", "Drew", "Emery", "Finley", "Harper", "Hayden", "Jamie",
-                   "Kendall", "Logan", "Parker", "Peyton", "Reese", "Sage", "Skylar", "Tatum"]
-    last_names = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
-                  "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
-                  "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White"]
-    
-    names = [f"{np.random.choice(first_names)} {np.random.choice(last_names)}" for _ in range(n_students)]
-    
+    first = rng.integers(0, len(FIRST_NAMES), n_students)
+    last = rng.integers(0, len(LAST_NAMES), n_students)
+    names = pd.Categorical.from_codes(first * len(LAST_NAMES) + last, FULL_NAMES)
+
     # Generate classes (A, B, C with different performance distributions)
-    classes = np.random.choice(['A', 'B', 'C'], n_students, p=[0.3, 0.4, 0.3])
-    
+    class_index = rng.choice(len(CLASSES), n_students, p=CLASS_PROBABILITIES)
+    classes = pd.Categorical.from_codes(class_index, CLASSES)
+
     # Generate correlated cognitive skills
     # Base cognitive skills with some correlation structure
-    base_ability = np.random.normal(50, 15, n_students)
+    base_ability = rng.normal(50, 15, n_students)
     base_ability = np.clip(base_ability, 10, 90)
-    
+
     # Generate individual skills with correlations
-    comprehension = base_ability + np.random.normal(0, 8, n_students)
-    attention = base_ability + np.random.normal(0, 10, n_students)
-    focus = 0.7 * attention + np.random.normal(0, 8, n_students)
-    retention = 0.6 * comprehension + 0.4 * focus + np.random.normal(0, 6, n_students)
-    
+    comprehension = base_ability + rng.normal(0, 8, n_students)
+    attention = base_ability + rng.normal(0, 10, n_students)
+    focus = 0.7 * attention + rng.normal(0, 8, n_students)
+    retention = 0.6 * comprehension + 0.4 * focus + rng.normal(0, 6, n_students)
+
     # Clip all skills to 0-100 range
     comprehension = np.clip(comprehension, 0, 100)
     attention = np.clip(attention, 0, 100)
     focus = np.clip(focus, 0, 100)
     retention = np.clip(retention, 0, 100)
-    
+
     # Generate assessment scores based on cognitive skills with class effects
-    class_effects = {'A': 5, 'B': 0, 'C': -3}
-    class_bonus = [class_effects[c] for c in classes]
-    
-    assessment_score = (0.3 * comprehension + 0.25 * attention + 
-                       0.25 * focus + 0.2 * retention + 
-                       np.array(class_bonus) + np.random.normal(0, 5, n_students))
+    assessment_score = (0.3 * comprehension + 0.25 * attention +
+                       0.25 * focus + 0.2 * retention +
+                       CLASS_EFFECTS[class_index] + rng.normal(0, 5, n_students))
     assessment_score = np.clip(assessment_score, 0, 100)
-    
+
     # Generate engagement time (correlated with performance but with noise)
-    engagement_time = (assessment_score * 2 + np.random.normal(0, 20, n_students))
+    engagement_time = (assessment_score * 2 + rng.normal(0, 20, n_students))
     engagement_time = np.clip(engagement_time, 30, 300)  # 30 minutes to 5 hours per week
-    
+
     # Create DataFrame
     df = pd.DataFrame({
         'student_id': student_ids,
@@ -67,29 +107,152 @@ def generate_student_dataset(n_students=500):
         'assessment_score': np.round(assessment_score, 1),
         'engagement_time': np.round(engagement_time, 0).astype(int)
     })
-    
+
     return df
 
+def _chunk_seed(seed, chunk_index):
+    """Child seed of chunk ``chunk_index``; equal to ``SeedSequence(seed).spawn(n)[chunk_index]``."""
+    return np.random.SeedSequence(seed, spawn_key=(chunk_index,))
+
+def _column_schema(n_students):
+    """Column types for columnar output; names and classes are stored as category codes."""
+    id_width = len('STU') + max(4, len(str(n_students)))
+    return {
+        'student_id': f'S{id_width}',
+        'name': FULL_NAMES,
+        'class': CLASSES,
+        'comprehension': np.float64,
+        'attention': np.float64,
+        'focus': np.float64,
+        'retention': np.float64,
+        'assessment_score': np.float64,
+        'engagement_time': np.int16,
+    }
+
+def _generate_chunk(task):
+    """Generate one chunk in a worker, as CSV text (no header) or as column arrays."""
+    seed, chunk_index, start_id, n_students, columnar = task
+    df = generate_student_dataset(n_students, seed=_chunk_seed(seed, chunk_index), start_id=start_id)
+    if not columnar:
+        return df.to_csv(index=False, header=False)
+    return {
+        name: df[name].cat.codes.to_numpy() if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name].to_numpy()
+        for name in df.columns
+    }
+
+def _iter_chunks(n_students, seed, chunk_size, columnar):
+    for chunk_index in itertools.count():
+        start = chunk_index * chunk_size
+        if start >= n_students:
+            return
+        yield seed, chunk_index, start + 1, min(chunk_size, n_students - start), columnar
+
+def write_student_dataset(output_path, n_students, seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE,
+                          workers=1, progress_stream=sys.stderr):
+    """
+    Generate a dataset chunk by chunk and stream it to disk.
+
+    Chunk ``i`` is generated from its own child seed, so the output is
+    byte-identical for any number of workers. At most ``2 * workers`` chunks
+    are held in memory.
+
+    Args:
+        output_path (str): Destination CSV file, ``.columns`` directory or ``.parquet`` file
+        n_students (int): Number of rows to generate
+        seed (int): Root seed
+        chunk_size (int): Rows per chunk
+        workers (int): Worker processes; 1 generates in this process
+        progress_stream: Stream for the progress counter, or None to disable
+
+    Returns:
+        int: Rows written
+    """
+    columnar = is_columnar_path(output_path)
+    tasks = _iter_chunks(n_students, seed, chunk_size, columnar)
+    rows_written = 0
+
+    with contextlib.ExitStack() as stack:
+        if columnar:
+            metadata = {'seed': seed, 'chunk_size': chunk_size, 'generated_at': datetime.now().isoformat()}
+            sink = stack.enter_context(ColumnWriter(output_path, _column_schema(n_students), metadata)).append
+        else:
+            tmp_path = output_path + '.tmp'
+            f = stack.enter_context(open(tmp_path, 'w', newline=''))
+            f.write(','.join(generate_student_dataset(0).columns) + '\n')
+            sink = f.write
+
+        def write(task, chunk):
+            nonlocal rows_written
+            sink(chunk)
+            rows_written += task[3]
+            if progress_stream is not None:
+                print(f"\rGenerated {rows_written:,} of {n_students:,} rows", end='', file=progress_stream, flush=True)
+
+        if workers <= 1:
+            for task in tasks:
+                write(task, _generate_chunk(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append((task, pool.submit(_generate_chunk, task)))
+                    while len(pending) >= 2 * workers:
+                        done_task, future = pending.popleft()
+                        write(done_task, future.result())
+                while pending:
+                    done_task, future = pending.popleft()
+                    write(done_task, future.result())
+
+    if not columnar:
+        os.replace(tmp_path, output_path)
+    if progress_stream is not None:
+        print(file=progress_stream)
+    return rows_written
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic student dataset.")
+    parser.add_argument('--rows', type=int, default=500, help="Number of students (default: 500)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows generated per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument('--output', default='data/students.csv',
+                        help="Output CSV, .columns directory or .parquet file (default: data/students.csv)")
+    args = parser.parse_args(argv)
+
+    if args.rows < 0:
+        parser.error("--rows must not be negative")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
 def main():
     """Generate and save the student dataset"""
+    args = parse_args()
     print("Generating synthetic student dataset...")
-    
-    # Create data directory if it doesn't exist
-    os.makedirs('data', exist_ok=True)
-    
-    # Generate dataset
-    df = generate_student_dataset(500)
-    
-    # Save to CSV
-    df.to_csv('data/students.csv', index=False)
-    
+
+    # Create output directory if it doesn't exist
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    start_time = time.perf_counter()
+    rows = write_student_dataset(args.output, args.rows, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start_time
+
     print(f"Dataset generated successfully!")
-    print(f"Shape: {df.shape}")
-    print(f"Saved to: data/students.csv")
-    print("\nFirst 5 rows:")
-    print(df.head())
-    print("\nDataset summary:")
-    print(df.describe())
+    print(f"Rows: {rows:,} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    print(f"Saved to: {args.output}")
+
+    # Small datasets fit in memory; show a preview and summary
+    if rows <= args.chunk_size:
+        df = read_table(args.output)
+        print(f"Shape: {df.shape}")
+        print("\nFirst 5 rows:")
+        print(df.head())
+        print("\nDataset summary:")
+        print(df.describe())
 
 if __name__ == "__main__":
     main()
@@ -2,11 +2,24 @@
 """
 Email reminder script for missing student submissions.
 This script can be used to send email reminders to students who haven't submitted their projects.
+
+For large rosters, --bulk sends over a small pool of authenticated SMTP
+connections in parallel, rate-limited and retried with backoff, and
+records every delivery in a log for that run. --resume continues an
+interrupted run from its log instead of starting a new one:
+    python scripts/send_reminders.py --roster roster.csv --bulk --workers 4 --rate 20
+    python scripts/send_reminders.py --roster roster.csv --bulk --resume
 """
 
+import argparse
+import csv
 import smtplib
 import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
@@ -19,6 +32,13 @@ EMAIL_USER = os.getenv('EMAIL_USER', '')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
 FROM_EMAIL = os.getenv('FROM_EMAIL', EMAIL_USER)
 
+# Bulk delivery defaults
+DEFAULT_SMTP_WORKERS = 4
+DEFAULT_RATE_LIMIT = 10.0  # messages per second across all connections
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+DEFAULT_REMINDER_LOG = "data/reminder_log.ndjson"
+
 # Student roster
 STUDENT_ROSTER = [
     {"id": "STU001", "name": "Alex Johnson", "email": "alex.johnson@example.com"},
@@ -28,21 +48,91 @@ STUDENT_ROSTER = [
     {"id": "STU005", "name": "Morgan Davis", "email": "morgan.davis@example.com"},
 ]
 
-def get_submitted_students():
-    """Get list of students who have already submitted."""
-    submissions_dir = Path("public/submissions")
-    submitted_students = []
-    
-    if submissions_dir.exists():
-        for json_file in submissions_dir.glob("*.json"):
-            try:
-                with open(json_file, 'r') as f:
-                    submission = json.load(f)
-                    submitted_students.append(submission['studentId'])
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error reading {json_file}: {e}")
-    
-    return submitted_students
+SUBMISSIONS_DIR = Path("public/submissions")
+# Per-file [mtimeUs, size, studentId, error] cache shared with scripts/check-submissions.js;
+# no .json suffix so it is never mistaken for a submission
+MANIFEST_NAME = ".manifest"
+MANIFEST_VERSION = 1
+# Changed files are parsed in a thread pool once there are at least this many
+PARALLEL_READ_THRESHOLD = 64
+
+def _read_submission(json_file):
+    """Parse one submission file into its (studentId, error) pair."""
+    try:
+        with open(json_file, 'r') as f:
+            return json.load(f)['studentId'], None
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def load_manifest(manifest_path):
+    """Load the submission manifest, or an empty one if it is missing or unreadable."""
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, json.JSONDecodeError, AttributeError):
+        pass
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def get_submitted_students(submissions_dir=SUBMISSIONS_DIR, workers=8):
+    """
+    Get the set of students who have already submitted.
+
+    Only files whose mtime or size changed since the last run are parsed;
+    everything else comes from the manifest in the submissions directory.
+
+    Args:
+        submissions_dir (Path): Directory of submission JSON files
+        workers (int): Threads used to parse changed files
+
+    Returns:
+        set: Submitted student IDs
+    """
+    submissions_dir = Path(submissions_dir)
+    if not submissions_dir.exists():
+        return set()
+
+    manifest_path = submissions_dir / MANIFEST_NAME
+    cached = load_manifest(manifest_path)['files']
+    files = {}
+    changed = []
+    with os.scandir(submissions_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            # Microseconds stay exact as JSON numbers in JavaScript, nanoseconds do not
+            mtime_us = stat.st_mtime_ns // 1000
+            previous = cached.get(entry.name)
+            if previous is not None and previous[0] == mtime_us and previous[1] == stat.st_size:
+                files[entry.name] = previous
+            else:
+                files[entry.name] = [mtime_us, stat.st_size, None, None]
+                changed.append(entry.name)
+
+    if changed:
+        paths = [submissions_dir / name for name in changed]
+        if workers > 1 and len(changed) >= PARALLEL_READ_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                parsed = list(executor.map(_read_submission, paths))
+        else:
+            parsed = [_read_submission(path) for path in paths]
+        for name, (student_id, error) in zip(changed, parsed):
+            files[name][2:] = [student_id, error]
+            if error:
+                print(f"Error reading {submissions_dir / name}: {error}")
+
+    if changed or len(files) != len(cached):
+        tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION, 'files': files}, f)
+            os.replace(tmp_path, manifest_path)
+        except OSError as e:
+            print(f"Could not update submission manifest {manifest_path}: {e}")
+
+    return {entry[2] for entry in files.values() if entry[2] is not None}
 
 def create_reminder_email(student):
     """Create reminder email content for a student."""
@@ -133,6 +223,18 @@ def create_reminder_email(student):
     
     return subject, html_body, text_body
 
+def build_message(to_email, subject, html_body, text_body):
+    """Build the multipart (plain text + HTML) reminder message."""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    
+    # Add text and HTML parts
+    msg.attach(MIMEText(text_body, 'plain'))
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
 def send_email(to_email, subject, html_body, text_body):
     """Send email to a student."""
     if not EMAIL_USER or not EMAIL_PASSWORD:
@@ -140,18 +242,7 @@ def send_email(to_email, subject, html_body, text_body):
         return False
     
     try:
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        
-        # Add text and HTML parts
-        text_part = MIMEText(text_body, 'plain')
-        html_part = MIMEText(html_body, 'html')
-        
-        msg.attach(text_part)
-        msg.attach(html_part)
+        msg = build_message(to_email, subject, html_body, text_body)
         
         # Send email
         with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
@@ -165,8 +256,231 @@ def send_email(to_email, subject, html_body, text_body):
         print(f"❌ Error sending email to {to_email}: {e}")
         return False
 
+class RateLimiter:
+    """Spaces sends evenly so all threads together stay under ``rate`` per second (0 = unlimited)."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class SMTPConnection:
+    """One SMTP session that stays connected (and logged in) across messages, reopened after errors."""
+    
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, user=EMAIL_USER, password=EMAIL_PASSWORD,
+                 starttls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.server = None
+    
+    def send(self, msg):
+        if self.server is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()
+                if self.user and self.password:
+                    server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+            self.server = server
+        try:
+            self.server.send_message(msg)
+        except Exception:
+            # The session state is unknown after a failure; start the next attempt on a fresh one
+            self.close()
+            raise
+    
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+def is_transient_error(error):
+    """Whether a failed send is worth retrying (4xx replies, dropped connections, timeouts)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # Socket errors and timeouts (SMTPException also derives from OSError)
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+def load_sent_ids(log_path):
+    """Student IDs already recorded as sent in the delivery log."""
+    sent = set()
+    if not os.path.exists(log_path):
+        return sent
+    with open(log_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if record.get('status') == 'sent':
+                sent.add(record['student_id'])
+    return sent
+
+def deliver_reminders(students, log_path=DEFAULT_REMINDER_LOG, workers=DEFAULT_SMTP_WORKERS,
+                      rate=DEFAULT_RATE_LIMIT, max_retries=DEFAULT_MAX_RETRIES, connection_factory=SMTPConnection,
+                      backoff=RETRY_BACKOFF_SECONDS, resume=False):
+    """
+    Send reminders concurrently over a pool of persistent SMTP connections.
+    
+    Each worker thread owns one connection. Transient failures are retried
+    with exponential backoff on a fresh connection. Every outcome is written
+    to ``log_path`` as NDJSON. A run starts a new log; with ``resume``, it
+    appends to the log of an interrupted run and skips the students already
+    logged as sent, so only what is left of that run is sent. A rejected
+    login stops the whole run instead of failing again for every student.
+    
+    Args:
+        students (list): Roster entries with id, name and email
+        log_path (str): NDJSON delivery log of this run
+        workers (int): Concurrent SMTP connections
+        rate (float): Messages per second across all workers (0 = unlimited)
+        max_retries (int): Retries per message after the first attempt
+        connection_factory (callable): Builds one SMTPConnection per worker
+        backoff (float): Delay before the first retry, doubled after each one
+        resume (bool): Continue the run recorded in ``log_path``
+    
+    Returns:
+        dict: sent, failed, skipped, not_sent (left over after an abort),
+        aborted (the login error, or None), elapsed_seconds and
+        messages_per_second
+    """
+    already_sent = load_sent_ids(log_path) if resume else set()
+    pending = [student for student in students if student['id'] not in already_sent]
+    summary = {'sent': 0, 'failed': 0, 'skipped': len(students) - len(pending), 'not_sent': 0, 'aborted': None}
+    
+    os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+    work = queue.Queue()
+    for student in pending:
+        work.put(student)
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    abort = threading.Event()
+    
+    def record(log, student, status, attempts, error=None):
+        line = json.dumps({
+            'student_id': student['id'],
+            'email': student['email'],
+            'status': status,
+            'attempts': attempts,
+            'error': error,
+            'at': datetime.now().isoformat(timespec='seconds'),
+        })
+        with lock:
+            log.write(line + '\n')
+            log.flush()
+            summary[status] += 1
+    
+    def worker(log):
+        connection = connection_factory()
+        try:
+            while not abort.is_set():
+                try:
+                    student = work.get_nowait()
+                except queue.Empty:
+                    return
+                msg = build_message(student['email'], *create_reminder_email(student))
+                for attempt in range(1, max_retries + 2):
+                    limiter.wait()
+                    try:
+                        connection.send(msg)
+                    except smtplib.SMTPAuthenticationError as e:
+                        # Every other student would hit the same rejected login
+                        print(f"❌ SMTP login rejected, stopping the run: {e}")
+                        record(log, student, 'failed', attempt, str(e))
+                        with lock:
+                            summary['aborted'] = summary['aborted'] or str(e)
+                        abort.set()
+                    except Exception as e:
+                        if attempt <= max_retries and is_transient_error(e):
+                            time.sleep(backoff * 2 ** (attempt - 1))
+                            continue
+                        print(f"❌ Error sending email to {student['email']}: {e}")
+                        record(log, student, 'failed', attempt, str(e))
+                    else:
+                        record(log, student, 'sent', attempt)
+                    break
+        finally:
+            connection.close()
+    
+    start_time = time.perf_counter()
+    with open(log_path, 'a' if resume else 'w') as log:
+        threads = [threading.Thread(target=worker, args=(log,), daemon=True)
+                   for _ in range(max(1, min(workers, len(pending))))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start_time
+    
+    summary['not_sent'] = work.qsize()
+    summary['elapsed_seconds'] = elapsed
+    summary['messages_per_second'] = summary['sent'] / elapsed if elapsed > 0 else 0.0
+    return summary
+
+def load_roster(path):
+    """Load a roster CSV with id, name and email columns."""
+    with open(path, newline='') as f:
+        return [{'id': row['id'], 'name': row['name'], 'email': row['email']} for row in csv.DictReader(f)]
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Send reminder emails to students with missing submissions.")
+    parser.add_argument('--roster', help="Roster CSV with id, name and email columns (default: built-in roster)")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Send over a pool of persistent SMTP connections, rate-limited and resumable")
+    parser.add_argument('--workers', type=int, default=DEFAULT_SMTP_WORKERS,
+                        help=f"Concurrent SMTP connections in bulk mode (default: {DEFAULT_SMTP_WORKERS})")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_LIMIT,
+                        help=f"Messages per second in bulk mode, 0 for no limit (default: {DEFAULT_RATE_LIMIT})")
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"Retries for temporary SMTP failures (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument('--log', default=DEFAULT_REMINDER_LOG,
+                        help=f"Delivery log of the bulk run, replaced by each new run (default: {DEFAULT_REMINDER_LOG})")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the interrupted bulk run in --log, skipping students it already reached")
+    parser.add_argument('--smtp-host', default=SMTP_SERVER, help=f"SMTP server (default: {SMTP_SERVER})")
+    parser.add_argument('--smtp-port', type=int, default=SMTP_PORT, help=f"SMTP port (default: {SMTP_PORT})")
+    parser.add_argument('--no-starttls', action='store_true',
+                        help="Skip STARTTLS and login, e.g. for a local test SMTP server")
+    parser.add_argument('--yes', action='store_true', help="Send without asking for confirmation")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate < 0 or args.max_retries < 0:
+        parser.error("--rate and --max-retries cannot be negative")
+    if args.resume and not args.bulk:
+        parser.error("--resume requires --bulk")
+    return args
+
 def main():
     """Main function to send reminders to students with missing submissions."""
+    args = parse_args()
+    roster = load_roster(args.roster) if args.roster else STUDENT_ROSTER
     print("🔍 Checking for missing submissions...")
     
     # Get students who have submitted
@@ -175,7 +489,7 @@ def main():
     
     # Find students who haven't submitted
     missing_students = [
-        student for student in STUDENT_ROSTER 
+        student for student in roster 
         if student['id'] not in submitted_students
     ]
     
@@ -184,14 +498,38 @@ def main():
         return
     
     print(f"⚠️  Found {len(missing_students)} students with missing submissions:")
-    for student in missing_students:
+    for student in missing_students[:20]:
         print(f"   - {student['name']} ({student['id']})")
+    if len(missing_students) > 20:
+        print(f"   ... and {len(missing_students) - 20} more")
     
     # Ask for confirmation before sending emails
-    if EMAIL_USER and EMAIL_PASSWORD:
-        response = input(f"\n📧 Send reminder emails to {len(missing_students)} students? (y/N): ")
-        if response.lower() != 'y':
-            print("📧 Email sending cancelled.")
+    if (EMAIL_USER and EMAIL_PASSWORD) or (args.bulk and args.no_starttls):
+        if not args.yes:
+            response = input(f"\n📧 Send reminder emails to {len(missing_students)} students? (y/N): ")
+            if response.lower() != 'y':
+                print("📧 Email sending cancelled.")
+                return
+        
+        if args.bulk:
+            if not FROM_EMAIL:
+                print("❌ No sender address. Set FROM_EMAIL (or EMAIL_USER).")
+                return
+            
+            def connection_factory():
+                return SMTPConnection(args.smtp_host, args.smtp_port, starttls=not args.no_starttls,
+                                      user='' if args.no_starttls else EMAIL_USER,
+                                      password='' if args.no_starttls else EMAIL_PASSWORD)
+            
+            summary = deliver_reminders(missing_students, args.log, args.workers, args.rate,
+                                        args.max_retries, connection_factory, resume=args.resume)
+            print(f"\n📊 Summary: {summary['sent']} sent, {summary['failed']} failed, "
+                  f"{summary['skipped']} already sent earlier in this run (see {args.log})")
+            if summary['aborted']:
+                print(f"   Stopped after a rejected login; {summary['not_sent']} not sent. "
+                      f"Fix the credentials and rerun with --resume")
+            print(f"   {summary['messages_per_second']:.1f} messages/sec over {summary['elapsed_seconds']:.1f}s "
+                  f"with {args.workers} connections")
             return
         
         # Send reminder emails
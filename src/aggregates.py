@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Precomputed dashboard aggregates.
+
+Computes everything the dashboard's stats and charts endpoints show (per-skill
+means, high performers, persona distribution, engagement-range buckets and
+the attention-vs-assessment sample) in one vectorized pass per chunk of
+student data, and writes them to a JSON snapshot that
+``app/api/students`` and ``app/api/charts`` serve directly.
+
+The snapshot also stores the running sums and counts behind every number,
+so ``--append`` folds new rows into an existing snapshot without reading
+the old data again.
+
+Usage:
+    python src/aggregates.py data/students.csv
+    python src/aggregates.py data/new_rows.csv --append
+    python src/aggregates.py data/students.columns --personas models/personas.npz
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+from columnar import is_columnar_path, iter_column_chunks
+
+DEFAULT_SNAPSHOT_PATH = 'data/dashboard_snapshot.json'
+DEFAULT_CHUNK_SIZE = 500000
+
+SKILLS = ['comprehension', 'attention', 'focus', 'retention']
+FIELDS = SKILLS + ['assessment_score', 'engagement_time']
+
+# Same thresholds and ranges as the dashboard routes
+HIGH_PERFORMER_SCORE = 85
+ENGAGEMENT_RANGES = [
+    ('30-60 min', 30, 60),
+    ('61-120 min', 61, 120),
+    ('121-180 min', 121, 180),
+    ('181+ min', 181, 999),
+]
+SCATTER_SIZE = 20
+
+# Order of the rule-based personas (determinePersona in the routes)
+PERSONAS = ['High Achiever', 'Struggling Learner', 'Focused Specialist', 'Average Performer']
+
+def rule_personas(columns):
+    """
+    Vectorized port of the routes' ``determinePersona`` rules.
+
+    Args:
+        columns: Mapping of field name -> array
+
+    Returns:
+        np.ndarray: Index into PERSONAS per row
+    """
+    skills = [np.asarray(columns[skill], dtype=np.float64) for skill in SKILLS]
+    score = np.asarray(columns['assessment_score'], dtype=np.float64)
+    engagement = np.asarray(columns['engagement_time'], dtype=np.float64)
+    avg_cognitive = sum(skills) / len(skills)
+    any_strong = np.logical_or.reduce([skill >= 85 for skill in skills])
+    return np.select(
+        [
+            (score >= 85) & (avg_cognitive >= 80) & (engagement >= 180),
+            (score <= 65) & (avg_cognitive <= 70) & (engagement <= 120),
+            any_strong & (avg_cognitive < 80),
+        ],
+        [0, 1, 2],
+        default=3,
+    )
+
+def _round1(value):
+    """Round to one decimal like the routes' ``Math.round(x * 10) / 10``."""
+    return float(np.floor(value * 10 + 0.5) / 10)
+
+class DashboardAggregates:
+    """
+    Running sums and counts behind the dashboard numbers.
+
+    Args:
+        personas (PersonaModel): Optional persona clusters; without one the
+            routes' rule-based personas are used
+        state (dict): State from a previous ``snapshot()['state']`` to continue from
+    """
+
+    def __init__(self, personas=None, state=None):
+        self.personas = personas
+        self.persona_labels = personas.labels if personas is not None else PERSONAS
+        self.persona_method = 'clusters' if personas is not None else 'rules'
+        if state is None:
+            self.rows = 0
+            self.sums = {field: 0.0 for field in FIELDS}
+            self.high_performers = 0
+            self.persona_counts = {}
+            self.engagement = [{'count': 0, 'score_sum': 0.0} for _ in ENGAGEMENT_RANGES]
+            self.scatter = []
+            self.sources = []
+        else:
+            if state['persona_method'] != self.persona_method:
+                raise ValueError(f"Snapshot personas were computed with {state['persona_method']}, "
+                                 f"not {self.persona_method}; rebuild it instead of appending")
+            self.rows = state['rows']
+            self.sums = dict(state['sums'])
+            self.high_performers = state['high_performers']
+            self.persona_counts = dict(state['persona_counts'])
+            self.engagement = [dict(bucket) for bucket in state['engagement']]
+            self.scatter = [list(point) for point in state['scatter']]
+            self.sources = list(state['sources'])
+
+    def update(self, columns):
+        """
+        Fold one chunk of students into the aggregates.
+
+        Args:
+            columns: Mapping (dict or DataFrame) of field name -> array for every name in FIELDS
+        """
+        values = {field: np.asarray(columns[field], dtype=np.float64) for field in FIELDS}
+        n_rows = len(values['assessment_score'])
+        if not n_rows:
+            return
+        score = values['assessment_score']
+        engagement = values['engagement_time']
+
+        self.rows += n_rows
+        for field, array in values.items():
+            self.sums[field] += float(array.sum())
+        self.high_performers += int(np.count_nonzero(score >= HIGH_PERFORMER_SCORE))
+
+        if self.personas is not None:
+            persona_index = self.personas.assign(values)
+        else:
+            persona_index = rule_personas(values)
+        for label, count in zip(self.persona_labels, np.bincount(persona_index, minlength=len(self.persona_labels))):
+            if count:
+                self.persona_counts[label] = self.persona_counts.get(label, 0) + int(count)
+
+        for bucket, (_, low, high) in zip(self.engagement, ENGAGEMENT_RANGES):
+            in_range = (engagement >= low) & (engagement <= high)
+            bucket['count'] += int(np.count_nonzero(in_range))
+            bucket['score_sum'] += float(score[in_range].sum())
+
+        # The first SCATTER_SIZE students, as the charts route shows them
+        missing = SCATTER_SIZE - len(self.scatter)
+        if missing > 0:
+            self.scatter.extend([attention, assessment] for attention, assessment in zip(
+                values['attention'][:missing].tolist(), score[:missing].tolist()))
+
+    def state(self):
+        """JSON-serializable running totals, accepted back by the constructor."""
+        return {
+            'rows': self.rows,
+            'sums': self.sums,
+            'high_performers': self.high_performers,
+            'persona_counts': self.persona_counts,
+            'persona_method': self.persona_method,
+            'engagement': self.engagement,
+            'scatter': self.scatter,
+            'sources': self.sources,
+        }
+
+    def stats(self):
+        """The students route's ``StudentStats``."""
+        means = {field: self.sums[field] / self.rows if self.rows else 0.0 for field in FIELDS}
+        return {
+            'avgAssessmentScore': _round1(means['assessment_score']),
+            'avgComprehension': _round1(means['comprehension']),
+            'avgAttention': _round1(means['attention']),
+            'avgFocus': _round1(means['focus']),
+            'avgRetention': _round1(means['retention']),
+            'avgEngagementTime': int(np.floor(means['engagement_time'] + 0.5)),
+            'totalStudents': self.rows,
+            'highPerformers': self.high_performers,
+            'personaDistribution': self._ordered_persona_counts(),
+        }
+
+    def charts(self):
+        """The charts route's ``ChartData``."""
+        return {
+            'skillsComparison': [
+                {'skill': skill.title(), 'avgScore': _round1(self.sums[skill] / self.rows if self.rows else 0.0)}
+                for skill in SKILLS
+            ],
+            'attentionVsAssessment': [
+                {'attention': _round1(attention), 'assessment': _round1(assessment)}
+                for attention, assessment in self.scatter
+            ],
+            'personaDistribution': [
+                {'persona': persona, 'count': count, 'percentage': _round1(count / self.rows * 100)}
+                for persona, count in self._ordered_persona_counts().items()
+            ],
+            'engagementTrends': [
+                {
+                    'range': name,
+                    'avgScore': _round1(bucket['score_sum'] / bucket['count'] if bucket['count'] else 0.0),
+                    'count': bucket['count'],
+                }
+                for (name, _, _), bucket in zip(ENGAGEMENT_RANGES, self.engagement)
+            ],
+        }
+
+    def _ordered_persona_counts(self):
+        return {label: self.persona_counts[label] for label in dict.fromkeys(self.persona_labels)
+                if label in self.persona_counts}
+
+    def snapshot(self):
+        """
+        Everything the routes serve plus the state needed to append later.
+
+        Returns:
+            dict: 'stats', 'charts', 'state' and 'updated_at'
+        """
+        return {
+            'stats': self.stats(),
+            'charts': self.charts(),
+            'state': self.state(),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+def iter_student_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield column chunks of the aggregated fields.
+
+    Args:
+        path (str): CSV file, ``.columns`` directory or ``.parquet`` file
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        dict: Field name -> array for one chunk
+    """
+    if is_columnar_path(path):
+        for _, arrays in iter_column_chunks(path, FIELDS, chunk_size):
+            yield arrays
+    else:
+        import pandas as pd
+
+        for chunk in pd.read_csv(path, usecols=FIELDS, chunksize=chunk_size):
+            yield {field: chunk[field].to_numpy(dtype=np.float64) for field in FIELDS}
+
+def build_snapshot(paths, snapshot_path=DEFAULT_SNAPSHOT_PATH, append=False, personas=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Aggregate student data and write the dashboard snapshot.
+
+    Args:
+        paths (list): Student data files to add
+        snapshot_path (str): Snapshot JSON to write
+        append (bool): Continue from the existing snapshot's running totals
+        personas (PersonaModel): Optional persona clusters instead of the rules
+        chunk_size (int): Rows aggregated per pass
+
+    Returns:
+        dict: The snapshot that was written
+    """
+    state = None
+    if append and os.path.exists(snapshot_path):
+        with open(snapshot_path) as f:
+            state = json.load(f)['state']
+    aggregates = DashboardAggregates(personas, state)
+
+    for path in paths:
+        rows_before = aggregates.rows
+        for columns in iter_student_chunks(path, chunk_size):
+            aggregates.update(columns)
+        aggregates.sources.append({
+            'path': path,
+            'rows': aggregates.rows - rows_before,
+            'added_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    snapshot = aggregates.snapshot()
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    with open(snapshot_path + '.tmp', 'w') as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(snapshot_path + '.tmp', snapshot_path)
+    return snapshot
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's stats and chart aggregates.")
+    parser.add_argument('data', nargs='*', default=['data/students.csv'],
+                        help="Student data: CSV files, .columns directories or .parquet files "
+                             "(default: data/students.csv)")
+    parser.add_argument('--output', default=DEFAULT_SNAPSHOT_PATH,
+                        help=f"Snapshot JSON served by the routes (default: {DEFAULT_SNAPSHOT_PATH})")
+    parser.add_argument('--append', action='store_true',
+                        help="Add the data to the existing snapshot's running totals instead of rebuilding it")
+    parser.add_argument('--personas',
+                        help="Persona model from src/personas.py; default is the dashboard's rule-based personas")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows aggregated per pass (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    return args
+
+def main():
+    """Build or extend the dashboard snapshot."""
+    args = parse_args()
+    personas = None
+    if args.personas:
+        from personas import PersonaModel
+
+        personas = PersonaModel.load(args.personas)
+
+    start_time = time.perf_counter()
+    try:
+        snapshot = build_snapshot(args.data, args.output, args.append, personas, args.chunk_size)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start_time
+
+    stats = snapshot['stats']
+    added = sum(source['rows'] for source in snapshot['state']['sources'][-len(args.data):])
+    print(f"Aggregated {added:,} rows in {elapsed:.2f}s; snapshot covers {stats['totalStudents']:,} students")
+    print(f"Average assessment score: {stats['avgAssessmentScore']}, high performers: {stats['highPerformers']:,}")
+    print(f"Personas: {stats['personaDistribution']}")
+    print(f"Snapshot saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
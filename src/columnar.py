@@ -0,0 +1,281 @@
+"""
+Columnar on-disk storage for student data and prediction output.
+
+A ``.columns`` dataset is a directory with one raw ``.npy`` file per column
+plus ``metadata.json``, the same layout as the ``.forest`` model artifact.
+Columns are memory-mapped on read, so a reader that only needs the five
+model features touches only those files and never parses text. Repeated
+strings (names, classes) are stored as integer codes with a category list.
+
+``.parquet`` files are supported through the same functions when pyarrow is
+installed; it is not required for ``.columns`` datasets.
+"""
+
+import json
+import os
+import shutil
+import numpy as np
+
+# Directory suffix of the .npy-per-column format
+COLUMNAR_SUFFIX = '.columns'
+PARQUET_SUFFIX = '.parquet'
+
+# Fixed .npy header size, so the row count can be filled in once writing ends
+_NPY_HEADER_SIZE = 128
+
+def is_columnar_path(path):
+    """True if ``path`` names a .columns dataset or a Parquet file."""
+    return path.rstrip('/\\').endswith((COLUMNAR_SUFFIX, PARQUET_SUFFIX))
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"{PARQUET_SUFFIX} files need pyarrow (pip install pyarrow); "
+                          f"use a {COLUMNAR_SUFFIX} directory instead") from None
+    return pyarrow
+
+def _npy_header(dtype, n_rows):
+    """Version 1.0 .npy header for a 1-D array, padded to a fixed size."""
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (n_rows,)})
+    prefix = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+    header_len = _NPY_HEADER_SIZE - len(prefix) - 2
+    return prefix + header_len.to_bytes(2, 'little') + header.ljust(header_len - 1).encode('latin1') + b'\n'
+
+class ColumnWriter:
+    """
+    Append-only writer for a columnar dataset.
+
+    Args:
+        path (str): Destination ``.columns`` directory or ``.parquet`` file
+        schema (dict): Column name -> NumPy dtype, or a list of category
+            labels for dictionary-encoded columns (appended values are then
+            integer codes into that list)
+        metadata (dict): Optional JSON-serializable dataset metadata
+    """
+
+    def __init__(self, path, schema, metadata=None):
+        self.path = path
+        self.metadata = metadata or {}
+        self.n_rows = 0
+        self.columns = {}
+        for name, spec in schema.items():
+            if isinstance(spec, (list, tuple)):
+                dtype = np.uint8 if len(spec) <= 256 else np.uint16 if len(spec) <= 65536 else np.int32
+                self.columns[name] = {'dtype': np.dtype(dtype), 'categories': [str(label) for label in spec]}
+            else:
+                self.columns[name] = {'dtype': np.dtype(spec), 'categories': None}
+
+        self._parquet = path.endswith(PARQUET_SUFFIX)
+        self._tmp_path = f"{path}.tmp-{os.getpid()}"
+        if self._parquet:
+            self._parquet_writer = None
+        else:
+            os.makedirs(self._tmp_path)
+            self._files = {}
+            for name, column in self.columns.items():
+                f = open(os.path.join(self._tmp_path, f"{name}.npy"), 'wb')
+                f.write(_npy_header(column['dtype'], 0))
+                self._files[name] = f
+
+    def append(self, columns):
+        """
+        Append one chunk of rows.
+
+        Args:
+            columns (dict): Column name -> 1-D array; every schema column is required
+        """
+        arrays = {name: np.asarray(columns[name], dtype=column['dtype']) for name, column in self.columns.items()}
+        lengths = {len(array) for array in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+
+        if self._parquet:
+            self._append_parquet(arrays)
+        else:
+            for name, array in arrays.items():
+                self._files[name].write(np.ascontiguousarray(array).tobytes())
+        self.n_rows += lengths.pop() if lengths else 0
+
+    def _append_parquet(self, arrays):
+        pa = _import_pyarrow()
+        fields = {}
+        for name, array in arrays.items():
+            categories = self.columns[name]['categories']
+            if categories is not None:
+                fields[name] = pa.DictionaryArray.from_arrays(array, pa.array(categories))
+            elif array.dtype.kind == 'S':
+                fields[name] = pa.array(array.astype(object), type=pa.binary())
+            else:
+                fields[name] = pa.array(array)
+        table = pa.table(fields).replace_schema_metadata({'metadata': json.dumps(self.metadata)})
+        if self._parquet_writer is None:
+            self._parquet_writer = pa.parquet.ParquetWriter(self._tmp_path, table.schema)
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        """Finish the dataset and move it into place."""
+        if self._parquet:
+            if self._parquet_writer is None:
+                self._append_parquet({name: np.empty(0, column['dtype']) for name, column in self.columns.items()})
+            self._parquet_writer.close()
+            os.replace(self._tmp_path, self.path)
+            return
+
+        for name, f in self._files.items():
+            f.seek(0)
+            f.write(_npy_header(self.columns[name]['dtype'], self.n_rows))
+            f.close()
+        with open(os.path.join(self._tmp_path, 'metadata.json'), 'w') as f:
+            json.dump({
+                'n_rows': self.n_rows,
+                'columns': {
+                    name: {'dtype': column['dtype'].str, 'categories': column['categories']}
+                    for name, column in self.columns.items()
+                },
+                'metadata': self.metadata,
+            }, f, indent=2)
+
+        if os.path.exists(self.path):
+            old_path = f"{self.path}.old-{os.getpid()}"
+            os.replace(self.path, old_path)
+            os.replace(self._tmp_path, self.path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard a partially written dataset."""
+        if self._parquet:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+        else:
+            for f in self._files.values():
+                f.close()
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_columns(path, columns, schema=None, metadata=None):
+    """
+    Write a whole dataset at once.
+
+    Args:
+        path (str): Destination ``.columns`` directory or ``.parquet`` file
+        columns (dict): Column name -> 1-D array
+        schema (dict): Optional schema as for ColumnWriter; defaults to the arrays' dtypes
+        metadata (dict): Optional JSON-serializable dataset metadata
+    """
+    schema = schema or {name: np.asarray(values).dtype for name, values in columns.items()}
+    with ColumnWriter(path, schema, metadata) as writer:
+        writer.append(columns)
+
+def read_columns(path, columns=None, mmap_mode='r'):
+    """
+    Read selected columns of a dataset.
+
+    Args:
+        path (str): ``.columns`` directory or ``.parquet`` file
+        columns (list): Names to read; None reads every column
+        mmap_mode (str): Memory-map mode for ``.columns`` data, or None to read into memory
+
+    Returns:
+        tuple: (arrays, info) - column name -> array (category columns hold
+        codes), and the dataset info with ``n_rows``, per-column ``dtype``
+        and ``categories``, and the writer's ``metadata``
+    """
+    if not os.path.isdir(path):
+        return _read_parquet(path, columns)
+
+    with open(os.path.join(path, 'metadata.json')) as f:
+        info = json.load(f)
+    names = list(info['columns']) if columns is None else list(columns)
+    missing = [name for name in names if name not in info['columns']]
+    if missing:
+        raise KeyError(f"Columns not in {path}: {missing}")
+
+    arrays = {}
+    for name in names:
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        arrays[name] = array.view(np.ndarray)
+    return arrays, info
+
+def _read_parquet(path, columns):
+    pa = _import_pyarrow()
+    table = pa.parquet.read_table(path, columns=columns)
+    schema_metadata = table.schema.metadata or {}
+    info = {
+        'n_rows': table.num_rows,
+        'columns': {},
+        'metadata': json.loads(schema_metadata.get(b'metadata', b'{}')),
+    }
+    arrays = {}
+    for name in table.column_names:
+        column = table.column(name).combine_chunks()
+        if isinstance(column, pa.DictionaryArray):
+            arrays[name] = column.indices.to_numpy(zero_copy_only=False)
+            categories = column.dictionary.to_pylist()
+        else:
+            arrays[name] = column.to_numpy(zero_copy_only=False)
+            categories = None
+        if arrays[name].dtype == object:
+            arrays[name] = arrays[name].astype(bytes)
+        info['columns'][name] = {'dtype': arrays[name].dtype.str, 'categories': categories}
+    return arrays, info
+
+def iter_column_chunks(path, columns, chunk_size):
+    """
+    Yield consecutive row slices of selected columns.
+
+    Args:
+        path (str): ``.columns`` directory or ``.parquet`` file
+        columns (list): Names to read; None reads every column
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        tuple: (first_row, arrays) for each chunk
+    """
+    arrays, info = read_columns(path, columns)
+    for start in range(0, info['n_rows'], chunk_size):
+        yield start, {name: array[start:start + chunk_size] for name, array in arrays.items()}
+
+def read_table(path, columns=None):
+    """
+    Load a CSV file or columnar dataset into a pandas DataFrame.
+
+    Category columns come back as ``pd.Categorical`` and byte-string columns
+    as Python strings, so the frame matches what ``pd.read_csv`` returns.
+
+    Args:
+        path (str): ``.csv`` file, ``.columns`` directory or ``.parquet`` file
+        columns (list): Columns to load; None loads every column
+
+    Returns:
+        pd.DataFrame: The requested columns
+    """
+    import pandas as pd
+
+    if not is_columnar_path(path):
+        return pd.read_csv(path, usecols=columns)
+
+    arrays, info = read_columns(path, columns, mmap_mode=None)
+    data = {}
+    for name, array in arrays.items():
+        categories = info['columns'][name]['categories']
+        if categories is not None:
+            data[name] = pd.Categorical.from_codes(array.astype(np.int64), categories)
+        elif array.dtype.kind == 'S':
+            data[name] = np.array([value.decode('utf-8') for value in array.tolist()], dtype=object)
+        else:
+            data[name] = array
+    return pd.DataFrame(data)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Shrink a trained forest within an accuracy budget.
+
+The compact model is searched on a held-out file that was not used for
+training, split in two:
+    - every tree is cut at each candidate depth (cut nodes predict the mean
+      of the samples that reached them)
+    - per depth, trees are added greedily, each time the one that most
+      lowers the squared error on the selection half, until MAE and R² on
+      the validation half are within the budget of the full model
+    - the candidate with the fewest nodes wins
+Thresholds are stored as float32, rounded down so every float32 input takes
+the same branch as before, and leaf values as float32 or float16. Both are
+applied before the search, so the budget check sees the final model.
+
+The result is a ``.forest`` artifact that StudentPerformancePredictor loads
+with ``--model``. The size, latency and accuracy report before and after
+compaction is printed and stored as ``model_info['compaction']``.
+
+Usage:
+    python src/compact.py data/holdout.csv --max-mae-increase 0.1 --max-r2-drop 0.005
+    python src/compact.py data/holdout.csv --value-dtype float16 --output models/final_model.small.forest
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import numpy as np
+
+from forest import ARRAY_NAMES, FlatForest, _to_json_compatible
+from intervals import calibrate
+from train import DEFAULT_FEATURES, DEFAULT_TARGET, evaluate, load_training_data
+
+DEFAULT_MAX_MAE_INCREASE = 0.1
+DEFAULT_MAX_R2_DROP = 0.005
+DEFAULT_MIN_DEPTH = 4
+VALUE_DTYPES = ('float32', 'float16')
+
+# Rows timed for the latency comparison, and repeats (best one is reported)
+LATENCY_ROWS = 10000
+LATENCY_REPEATS = 3
+
+def load_forest(model_path, model_info_path):
+    """
+    Load a pickled sklearn forest or a flat artifact as a FlatForest.
+
+    Returns:
+        tuple: (forest, model_info)
+    """
+    if model_path.endswith('.npz') or os.path.isdir(model_path):
+        forest = FlatForest.load(model_path, mmap_mode=None)
+        return forest, dict(forest.metadata)
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    model_info = {}
+    if os.path.exists(model_info_path):
+        with open(model_info_path, 'rb') as f:
+            model_info = {key: value for key, value in pickle.load(f).items() if key != 'model'}
+    return FlatForest.from_sklearn(model, metadata=_to_json_compatible(model_info)), model_info
+
+def quantize(forest, value_dtype='float32'):
+    """
+    Store thresholds as float32 and values as ``value_dtype``.
+
+    Each threshold is rounded down to the nearest float32, so ``x > t`` is
+    unchanged for every float32 ``x`` (the trees compare float32 features).
+
+    Returns:
+        FlatForest: Quantized copy
+    """
+    thresholds = forest.threshold.astype(np.float32)
+    rounded_up = thresholds.astype(np.float64) > forest.threshold
+    thresholds[rounded_up] = np.nextafter(thresholds[rounded_up], np.float32(-np.inf))
+    return FlatForest(
+        feature=forest.feature,
+        threshold=thresholds,
+        children=forest.children,
+        value=forest.value.astype(value_dtype),
+        roots=forest.roots,
+        max_depth=forest.max_depth,
+        feature_importances=forest.feature_importances_,
+        metadata=dict(forest.metadata),
+    )
+
+def model_bytes(forest):
+    """Bytes of the arrays needed for prediction."""
+    return int(sum(getattr(forest, name).nbytes for name in ARRAY_NAMES))
+
+def _within_budget(metrics, reference, max_mae_increase, max_r2_drop):
+    return (metrics['mae'] <= reference['mae'] + max_mae_increase
+            and metrics['r2'] >= reference['r2'] - max_r2_drop)
+
+def select_trees(selection_predictions, y_selection, validation_predictions, y_validation, reference,
+                 max_mae_increase, max_r2_drop):
+    """
+    Greedy forward selection of trees until the budget is met.
+
+    Each step adds the tree whose inclusion gives the lowest squared error
+    on the selection rows; the budget is checked on the validation rows.
+
+    Args:
+        selection_predictions (np.ndarray): T x N per-tree predictions on the selection rows
+        y_selection (np.ndarray): Targets of the selection rows
+        validation_predictions (np.ndarray): T x M per-tree predictions on the validation rows
+        y_validation (np.ndarray): Targets of the validation rows
+        reference (dict): Metrics of the full model on the validation rows
+        max_mae_increase (float): Allowed MAE increase
+        max_r2_drop (float): Allowed R² decrease
+
+    Returns:
+        tuple: (tree indices, validation metrics), or (None, None) when even
+        all trees miss the budget
+    """
+    n_trees = len(selection_predictions)
+    # Squared error of a mean is expanded so each step costs one matrix-vector product
+    tree_dot_y = selection_predictions @ y_selection
+    tree_norms = np.einsum('ij,ij->i', selection_predictions, selection_predictions)
+    total = np.zeros(len(y_selection))
+    validation_total = np.zeros(len(y_validation))
+    available = np.ones(n_trees, dtype=bool)
+    selected = []
+
+    for k in range(1, n_trees + 1):
+        total_norm = total @ total
+        cross = selection_predictions @ total
+        sum_norms = total_norm + 2 * cross + tree_norms
+        sum_dot_y = total @ y_selection + tree_dot_y
+        errors = sum_norms / k ** 2 - 2 * sum_dot_y / k
+        errors[~available] = np.inf
+        best = int(np.argmin(errors))
+
+        selected.append(best)
+        available[best] = False
+        total += selection_predictions[best]
+        validation_total += validation_predictions[best]
+        metrics = evaluate(None, None, y_validation, validation_total / k)
+        if _within_budget(metrics, reference, max_mae_increase, max_r2_drop):
+            return selected, metrics
+    return None, None
+
+def time_prediction(forest, X):
+    """Best-of-N seconds for mean and per-tree spread, as the predictor computes them."""
+    best = float('inf')
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        per_tree = forest.predict_trees(X)
+        per_tree.sum(axis=0) / len(per_tree)
+        np.std(per_tree, axis=0)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _describe(forest, metrics, X_latency):
+    return {
+        'trees': forest.n_trees,
+        'nodes': forest.n_nodes,
+        'max_depth': forest.max_depth,
+        'bytes': model_bytes(forest),
+        'latency_ms': time_prediction(forest, X_latency) * 1000,
+        **metrics,
+    }
+
+def compact_forest(forest, X, y, max_mae_increase=DEFAULT_MAX_MAE_INCREASE, max_r2_drop=DEFAULT_MAX_R2_DROP,
+                   value_dtype='float32', min_depth=DEFAULT_MIN_DEPTH, seed=42):
+    """
+    Smallest depth-cut, tree-subset, quantized forest within the accuracy budget.
+
+    Args:
+        forest (FlatForest): Full model
+        X (np.ndarray): Held-out feature matrix (not used for training)
+        y (np.ndarray): Held-out targets
+        max_mae_increase (float): Allowed MAE increase over the full model
+        max_r2_drop (float): Allowed R² decrease from the full model
+        value_dtype (str): 'float32' or 'float16' leaf values
+        min_depth (int): Shallowest depth tried
+        seed (int): Seed of the selection/validation split
+
+    Returns:
+        tuple: (compact FlatForest, report dict)
+
+    Raises:
+        ValueError: If no candidate meets the budget
+    """
+    order = np.random.default_rng(seed).permutation(len(y))
+    half = len(y) // 2
+    if half < 1:
+        raise ValueError("Compaction needs at least two held-out rows")
+    X_selection, y_selection = X[order[:half]], y[order[:half]]
+    X_validation, y_validation = X[order[half:]], y[order[half:]]
+    reference = evaluate(None, None, y_validation, forest.predict(X_validation))
+    X_latency = X[:LATENCY_ROWS]
+
+    candidates = []
+    best = None
+    for depth in range(min(min_depth, forest.max_depth), forest.max_depth + 1):
+        cut = quantize(forest.subset(max_depth=depth), value_dtype)
+        trees, metrics = select_trees(cut.predict_trees(X_selection), y_selection,
+                                      cut.predict_trees(X_validation), y_validation,
+                                      reference, max_mae_increase, max_r2_drop)
+        if trees is None:
+            candidates.append({'depth': depth, 'within_budget': False})
+            continue
+        compact = cut.subset(trees)
+        candidates.append({'depth': depth, 'within_budget': True, 'trees': compact.n_trees,
+                           'nodes': compact.n_nodes, **metrics})
+        if best is None or compact.n_nodes < best[0].n_nodes:
+            best = (compact, metrics)
+
+    if best is None:
+        raise ValueError(f"No compact model stays within the budget (MAE +{max_mae_increase}, "
+                         f"R² -{max_r2_drop}); loosen it or keep the full model")
+    compact, metrics = best
+
+    report = {
+        'budget': {'max_mae_increase': max_mae_increase, 'max_r2_drop': max_r2_drop},
+        'value_dtype': value_dtype,
+        'holdout_rows': {'selection': int(half), 'validation': int(len(y) - half)},
+        'latency_rows': int(len(X_latency)),
+        'before': _describe(forest, reference, X_latency),
+        'after': _describe(compact, metrics, X_latency),
+        'candidates': candidates,
+    }
+    return compact, report
+
+def print_report(report):
+    """Print the before/after table."""
+    before, after = report['before'], report['after']
+    print(f"{'':<16}{'before':>14}{'after':>14}{'change':>10}")
+    for key, label, fmt in (('trees', 'Trees', ',d'), ('nodes', 'Nodes', ',d'), ('max_depth', 'Max depth', 'd'),
+                            ('bytes', 'Size (bytes)', ',d'), ('latency_ms', 'Latency (ms)', '.1f'),
+                            ('mae', 'MAE', '.3f'), ('rmse', 'RMSE', '.3f'), ('r2', 'R²', '.4f')):
+        change = (after[key] / before[key] - 1) if before[key] else 0.0
+        print(f"{label:<16}{before[key]:>14{fmt}}{after[key]:>14{fmt}}{change:>+10.1%}")
+    print(f"Latency is for scoring {report['latency_rows']:,} rows with the per-tree spread; accuracy is on "
+          f"{report['holdout_rows']['validation']:,} validation rows")
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compact a trained forest within an accuracy budget.")
+    parser.add_argument('data', help="Held-out data with the target column (CSV, .columns or .parquet); "
+                                     "must not overlap the model's training rows")
+    parser.add_argument('--model', default='models/final_model.pkl',
+                        help="Pickled sklearn forest, .forest directory or .npz artifact")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle")
+    parser.add_argument('--output', default='models/final_model.compact.forest',
+                        help="Output .forest directory or .npz file (default: models/final_model.compact.forest)")
+    parser.add_argument('--max-mae-increase', type=float, default=DEFAULT_MAX_MAE_INCREASE,
+                        help=f"Allowed holdout MAE increase (default: {DEFAULT_MAX_MAE_INCREASE})")
+    parser.add_argument('--max-r2-drop', type=float, default=DEFAULT_MAX_R2_DROP,
+                        help=f"Allowed holdout R² decrease (default: {DEFAULT_MAX_R2_DROP})")
+    parser.add_argument('--value-dtype', choices=VALUE_DTYPES, default='float32',
+                        help="Storage type of node values (default: float32)")
+    parser.add_argument('--min-depth', type=int, default=DEFAULT_MIN_DEPTH,
+                        help=f"Shallowest tree depth tried (default: {DEFAULT_MIN_DEPTH})")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the selection/validation split")
+    parser.add_argument('--report', help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.max_mae_increase < 0 or args.max_r2_drop < 0:
+        parser.error("--max-mae-increase and --max-r2-drop must not be negative")
+    if args.min_depth < 1:
+        parser.error("--min-depth must be at least 1")
+    return args
+
+def main():
+    """Compact a model, save the artifact and print the report."""
+    args = parse_args()
+
+    try:
+        forest, model_info = load_forest(args.model, args.model_info)
+        target = model_info.get('training', {}).get('target', DEFAULT_TARGET)
+        X, y = load_training_data(args.data, model_info.get('features', DEFAULT_FEATURES), target)
+        start_time = time.perf_counter()
+        compact, report = compact_forest(forest, X, y, args.max_mae_increase, args.max_r2_drop,
+                                         args.value_dtype, args.min_depth, args.seed)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Searched {len(report['candidates'])} depths on {len(y):,} held-out rows "
+          f"in {time.perf_counter() - start_time:.1f}s")
+
+    report = _to_json_compatible(report)
+    metadata = dict(_to_json_compatible(model_info), compaction=report)
+    if 'calibration' in model_info:
+        # The old residuals describe the full model; recalibrate on the validation half
+        order = np.random.default_rng(args.seed).permutation(len(y))[len(y) // 2:]
+        metadata['calibration'] = calibrate(y[order], compact.predict(X[order]))
+    compact.metadata = metadata
+    compact.save(args.output)
+
+    print_report(report)
+    print(f"Compact model saved to {args.output}")
+    if args.report:
+        with open(args.report + '.tmp', 'w') as f:
+            json.dump(report, f, indent=2)
+        os.replace(args.report + '.tmp', args.report)
+        print(f"Report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
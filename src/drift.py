@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Constant-memory monitoring of input drift against the training data.
+
+At training time each feature's distribution is summarized as
+``model_info['drift_reference']``: count, mean, standard deviation,
+min/max and the proportions of equal-frequency bins of the training rows.
+
+At inference a DriftMonitor keeps the same summary for every scored row
+without keeping the rows: running mean and variance (merged per batch with
+the parallel form of Welford's algorithm), min/max, values outside the
+training range, and counts in the reference bins. Validation lets extreme
+values through with a warning, so the moments are taken on values clipped
+to the training range widened by its own width on each side; one 1e200
+would otherwise overflow the variance for good. The out-of-range counts
+and min/max still record the unclipped values. An update is one
+vectorized pass per batch, a few percent of scoring time. ``snapshot()``
+compares the counts to the reference:
+    - PSI (population stability index) over the reference bins; the usual
+      reading is < 0.1 stable, 0.1-0.25 a moderate shift, > 0.25 drift
+    - KS-style distance: the largest gap between the two CDFs at the bin
+      edges (a lower bound on the exact KS statistic)
+    - mean shift in reference standard deviations
+
+Usage:
+    python src/drift.py data/students.csv                  # store reference stats for an existing model
+    python src/drift.py data/new_students.csv --check      # drift of a dataset against them
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import threading
+import numpy as np
+
+DEFAULT_N_BINS = 20
+# Proportions are floored here so empty bins keep PSI finite
+PSI_EPSILON = 1e-4
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+# Fewer rows than this give noisy bin proportions, so no status is assigned
+MIN_STATUS_ROWS = 100
+
+def reference_stats(X, features, n_bins=DEFAULT_N_BINS):
+    """
+    Per-feature reference distribution of the training rows.
+
+    Args:
+        X (np.ndarray): N x F training feature matrix
+        features (list): Feature names in column order
+        n_bins (int): Equal-frequency bins per feature
+
+    Returns:
+        dict: JSON-compatible reference for ``model_info['drift_reference']``
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if not len(X):
+        raise ValueError("Drift reference needs at least one row")
+
+    reference = {'n_bins': n_bins, 'features': {}}
+    for j, feature in enumerate(features):
+        column = X[:, j]
+        # Repeated quantiles (integer-valued features) collapse into one edge
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, column, side='right'), minlength=len(edges) + 1)
+        reference['features'][feature] = {
+            'count': int(len(column)),
+            'mean': float(column.mean()),
+            'std': float(column.std()),
+            'min': float(column.min()),
+            'max': float(column.max()),
+            'bin_edges': edges.tolist(),
+            'bin_proportions': (counts / len(column)).tolist(),
+        }
+    return reference
+
+def psi(expected, actual):
+    """Population stability index between two sets of bin proportions."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def drift_status(psi_value):
+    """'stable', 'warning' or 'drift' for a PSI value."""
+    if psi_value >= PSI_DRIFT:
+        return 'drift'
+    if psi_value >= PSI_WARNING:
+        return 'warning'
+    return 'stable'
+
+class DriftMonitor:
+    """
+    Running per-feature statistics of scored inputs, compared to a reference.
+
+    Memory is fixed by the number of features and bins, whatever the number
+    of rows seen. Updates and snapshots are thread-safe.
+
+    Args:
+        reference (dict): Output of reference_stats()
+        features (list): Feature names in the column order of updated batches
+    """
+
+    def __init__(self, reference, features):
+        missing = [feature for feature in features if feature not in reference['features']]
+        if missing:
+            raise ValueError(f"Drift reference has no statistics for: {', '.join(missing)}")
+        self.reference = reference
+        self.features = list(features)
+        stats = [reference['features'][feature] for feature in self.features]
+        self._edges = [np.asarray(s['bin_edges'], dtype=np.float64) for s in stats]
+        self._ref_min = np.array([s['min'] for s in stats])
+        self._ref_max = np.array([s['max'] for s in stats])
+        span = self._ref_max - self._ref_min
+        self._clip_low = self._ref_min - span
+        self._clip_high = self._ref_max + span
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every row seen so far."""
+        n_features = len(self.features)
+        with self._lock:
+            self._count = 0
+            self._mean = np.zeros(n_features)
+            self._m2 = np.zeros(n_features)
+            self._min = np.full(n_features, np.inf)
+            self._max = np.full(n_features, -np.inf)
+            self._below = np.zeros(n_features, dtype=np.int64)
+            self._above = np.zeros(n_features, dtype=np.int64)
+            self._bin_counts = [np.zeros(len(edges) + 1, dtype=np.int64) for edges in self._edges]
+
+    def update(self, features_array):
+        """
+        Add a batch of scored rows.
+
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+        """
+        n = len(features_array)
+        if not n:
+            return
+        clipped = np.clip(features_array, self._clip_low, self._clip_high)
+        batch_mean = clipped.mean(axis=0)
+        batch_m2 = ((clipped - batch_mean) ** 2).sum(axis=0)
+        batch_min = features_array.min(axis=0)
+        batch_max = features_array.max(axis=0)
+        below = np.count_nonzero(features_array < self._ref_min, axis=0)
+        above = np.count_nonzero(features_array > self._ref_max, axis=0)
+        bin_counts = [np.bincount(np.searchsorted(edges, features_array[:, j], side='right'),
+                                  minlength=len(edges) + 1)
+                      for j, edges in enumerate(self._edges)]
+
+        with self._lock:
+            # Chan et al.'s pairwise merge of (count, mean, M2)
+            total = self._count + n
+            delta = batch_mean - self._mean
+            self._mean += delta * (n / total)
+            self._m2 += batch_m2 + delta ** 2 * (self._count * n / total)
+            self._count = total
+            np.minimum(self._min, batch_min, out=self._min)
+            np.maximum(self._max, batch_max, out=self._max)
+            self._below += below
+            self._above += above
+            for counts, batch_counts in zip(self._bin_counts, bin_counts):
+                counts += batch_counts
+
+    def snapshot(self):
+        """
+        Drift of the rows seen so far from the reference.
+
+        Returns:
+            dict: 'rows' and 'status' (the worst feature status), and per
+            feature in 'features': count, mean, std, min, max, the fraction
+            of values outside the training range, PSI, KS distance, mean
+            shift in reference standard deviations and status. Statistics
+            are None before any row is seen, and statuses are None until
+            MIN_STATUS_ROWS rows have been seen.
+        """
+        with self._lock:
+            count = self._count
+            mean = self._mean.copy()
+            m2 = self._m2.copy()
+            observed_min = self._min.copy()
+            observed_max = self._max.copy()
+            out_of_range = self._below + self._above
+            bin_counts = [counts.copy() for counts in self._bin_counts]
+
+        features = {}
+        statuses = []
+        for j, feature in enumerate(self.features):
+            ref = self.reference['features'][feature]
+            if not count:
+                features[feature] = {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None,
+                                     'out_of_range_fraction': None, 'psi': None, 'ks': None,
+                                     'mean_shift_std': None, 'status': None}
+                continue
+            proportions = bin_counts[j] / count
+            expected = np.asarray(ref['bin_proportions'])
+            psi_value = psi(expected, proportions)
+            ks = float(np.abs(np.cumsum(proportions) - np.cumsum(expected))[:-1].max(initial=0.0))
+            std = float(np.sqrt(m2[j] / count))
+            status = drift_status(psi_value) if count >= MIN_STATUS_ROWS else None
+            if status is not None:
+                statuses.append(status)
+            features[feature] = {
+                'count': count,
+                'mean': float(mean[j]),
+                'std': std,
+                'min': float(observed_min[j]),
+                'max': float(observed_max[j]),
+                'out_of_range_fraction': float(out_of_range[j] / count),
+                'psi': psi_value,
+                'ks': ks,
+                'mean_shift_std': float((mean[j] - ref['mean']) / ref['std']) if ref['std'] else None,
+                'status': status,
+            }
+
+        order = ['stable', 'warning', 'drift']
+        status = max(statuses, key=order.index) if statuses else None
+        return {'rows': count, 'status': status, 'features': features}
+
+def format_snapshot(snapshot):
+    """Table of a snapshot() for the CLIs."""
+    lines = [f"Input drift over {snapshot['rows']:,} rows: {snapshot['status'] or 'too few rows to judge'}"]
+    if not snapshot['rows']:
+        return '\n'.join(lines)
+    lines.append(f"  {'feature':<18}{'mean':>10}{'std':>10}{'shift sd':>10}{'outside':>10}{'PSI':>8}{'KS':>8}  status")
+    for feature, stats in snapshot['features'].items():
+        shift = f"{stats['mean_shift_std']:+.2f}" if stats['mean_shift_std'] is not None else '-'
+        lines.append(f"  {feature:<18}{stats['mean']:>10.2f}{stats['std']:>10.2f}{shift:>10}"
+                     f"{stats['out_of_range_fraction']:>10.1%}{stats['psi']:>8.3f}{stats['ks']:>8.3f}  {stats['status'] or '-'}")
+    return '\n'.join(lines)
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Store or check input drift reference statistics for a model.")
+    parser.add_argument('data', help="Training data to summarize, or new data with --check (CSV, .columns or .parquet)")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle to update")
+    parser.add_argument('--n-bins', type=int, default=DEFAULT_N_BINS,
+                        help=f"Equal-frequency bins per feature (default: {DEFAULT_N_BINS})")
+    parser.add_argument('--check', action='store_true',
+                        help="Only report the data's drift from the stored reference")
+    args = parser.parse_args(argv)
+    if args.n_bins < 2:
+        parser.error("--n-bins must be at least 2")
+    return args
+
+def main():
+    """Summarize training data into the model info, or check new data against it."""
+    args = parse_args()
+    from train import DEFAULT_TARGET, load_training_data
+
+    try:
+        with open(args.model_info, 'rb') as f:
+            model_info = pickle.load(f)
+        target = model_info.get('training', {}).get('target', DEFAULT_TARGET)
+        X, _ = load_training_data(args.data, model_info['features'], target)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.check:
+        if 'drift_reference' not in model_info:
+            print(f"Error: {args.model_info} has no drift reference; run without --check first")
+            sys.exit(1)
+        monitor = DriftMonitor(model_info['drift_reference'], model_info['features'])
+        monitor.update(np.asarray(X, dtype=np.float64))
+        print(format_snapshot(monitor.snapshot()))
+        return
+
+    model_info = dict(model_info, drift_reference=reference_stats(X, model_info['features'], args.n_bins))
+    with open(args.model_info + '.tmp', 'wb') as f:
+        pickle.dump(model_info, f)
+    os.replace(args.model_info + '.tmp', args.model_info)
+    print(f"Stored drift reference for {len(model_info['features'])} features from {len(X):,} rows in {args.model_info}")
+    if os.path.isdir(os.path.join(os.path.dirname(args.model_info), 'final_model.forest')):
+        print("Re-export the .forest artifact (src/forest.py) so it embeds the new reference")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Flat-array random forest inference engine.
+
+Exports a trained sklearn RandomForestRegressor into contiguous NumPy arrays
+(one entry per node across all trees) and evaluates whole batches with plain
+NumPy, walking every tree level by level. Loading the exported artifact does
+not import scikit-learn.
+
+Per-student explanations use decision-path attribution: walking from the
+root to a leaf, each split moves the prediction from the parent's mean to
+the child's, and that change is credited to the split feature. Since each
+leaf has exactly one path, the per-feature sums are precomputed once per
+node (``node_contributions``) and saved with the artifact, so explaining a
+batch is the usual traversal plus one table gather per tree.
+
+Two artifact formats are supported:
+    - a ``.forest`` directory of raw ``.npy`` arrays plus ``metadata.json``,
+      memory-mapped read-only so every worker on a host shares one
+      page-cache copy of the forest
+    - a single ``.npz`` file, read fully into each process
+
+Usage:
+    python src/forest.py models/final_model.pkl models/final_model.forest
+"""
+
+import argparse
+import json
+import pickle
+import os
+import shutil
+import sys
+import time
+import numpy as np
+
+# Rows evaluated together; bounds the (trees x rows) working arrays
+DEFAULT_BLOCK_SIZE = 512
+
+# Directory suffix of the memory-mappable artifact format
+FLAT_MODEL_SUFFIX = '.forest'
+
+# Per-node and per-tree arrays stored as individual .npy files
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+class FlatForest:
+    """
+    A random forest stored as flat per-node arrays.
+
+    Node ``i`` tests ``X[:, feature[i]] <= threshold[i]`` and continues to
+    ``children[2*i]`` (true) or ``children[2*i + 1]`` (false). Leaves point
+    back to themselves, so every tree can be advanced a fixed ``max_depth``
+    steps regardless of its shape.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 feature_importances=None, metadata=None, node_contributions=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_importances_ = feature_importances
+        self.metadata = metadata or {}
+        self._node_contributions = node_contributions
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def n_features(self):
+        if self.feature_importances_ is not None:
+            return len(self.feature_importances_)
+        return int(self.feature.max()) + 1 if self.n_nodes else 0
+
+    @property
+    def node_contributions(self):
+        """
+        Per-feature change in the tree's mean from its root to each node.
+
+        Built on first use for artifacts saved without it.
+
+        Returns:
+            np.ndarray: n_nodes x n_features float32 table; row ``leaf``
+            sums to ``value[leaf] - value[root]``
+        """
+        if self._node_contributions is None:
+            self._node_contributions = self._build_node_contributions()
+        return self._node_contributions
+
+    def _build_node_contributions(self):
+        table = np.zeros((self.n_nodes, self.n_features), dtype=np.float64)
+        value = self.value.astype(np.float64)
+        left = self.children[0::2]
+        right = self.children[1::2]
+        is_internal = left != np.arange(self.n_nodes, dtype=left.dtype)
+
+        # Top-down, one tree level at a time across all trees
+        parents = self.roots[is_internal[self.roots]]
+        while len(parents):
+            split_feature = self.feature[parents]
+            for side in (left, right):
+                nodes = side[parents]
+                table[nodes] = table[parents]
+                table[nodes, split_feature] += value[nodes] - value[parents]
+            nodes = np.concatenate([left[parents], right[parents]])
+            parents = nodes[is_internal[nodes]]
+        return table.astype(np.float32)
+
+    def subset(self, trees=None, max_depth=None):
+        """
+        Copy of the forest restricted to some trees and cut off at a depth.
+
+        Nodes at ``max_depth`` become leaves predicting their own value (the
+        training mean of the samples reaching them), and nodes that are no
+        longer reachable are dropped.
+
+        Args:
+            trees (array-like): Indices of the trees to keep (default: all)
+            max_depth (int): Depth at which every tree is cut (default: no cut)
+
+        Returns:
+            FlatForest: New forest with the same dtypes and metadata
+        """
+        roots = self.roots if trees is None else self.roots[np.asarray(trees, dtype=np.int64)]
+        max_depth = self.max_depth if max_depth is None else max_depth
+        left = self.children[0::2]
+        right = self.children[1::2]
+        is_leaf = left == np.arange(self.n_nodes, dtype=left.dtype)
+
+        # Reachable nodes, one level at a time down to max_depth
+        levels = [roots]
+        for _ in range(max_depth):
+            parents = levels[-1][~is_leaf[levels[-1]]]
+            if not len(parents):
+                break
+            levels.append(np.concatenate([left[parents], right[parents]]))
+        if len(levels) > max_depth:
+            is_leaf = is_leaf.copy()
+            is_leaf[levels[max_depth]] = True
+
+        kept = np.sort(np.concatenate(levels))
+        new_index = np.full(self.n_nodes, -1, dtype=np.int64)
+        new_index[kept] = np.arange(len(kept))
+        kept_leaf = is_leaf[kept]
+        own = np.arange(len(kept))
+        children = np.column_stack([
+            np.where(kept_leaf, own, new_index[left[kept]]),
+            np.where(kept_leaf, own, new_index[right[kept]]),
+        ]).ravel()
+
+        return FlatForest(
+            feature=np.where(kept_leaf, 0, self.feature[kept]).astype(self.feature.dtype),
+            threshold=np.where(kept_leaf, 0, self.threshold[kept]).astype(self.threshold.dtype),
+            children=children.astype(self.children.dtype),
+            value=self.value[kept],
+            roots=new_index[roots].astype(self.roots.dtype),
+            max_depth=len(levels) - 1,
+            feature_importances=self.feature_importances_,
+            metadata=dict(self.metadata),
+        )
+
+    @classmethod
+    def from_sklearn(cls, model, metadata=None):
+        """
+        Flatten a fitted sklearn RandomForestRegressor.
+
+        Args:
+            model: Fitted forest with ``estimators_`` of single-output trees
+            metadata (dict): Optional JSON-serializable model info to embed
+
+        Returns:
+            FlatForest: Equivalent flat forest
+        """
+        if not hasattr(model, 'estimators_'):
+            raise ValueError(f"Expected a fitted tree ensemble, got {type(model).__name__}")
+
+        features, thresholds, children, values, roots = [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Only single-output regression forests can be flattened")
+
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.column_stack([left, right]).ravel())
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        importances = getattr(model, 'feature_importances_', None)
+        forest = cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            feature_importances=None if importances is None else np.asarray(importances, dtype=np.float64),
+            metadata=metadata,
+        )
+        # Precomputed here so save() stores the table with the artifact
+        forest._node_contributions = forest._build_node_contributions()
+        return forest
+
+    def save(self, path):
+        """
+        Write the forest to disk.
+
+        Paths ending in ``.npz`` get a single uncompressed archive; any other
+        path is written as a memory-mappable directory of ``.npy`` files.
+        """
+        if path.endswith('.npz'):
+            self._save_npz(path)
+        else:
+            self._save_directory(path)
+
+    def _arrays(self):
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES}
+        if self.feature_importances_ is not None:
+            arrays['feature_importances'] = self.feature_importances_
+        if self._node_contributions is not None:
+            arrays['node_contributions'] = self._node_contributions
+        return arrays
+
+    def _save_npz(self, path):
+        arrays = self._arrays()
+        arrays['max_depth'] = np.asarray(self.max_depth)
+        arrays['metadata'] = np.asarray(json.dumps(self.metadata))
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def _save_directory(self, path):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path)
+        for name, array in self._arrays().items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, 'metadata.json'), 'w') as f:
+            json.dump({'max_depth': self.max_depth, 'model_info': self.metadata}, f, indent=2)
+
+        # Swap the directory in by rename so running workers keep their
+        # mappings of the old files and new workers never see a partial write
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a forest written by :meth:`save`.
+
+        Args:
+            path (str): ``.npz`` file or ``.forest`` directory
+            mmap_mode (str): Memory-map mode for directory artifacts, or None to read into memory
+
+        Returns:
+            FlatForest: The loaded forest
+        """
+        if os.path.isdir(path):
+            return cls._load_directory(path, mmap_mode)
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                children=data['children'],
+                value=data['value'],
+                roots=data['roots'],
+                max_depth=int(data['max_depth']),
+                feature_importances=data['feature_importances'] if 'feature_importances' in data else None,
+                metadata=json.loads(str(data['metadata'])),
+                node_contributions=data['node_contributions'] if 'node_contributions' in data else None,
+            )
+
+    @classmethod
+    def _load_directory(cls, path, mmap_mode):
+        with open(os.path.join(path, 'metadata.json')) as f:
+            metadata = json.load(f)
+
+        def load_array(name):
+            array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            # Plain ndarray view of the mapping keeps NumPy ops on the fast path
+            return array.view(np.ndarray)
+
+        def load_optional(name):
+            return load_array(name) if os.path.exists(os.path.join(path, f"{name}.npy")) else None
+
+        return cls(
+            **{name: load_array(name) for name in ARRAY_NAMES},
+            max_depth=metadata['max_depth'],
+            feature_importances=load_optional('feature_importances'),
+            metadata=metadata['model_info'],
+            node_contributions=load_optional('node_contributions'),
+        )
+
+    def _leaf_blocks(self, X, block_size):
+        """
+        Yield (start, leaves) per block of rows, ``leaves`` being the T x B
+        node each tree reaches for each row in the block.
+        """
+        # Trees compare float32 features against float64 thresholds, like sklearn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+
+        for start in range(0, n_rows, block_size):
+            block = X[start:start + block_size]
+            flat_block = block.ravel()
+            row_offsets = np.arange(len(block), dtype=np.int32) * n_features
+
+            # Reused per-level buffers; node indices are always in range, so
+            # np.take(mode='clip') skips the bounds-check error path
+            nodes = np.repeat(self.roots[:, None], len(block), axis=1)
+            next_nodes = np.empty_like(nodes)
+            x = np.empty(nodes.shape, dtype=np.float32)
+            thresholds = np.empty(nodes.shape, dtype=self.threshold.dtype)
+            go_right = np.empty(nodes.shape, dtype=bool)
+
+            for _ in range(self.max_depth):
+                np.take(self.feature, nodes, mode='clip', out=next_nodes)
+                next_nodes += row_offsets
+                np.take(flat_block, next_nodes, mode='clip', out=x)
+                np.take(self.threshold, nodes, mode='clip', out=thresholds)
+                np.greater(x, thresholds, out=go_right)
+                nodes *= 2
+                nodes += go_right
+                np.take(self.children, nodes, mode='clip', out=next_nodes)
+                nodes, next_nodes = next_nodes, nodes
+
+            yield start, nodes
+
+    def predict_trees(self, X, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Evaluate every tree on every row.
+
+        Args:
+            X (np.ndarray): N x F feature matrix
+            block_size (int): Rows traversed together
+
+        Returns:
+            np.ndarray: T x N leaf values, one row per tree
+        """
+        out = np.empty((self.n_trees, len(X)), dtype=np.float64)
+        for start, leaves in self._leaf_blocks(X, block_size):
+            out[:, start:start + leaves.shape[1]] = np.take(self.value, leaves, mode='clip')
+        return out
+
+    def predict_contributions(self, X, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Per-feature contributions to each row's prediction.
+
+        ``bias + contributions[i].sum()`` equals ``predict(X)[i]`` up to
+        float32 rounding of the precomputed table.
+
+        Args:
+            X (np.ndarray): N x F feature matrix
+            block_size (int): Rows traversed together
+
+        Returns:
+            tuple: (bias, contributions) - the mean root value over all
+            trees, and an N x F array averaged over the trees
+        """
+        table = self.node_contributions
+        out = np.empty((len(X), table.shape[1]), dtype=np.float64)
+        for start, leaves in self._leaf_blocks(X, block_size):
+            # T x B x F gather of each reached leaf's path sums, averaged over trees
+            out[start:start + leaves.shape[1]] = np.take(table, leaves, axis=0).sum(axis=0, dtype=np.float64)
+        out /= self.n_trees
+        return float(np.take(self.value, self.roots).mean(dtype=np.float64)), out
+
+    def predict(self, X):
+        """Mean prediction over all trees for an N x F feature matrix."""
+        return self.predict_trees(X).sum(axis=0) / self.n_trees
+
+def export_model(model_path, output_path, model_info_path=None):
+    """
+    Flatten a pickled forest (and its model info) into a flat artifact.
+
+    Args:
+        model_path (str): Path to the pickled sklearn forest
+        output_path (str): Destination ``.forest`` directory or ``.npz`` file
+        model_info_path (str): Optional model info pickle to embed as metadata
+
+    Returns:
+        FlatForest: The exported forest
+    """
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+
+    metadata = {}
+    if model_info_path and os.path.exists(model_info_path):
+        with open(model_info_path, 'rb') as f:
+            model_info = pickle.load(f)
+        # The fitted model itself is stored as arrays; keep only plain info
+        metadata = {key: value for key, value in model_info.items() if key != 'model'}
+
+    forest = FlatForest.from_sklearn(model, metadata=_to_json_compatible(metadata))
+    forest.save(output_path)
+    return forest
+
+def _to_json_compatible(obj):
+    """Convert NumPy scalars in nested model info to plain Python values."""
+    if isinstance(obj, dict):
+        return {key: _to_json_compatible(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json_compatible(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+def main():
+    """Export a pickled forest to the flat-array format and check it against sklearn."""
+    parser = argparse.ArgumentParser(description="Export a trained forest to flat NumPy arrays.")
+    parser.add_argument('model', nargs='?', default='models/final_model.pkl', help="Pickled sklearn forest")
+    parser.add_argument('output', nargs='?', default=f'models/final_model{FLAT_MODEL_SUFFIX}',
+                        help=f"Output {FLAT_MODEL_SUFFIX} directory (memory-mappable) or .npz file")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle to embed")
+    args = parser.parse_args()
+
+    try:
+        forest = export_model(args.model, args.output, args.model_info)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Exported {forest.n_trees} trees ({forest.n_nodes} nodes, max depth {forest.max_depth}) to {args.output}")
+
+    # Verify against sklearn on random in-range inputs
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    n_features = model.n_features_in_
+    X = np.random.default_rng(0).uniform(0, 300, size=(10000, n_features))
+
+    start = time.perf_counter()
+    expected = np.stack([tree.predict(X.astype(np.float32), check_input=False) for tree in model.estimators_])
+    sklearn_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = forest.predict_trees(X)
+    flat_time = time.perf_counter() - start
+
+    max_error = np.abs(actual - expected).max()
+    print(f"Max per-tree difference vs sklearn: {max_error:.3g}")
+    print(f"10,000 rows: sklearn {sklearn_time * 1000:.1f} ms, flat {flat_time * 1000:.1f} ms")
+    if not np.allclose(actual, expected):
+        print("Error: flat forest predictions do not match sklearn")
+        sys.exit(1)
+
+    bias, contributions = forest.predict_contributions(X)
+    path_error = np.abs(bias + contributions.sum(axis=1) - actual.mean(axis=0)).max()
+    print(f"Max difference between contribution sums and predictions: {path_error:.3g}")
+
+if __name__ == "__main__":
+    main()
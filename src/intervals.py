@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Calibrated prediction intervals from held-out residuals.
+
+At training time the absolute residuals |y - prediction| on the holdout set
+are grouped into equal-frequency bins of the predicted score, and each bin
+keeps its residual quantiles on a fixed grid of coverage levels
+(split-conformal ranks, so each level is covered at least nominally on
+exchangeable data). The table is stored as ``model_info['calibration']``.
+
+At inference an interval is one binary search per row into the bin edges
+and one table lookup, so a batch with intervals costs about the same as
+plain point prediction; no per-tree predictions are needed. The one-sigma
+half-width also replaces the per-tree spread as the ``confidence`` score.
+
+Usage:
+    python src/intervals.py data/holdout.csv             # calibrate an existing model
+    python src/intervals.py data/new_holdout.csv --check # coverage of the stored calibration
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import numpy as np
+
+DEFAULT_LEVEL = 0.9
+DEFAULT_N_BINS = 10
+# Bins are merged until each holds at least this many residuals
+MIN_BIN_SIZE = 50
+# Coverage levels stored per bin; other levels are interpolated between them
+QUANTILE_LEVELS = np.round(np.arange(0.01, 1.0, 0.01), 2)
+# Level whose half-width stands in for one standard deviation in ``confidence``
+ONE_SIGMA_LEVEL = 0.6827
+CHECK_LEVELS = [0.5, 0.8, 0.9, 0.95]
+
+def calibrate(y_true, predictions, n_bins=DEFAULT_N_BINS):
+    """
+    Residual quantiles per predicted-score bin.
+
+    Args:
+        y_true (np.ndarray): Held-out targets
+        predictions (np.ndarray): Model predictions for the same rows
+        n_bins (int): Equal-frequency bins of the predicted score
+
+    Returns:
+        dict: JSON-compatible calibration table for ``model_info['calibration']``
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    predictions = np.asarray(predictions, dtype=np.float64)
+    residuals = np.abs(y_true - predictions)
+    if not len(residuals):
+        raise ValueError("Calibration needs at least one held-out row")
+
+    n_bins = max(1, min(n_bins, len(residuals) // MIN_BIN_SIZE))
+    bin_edges = np.unique(np.quantile(predictions, np.linspace(0, 1, n_bins + 1)[1:-1]))
+    bins = np.searchsorted(bin_edges, predictions, side='right')
+
+    half_widths = []
+    bin_sizes = []
+    for b in range(len(bin_edges) + 1):
+        bin_residuals = np.sort(residuals[bins == b])
+        if not len(bin_residuals):
+            bin_residuals = np.sort(residuals)
+        # Split-conformal rank: the ceil((n + 1) * level)-th smallest residual, capped at the largest
+        n = len(bin_residuals)
+        ranks = np.minimum(np.ceil((n + 1) * QUANTILE_LEVELS).astype(np.int64), n) - 1
+        half_widths.append(bin_residuals[ranks].tolist())
+        bin_sizes.append(int(np.count_nonzero(bins == b)))
+
+    return {
+        'method': 'binned_absolute_residuals',
+        'levels': QUANTILE_LEVELS.tolist(),
+        'bin_edges': bin_edges.tolist(),
+        'half_widths': half_widths,
+        'bin_sizes': bin_sizes,
+        'n_samples': int(len(residuals)),
+    }
+
+class PredictionIntervals:
+    """
+    Interval lookup for one coverage level.
+
+    Args:
+        calibration (dict): Output of calibrate()
+        level (float): Target coverage, e.g. 0.9 for a 90% interval
+    """
+
+    def __init__(self, calibration, level=DEFAULT_LEVEL):
+        levels = np.asarray(calibration['levels'])
+        if not levels[0] <= level <= levels[-1]:
+            raise ValueError(f"Interval level must be between {levels[0]} and {levels[-1]}, got {level}")
+        table = np.asarray(calibration['half_widths'], dtype=np.float64)
+        self.level = level
+        self.bin_edges = np.asarray(calibration['bin_edges'], dtype=np.float64)
+        # Per-bin half-widths at the requested level, and at one sigma for confidences
+        self.half_widths = np.array([np.interp(level, levels, row) for row in table])
+        self.sigmas = np.array([np.interp(ONE_SIGMA_LEVEL, levels, row) for row in table])
+
+    def _bins(self, scores):
+        return np.searchsorted(self.bin_edges, scores, side='right')
+
+    def bounds(self, scores):
+        """
+        Lower and upper bounds for a batch of predicted scores, clipped to 0-100.
+
+        Args:
+            scores (np.ndarray): Predicted scores
+
+        Returns:
+            tuple: (lower, upper) arrays
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        half_widths = self.half_widths[self._bins(scores)]
+        return np.clip(scores - half_widths, 0, 100), np.clip(scores + half_widths, 0, 100)
+
+    def confidences(self, scores):
+        """``100 - 10 * sigma`` like the per-tree confidence, with sigma taken from the calibration."""
+        return np.maximum(0, 100 - self.sigmas[self._bins(np.asarray(scores, dtype=np.float64))] * 10)
+
+def coverage(calibration, y_true, predictions, levels=CHECK_LEVELS):
+    """
+    Fraction of rows whose target falls inside the interval, per level.
+
+    Args:
+        calibration (dict): Output of calibrate()
+        y_true (np.ndarray): Targets
+        predictions (np.ndarray): Model predictions
+        levels (list): Coverage levels to check
+
+    Returns:
+        dict: level -> (empirical coverage, mean interval width)
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    report = {}
+    for level in levels:
+        lower, upper = PredictionIntervals(calibration, level).bounds(predictions)
+        inside = (y_true >= lower) & (y_true <= upper)
+        report[level] = (float(inside.mean()), float((upper - lower).mean()))
+    return report
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Calibrate prediction intervals for a trained model.")
+    parser.add_argument('data', help="Held-out data with the target column (CSV, .columns or .parquet); "
+                                     "must not overlap the model's training rows")
+    parser.add_argument('--model', default='models/final_model.pkl', help="Pickled model")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle to update")
+    parser.add_argument('--n-bins', type=int, default=DEFAULT_N_BINS,
+                        help=f"Predicted-score bins (default: {DEFAULT_N_BINS})")
+    parser.add_argument('--check', action='store_true',
+                        help="Only report the stored calibration's coverage on the data")
+    args = parser.parse_args(argv)
+    if args.n_bins < 1:
+        parser.error("--n-bins must be at least 1")
+    return args
+
+def main():
+    """Calibrate (or check) a saved model's intervals on held-out data."""
+    args = parse_args()
+    from train import DEFAULT_TARGET, load_training_data
+
+    try:
+        with open(args.model, 'rb') as f:
+            model = pickle.load(f)
+        with open(args.model_info, 'rb') as f:
+            model_info = pickle.load(f)
+        target = model_info.get('training', {}).get('target', DEFAULT_TARGET)
+        X, y = load_training_data(args.data, model_info['features'], target)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    predictions = model.predict(X)
+
+    if args.check:
+        if 'calibration' not in model_info:
+            print(f"Error: {args.model_info} has no calibration; run without --check first")
+            sys.exit(1)
+        calibration = model_info['calibration']
+    else:
+        calibration = calibrate(y, predictions, args.n_bins)
+        model_info = dict(model_info, calibration=calibration)
+        with open(args.model_info + '.tmp', 'wb') as f:
+            pickle.dump(model_info, f)
+        os.replace(args.model_info + '.tmp', args.model_info)
+        print(f"Calibrated on {len(y):,} rows in {len(calibration['half_widths'])} bins; saved to {args.model_info}")
+        if os.path.isdir(os.path.splitext(args.model)[0] + '.forest'):
+            print("Re-export the .forest artifact (src/forest.py) so it embeds the new calibration")
+
+    for level, (covered, width) in coverage(calibration, y, predictions).items():
+        print(f"  {level:.0%} interval: coverage {covered:.1%}, mean width {width:.2f}")
+
+if __name__ == "__main__":
+    main()
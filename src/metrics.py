@@ -0,0 +1,261 @@
+"""
+Low-overhead instrumentation for StudentPerformancePredictor.
+
+Each predictor owns a PredictorMetrics registry with:
+    - a latency histogram per scoring stage (load, validate, assemble,
+      cache, predict, confidence, persona, explain, drift, build_results)
+    - a histogram of rows per scoring call
+    - counters for rows scored, rejected (by reason) and errored
+    - the loaded model's type, signature and load time
+
+Recording an observation is a bisect plus a few integer updates under a
+lock, so instrumentation stays on under load. The registry can be read
+in-process with ``snapshot()`` or rendered in the Prometheus text format
+with ``render_prometheus()``.
+"""
+
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from time import perf_counter
+
+METRIC_PREFIX = 'student_predictor'
+
+# Seconds; spans single-row stages (~10us) to a cold model load
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+STAGES = ('load', 'validate', 'assemble', 'cache', 'predict', 'confidence', 'persona', 'explain', 'drift', 'build_results')
+
+COUNTERS = {
+    'rows_scored_total': 'Rows that received a prediction',
+    'rows_rejected_total': 'Rows rejected by input validation, by reason',
+    'rows_errored_total': 'Rows whose scoring call raised an error',
+}
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus style.
+
+    Args:
+        buckets (tuple): Increasing upper bounds; +Inf is implicit
+    """
+
+    __slots__ = ('buckets', '_counts', '_sum', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Current state of the histogram.
+
+        Returns:
+            dict: count, sum, cumulative bucket counts keyed by upper bound,
+            and p50/p90/p99 estimated by interpolating within buckets
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {
+            'count': running,
+            'sum': total,
+            'buckets': dict(zip(self.buckets + (float('inf'),), cumulative)),
+            'p50': self._quantile(cumulative, 0.5),
+            'p90': self._quantile(cumulative, 0.9),
+            'p99': self._quantile(cumulative, 0.99),
+        }
+
+    def _quantile(self, cumulative, q):
+        total = cumulative[-1]
+        if not total:
+            return None
+        rank = q * total
+        index = bisect_left(cumulative, rank)
+        if index >= len(self.buckets):
+            return self.buckets[-1]  # Beyond the last finite bucket
+        lower = self.buckets[index - 1] if index else 0.0
+        below = cumulative[index - 1] if index else 0
+        in_bucket = cumulative[index] - below
+        return lower + (self.buckets[index] - lower) * (rank - below) / in_bucket
+
+class StageTimer:
+    """Context manager that records its elapsed time in a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(perf_counter() - self.start)
+
+class PredictorMetrics:
+    """
+    Metrics registry for one predictor.
+
+    Args:
+        prefix (str): Prefix of exported metric names
+    """
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self.stages = {stage: Histogram(LATENCY_BUCKETS) for stage in STAGES}
+        self.batch_rows = Histogram(BATCH_ROW_BUCKETS)
+        self._counters = {name: {} for name in COUNTERS}
+        self._lock = threading.Lock()
+        self.model = {}
+        # ScoringProfiler attached by StudentPerformancePredictor.profile()
+        self.profiler = None
+
+    def stage(self, name):
+        """
+        Time a block as one observation of a stage.
+
+        Example:
+            with metrics.stage('validate'):
+                ...
+        """
+        timer = StageTimer(self.stages[name])
+        if self.profiler is not None:
+            return self.profiler.stage(name, timer)
+        return timer
+
+    def profiled(self, name):
+        """
+        Report a block to an attached profiler without observing the stage.
+
+        For stages timed in pieces around other stages and recorded once
+        with observe_stage(), so the profiler still sees their time and
+        peak memory.
+        """
+        if self.profiler is not None:
+            return self.profiler.stage(name, contextlib.nullcontext())
+        return contextlib.nullcontext()
+
+    def observe_stage(self, name, seconds):
+        """Record an already measured stage duration."""
+        self.stages[name].observe(seconds)
+
+    def inc(self, name, amount=1, label=None):
+        """
+        Increase a counter.
+
+        Args:
+            name (str): One of COUNTERS
+            amount (int): Increment
+            label (str): Optional reason label (used by rows_rejected_total)
+        """
+        values = self._counters[name]
+        with self._lock:
+            values[label] = values.get(label, 0) + amount
+
+    def set_model(self, model_type, path, signature, load_seconds):
+        """Record the loaded model and how long loading took."""
+        self.model = {
+            'model_type': model_type,
+            'path': path,
+            'signature': signature,
+            'load_seconds': load_seconds,
+            'loaded_at': time.time(),
+        }
+
+    def snapshot(self):
+        """
+        In-process view of every metric.
+
+        Returns:
+            dict: 'stages' (histogram snapshots in seconds), 'batch_rows',
+            'counters' (totals, with per-reason breakdown for rejections) and 'model'
+        """
+        values = self._counter_values()
+        counters = {name: {'total': sum(by_label.values())} for name, by_label in values.items()}
+        counters['rows_rejected_total']['by_reason'] = {
+            label: value for label, value in values['rows_rejected_total'].items() if label
+        }
+        return {
+            'stages': {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+            'batch_rows': self.batch_rows.snapshot(),
+            'counters': counters,
+            'model': dict(self.model),
+        }
+
+    def _counter_values(self):
+        with self._lock:
+            return {name: dict(values) for name, values in self._counters.items()}
+
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format (0.0.4).
+
+        Returns:
+            str: Exposition text ending with a newline
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name, metric_type, help_text):
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {metric_type}")
+
+        def histogram(name, labels, data):
+            for bound, count in data['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.prefix}_{name}_bucket{_labels({**labels, 'le': le})} {count}")
+            lines.append(f"{self.prefix}_{name}_sum{_labels(labels)} {data['sum']!r}")
+            lines.append(f"{self.prefix}_{name}_count{_labels(labels)} {data['count']}")
+
+        header('stage_seconds', 'histogram', 'Time spent in each scoring stage')
+        for stage, data in snapshot['stages'].items():
+            histogram('stage_seconds', {'stage': stage}, data)
+
+        header('batch_rows', 'histogram', 'Rows per scoring call')
+        histogram('batch_rows', {}, snapshot['batch_rows'])
+
+        counters = self._counter_values()
+        for name, help_text in COUNTERS.items():
+            header(name, 'counter', help_text)
+            values = counters[name] or {None: 0}
+            for label, value in sorted(values.items(), key=lambda item: item[0] or ''):
+                lines.append(f"{self.prefix}_{name}{_labels({'reason': label} if label else {})} {value}")
+
+        model = snapshot['model']
+        if model:
+            header('model_info', 'gauge', 'Loaded model; the value is always 1')
+            labels = {key: model[key] for key in ('model_type', 'path', 'signature')}
+            lines.append(f"{self.prefix}_model_info{_labels(labels)} 1")
+            header('model_load_seconds', 'gauge', 'Time taken to load the model')
+            lines.append(f"{self.prefix}_model_load_seconds {model['load_seconds']!r}")
+            header('model_loaded_timestamp_seconds', 'gauge', 'Unix time the model was loaded')
+            lines.append(f"{self.prefix}_model_loaded_timestamp_seconds {model['loaded_at']!r}")
+
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    """Format a label set, escaping values as the exposition format requires."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
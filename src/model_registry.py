@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry for long-running scorers.
+
+Holds several model versions (pickles or flat ``.forest`` artifacts with
+their model info) and hands out a loaded StudentPerformancePredictor per
+version:
+    - versions are loaded lazily on first use, each behind its own lock, so
+      loading one version never blocks requests for another
+    - loaded versions are kept in LRU order and the least recently used ones
+      are dropped once their artifacts exceed the memory limit (the default
+      version is never dropped)
+    - a watcher thread polls the artifacts and, when one is replaced on
+      disk, loads the new model in the background and swaps it in with one
+      reference assignment; requests keep the predictor they already hold,
+      so in-flight batches finish on the old model and no request waits
+      for a load
+Load failures raise ModelLoadError (or keep the old model during a reload)
+instead of exiting the process.
+
+``discover`` registers the artifacts written by train.py, update_model.py
+and compact.py: ``final_model.pkl`` as ``current``, ``final_model.v2.pkl``
+as ``v2``, and standalone ``final_model.<name>.forest`` directories as
+``<name>``.
+
+Usage:
+    python src/model_registry.py models/                 # list versions
+    python src/model_registry.py models/ --load v2 current
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from forest import FLAT_MODEL_SUFFIX
+from predict import ModelLoadError, StudentPerformancePredictor
+
+DEFAULT_VERSION = 'current'
+DEFAULT_MEMORY_LIMIT_MB = 1024
+DEFAULT_POLL_INTERVAL = 2.0
+
+_ARTIFACT_PATTERN = re.compile(r'^final_model(?:\.(?P<name>[\w-]+))?(?P<ext>\.pkl|' + re.escape(FLAT_MODEL_SUFFIX) + r')$')
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def artifact_bytes(path):
+    """Size of a model file, or of every file in a ``.forest`` directory."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
+
+class ModelVersion:
+    """
+    One registered version and, while loaded, its predictor.
+
+    Args:
+        name (str): Version name
+        model_path (str): Pickled model, ``.forest`` directory or ``.npz`` artifact
+        model_info_path (str): Model info pickle (unused for artifacts with embedded info)
+    """
+
+    def __init__(self, name, model_path, model_info_path):
+        self.name = name
+        self.model_path = model_path
+        self.model_info_path = model_info_path
+        self.predictor = None
+        self.signature = None
+        self.bytes = 0
+        self.loaded_at = None
+        self.last_used = None
+        self.load_seconds = None
+        self.reloads = 0
+        self.last_error = None
+        # Serializes loads of this version only
+        self.load_lock = threading.Lock()
+
+    def artifact_signature(self):
+        """Identity of every file the predictor reads; changes when one is replaced."""
+        paths = [self.model_path, self.model_info_path]
+        if self.model_path.endswith('.pkl'):
+            # The predictor prefers a flat artifact next to the pickle
+            paths.append(os.path.splitext(self.model_path)[0] + FLAT_MODEL_SUFFIX)
+        return tuple(_file_signature(path) for path in paths)
+
+    def describe(self):
+        """Status of the version for /health and the CLI."""
+        return {
+            'version': self.name,
+            'model_path': self.model_path,
+            'loaded': self.predictor is not None,
+            'bytes': self.bytes if self.predictor is not None else None,
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used,
+            'load_seconds': self.load_seconds,
+            'reloads': self.reloads,
+            'last_error': self.last_error,
+        }
+
+class ModelRegistry:
+    """
+    Lazily loaded, LRU-bounded, hot-reloading set of model versions.
+
+    Args:
+        predictor_factory (callable): ``(model_path, model_info_path) ->
+            StudentPerformancePredictor``; use it to attach per-version
+            caches, personas or intervals
+        memory_limit_mb (float): Artifact bytes kept loaded before least
+            recently used versions are dropped; None for no limit
+        default_version (str): Version returned by ``get()`` without a name
+    """
+
+    def __init__(self, predictor_factory=StudentPerformancePredictor, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                 default_version=DEFAULT_VERSION):
+        self.predictor_factory = predictor_factory
+        self.memory_limit = None if memory_limit_mb is None else memory_limit_mb * 1024 * 1024
+        self.default_version = default_version
+        self._versions = {}
+        self._loaded = OrderedDict()  # name -> None, least recently used first
+        self._lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watcher = None
+        self.evictions = 0
+
+    @classmethod
+    def discover(cls, model_dir='models', **kwargs):
+        """
+        Registry with every model artifact found in ``model_dir``.
+
+        Args:
+            model_dir (str): Directory written by train.py / update_model.py / compact.py
+            **kwargs: Passed to ModelRegistry
+
+        Returns:
+            ModelRegistry: Registry with the discovered versions (none loaded yet)
+        """
+        registry = cls(**kwargs)
+        entries = sorted(os.listdir(model_dir))
+        pickles = {name for name in entries if name.endswith('.pkl')}
+        for entry in entries:
+            match = _ARTIFACT_PATTERN.match(entry)
+            if not match:
+                continue
+            suffix = f".{match['name']}" if match['name'] else ''
+            if match['ext'] == FLAT_MODEL_SUFFIX and f'final_model{suffix}.pkl' in pickles:
+                continue  # Picked up through the pickle it was exported from
+            registry.register(match['name'] or DEFAULT_VERSION, os.path.join(model_dir, entry),
+                              os.path.join(model_dir, f'model_info{suffix}.pkl'))
+        return registry
+
+    def register(self, name, model_path, model_info_path='models/model_info.pkl'):
+        """Add (or repoint) a version without loading it."""
+        with self._lock:
+            existing = self._versions.get(name)
+            if existing is not None and existing.predictor is not None:
+                self._loaded.pop(name, None)
+            self._versions[name] = ModelVersion(name, model_path, model_info_path)
+
+    def names(self):
+        """Registered version names."""
+        with self._lock:
+            return list(self._versions)
+
+    def versions(self):
+        """Status of every registered version."""
+        with self._lock:
+            return [version.describe() for version in self._versions.values()]
+
+    def memory_bytes(self):
+        """Artifact bytes of the loaded versions."""
+        with self._lock:
+            return sum(self._versions[name].bytes for name in self._loaded)
+
+    def get(self, name=None):
+        """
+        Predictor for a version, loading it on first use.
+
+        Callers should hold on to the returned predictor for the whole
+        request or batch; a concurrent reload or eviction never changes it.
+
+        Args:
+            name (str): Version name (default: the registry's default version)
+
+        Returns:
+            StudentPerformancePredictor: Loaded predictor
+
+        Raises:
+            KeyError: If the version is not registered
+            ModelLoadError: If the version cannot be loaded
+        """
+        name = name or self.default_version
+        with self._lock:
+            version = self._versions.get(name)
+            if version is None:
+                raise KeyError(f"Unknown model version: {name}")
+            predictor = version.predictor
+            if predictor is not None:
+                self._touch(version)
+                return predictor
+
+        with version.load_lock:
+            # Another thread may have finished loading while this one waited
+            if version.predictor is not None:
+                predictor = version.predictor
+            else:
+                predictor = self._load(version)
+        with self._lock:
+            self._touch(version)
+            self._evict(keep=name)
+        return predictor
+
+    def _load(self, version):
+        """Load a version and publish it; the caller holds version.load_lock."""
+        signature = version.artifact_signature()
+        start_time = time.perf_counter()
+        try:
+            predictor = self.predictor_factory(version.model_path, version.model_info_path)
+        except ModelLoadError as e:
+            version.last_error = str(e)
+            raise
+        model_bytes = artifact_bytes(predictor.model_signature[0])
+
+        with self._lock:
+            # A version re-registered or evicted meanwhile still gets the fresh model
+            version.predictor = predictor
+            version.signature = signature
+            version.bytes = model_bytes
+            version.loaded_at = time.time()
+            version.load_seconds = time.perf_counter() - start_time
+            version.last_error = None
+        return predictor
+
+    def _touch(self, version):
+        version.last_used = time.time()
+        self._loaded[version.name] = None
+        self._loaded.move_to_end(version.name)
+
+    def _evict(self, keep):
+        """Drop least recently used versions over the memory limit; the caller holds self._lock."""
+        if self.memory_limit is None:
+            return
+        total = sum(self._versions[name].bytes for name in self._loaded)
+        for name in list(self._loaded):
+            if total <= self.memory_limit:
+                break
+            if name in (keep, self.default_version):
+                continue
+            version = self._versions[name]
+            # Requests still holding the predictor finish with it; it is freed afterwards
+            version.predictor = None
+            total -= version.bytes
+            del self._loaded[name]
+            self.evictions += 1
+            print(f"Evicted model version {name} ({version.bytes / 1e6:.1f} MB) to stay under the memory limit")
+
+    def check_for_updates(self):
+        """
+        Reload every loaded version whose artifact changed on disk.
+
+        The new model is loaded while the old one keeps serving; if loading
+        fails, the old model stays in place and the error is recorded.
+
+        Returns:
+            list: Names of the versions that were swapped
+        """
+        with self._lock:
+            loaded = [self._versions[name] for name in self._loaded]
+        swapped = []
+        for version in loaded:
+            if version.artifact_signature() == version.signature:
+                continue
+            with version.load_lock:
+                if version.predictor is None or version.artifact_signature() == version.signature:
+                    continue
+                old_signature = version.signature
+                try:
+                    self._load(version)
+                except ModelLoadError as e:
+                    # Keep serving the old model; retry only after the next change on disk
+                    version.signature = version.artifact_signature()
+                    print(f"Warning: reloading model version {version.name} failed, keeping the loaded one: {e}")
+                    continue
+                with self._lock:
+                    if version.name not in self._loaded:
+                        version.predictor = None  # Evicted while reloading
+                        continue
+                    self._evict(keep=version.name)
+                if version.signature != old_signature:
+                    version.reloads += 1
+                    swapped.append(version.name)
+                    print(f"Reloaded model version {version.name} from {version.model_path}")
+        return swapped
+
+    def start_watching(self, poll_interval=DEFAULT_POLL_INTERVAL):
+        """Poll for changed artifacts every ``poll_interval`` seconds in a daemon thread."""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(poll_interval):
+                try:
+                    self.check_for_updates()
+                except Exception as e:
+                    print(f"Warning: model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the watcher thread."""
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="List and load the model versions in a directory.")
+    parser.add_argument('model_dir', nargs='?', default='models', help="Model directory (default: models)")
+    parser.add_argument('--load', nargs='+', default=[], metavar='VERSION',
+                        help="Load these versions in order and report load times and evictions")
+    parser.add_argument('--memory-limit-mb', type=float, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"Artifact MB kept loaded (default: {DEFAULT_MEMORY_LIMIT_MB})")
+    return parser.parse_args(argv)
+
+def main():
+    """Print the registered versions, optionally after loading some of them."""
+    args = parse_args()
+    registry = ModelRegistry.discover(args.model_dir, memory_limit_mb=args.memory_limit_mb)
+    for name in args.load:
+        try:
+            registry.get(name)
+        except (KeyError, ModelLoadError) as e:
+            print(f"Error: {e}")
+    for status in registry.versions():
+        state = f"loaded, {status['bytes'] / 1e6:.1f} MB in {status['load_seconds']:.2f}s" if status['loaded'] else 'not loaded'
+        error = f" (last error: {status['last_error']})" if status['last_error'] else ''
+        print(f"{status['version']:<12} {status['model_path']:<40} {state}{error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Process-pool sharded scoring for very large NDJSON/CSV files.
+
+The parent process only slices the input into chunks of raw records (CSV
+records may span lines inside quoted fields). Each pool worker loads StudentPerformancePredictor once (in the pool initializer),
+parses and scores whole chunks, and either returns the NDJSON text for
+in-order output or writes its own shard file listed in a manifest.
+
+A chunk that fails is retried; if it still fails it is recorded and the rest
+of the run continues. When a worker dies, every chunk in flight is lost and
+any of them may be the cause, so they are rerun one at a time on a fresh pool
+without using up their retries; only a chunk that still breaks the pool on
+its own is charged with the crash.
+"""
+
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from predict import ModelLoadError, StudentPerformancePredictor, encode_chunk, read_records
+from personas import PersonaModel
+from prediction_cache import PredictionCache
+
+# Predictor owned by each pool worker process
+_worker_predictor = None
+
+def _init_worker(model_path, model_info_path, cache_size, cache_precision, personas_path=None,
+                 interval_level=None, explain=False):
+    """Pool initializer: load the model once per worker process."""
+    global _worker_predictor
+    # stdout may be carrying ordered results; worker diagnostics go to stderr
+    sys.stdout = sys.stderr
+    cache = PredictionCache(cache_size, cache_precision) if cache_size else None
+    personas = PersonaModel.load(personas_path) if personas_path else None
+    try:
+        _worker_predictor = StudentPerformancePredictor(model_path, model_info_path, cache=cache, personas=personas,
+                                                        interval_level=interval_level, explain=explain)
+    except ModelLoadError as e:
+        print(f"Error: {e}")
+        raise
+
+def _score_chunk(task):
+    """
+    Parse and score one chunk inside a worker.
+
+    Args:
+        task (dict): Chunk index, first row number, raw lines, CSV header,
+            input format, echo flag and optional shard path
+
+    Returns:
+        dict: Row counts and rejected-row NDJSON, plus result NDJSON text
+        when no shard path was given
+    """
+    text = task['header'] + ''.join(task['lines'])
+    records = list(read_records(io.StringIO(text), task['input_format'], _worker_predictor.feature_names))
+    output, rejects, rows_scored = encode_chunk(_worker_predictor, records, task['first_row'], task['echo_inputs'])
+
+    summary = {'rows_read': len(records), 'rows_scored': rows_scored, 'output': None, 'rejects': rejects}
+    if task['shard_path']:
+        tmp_path = task['shard_path'] + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(output)
+        os.replace(tmp_path, task['shard_path'])
+    else:
+        summary['output'] = output
+    return summary
+
+def _csv_records(lines):
+    """Join physical lines into raw CSV records; a quoted field may contain newlines."""
+    record = []
+    quotes = 0
+    for line in lines:
+        record.append(line)
+        # Escaped quotes come in pairs, so an odd count means a quoted field is still open
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield ''.join(record)
+            record = []
+            quotes = 0
+    if record:
+        yield ''.join(record)
+
+def _iter_tasks(input_stream, input_format, chunk_size, shard_dir, echo_inputs=True):
+    """Slice the input into chunks of raw records without parsing them."""
+    if input_format == 'csv':
+        records = _csv_records(input_stream)
+        header = next(records, '')
+    else:
+        records = input_stream
+        header = ''
+    lines = (record for record in records if record.strip())
+    first_row = 0
+    for chunk_index in itertools.count():
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        shard_path = os.path.join(shard_dir, f"part-{chunk_index:05d}.ndjson") if shard_dir else None
+        yield {
+            'chunk_index': chunk_index,
+            'first_row': first_row,
+            'lines': chunk,
+            'header': header,
+            'input_format': input_format,
+            'shard_path': shard_path,
+            'echo_inputs': echo_inputs,
+        }
+        first_row += len(chunk)
+
+def score_parallel(input_stream, output_stream, input_format='ndjson', chunk_size=10000, workers=2,
+                   model_path='models/final_model.pkl', model_info_path='models/model_info.pkl',
+                   cache_size=0, cache_precision=1, personas_path=None, shard_dir=None, max_retries=1,
+                   progress_stream=sys.stderr, rejects_stream=None, echo_inputs=True, interval_level=None,
+                   explain=False):
+    """
+    Score a large NDJSON/CSV stream across a pool of worker processes.
+
+    Results are written to ``output_stream`` in input order, or, when
+    ``shard_dir`` is given, to one NDJSON file per chunk plus ``manifest.json``.
+    At most ``2 * workers`` chunks are in flight, so memory stays bounded.
+
+    Args:
+        input_stream: Open text stream with NDJSON or CSV records
+        output_stream: Stream for in-order results (unused with ``shard_dir``)
+        input_format (str): 'ndjson' or 'csv'
+        chunk_size (int): Records per chunk
+        workers (int): Number of worker processes
+        model_path (str): Model passed to each worker's predictor
+        model_info_path (str): Model info passed to each worker's predictor
+        cache_size (int): Per-worker prediction cache size, 0 to disable
+        cache_precision (int): Decimals kept in cache keys
+        personas_path (str): Optional persona model each worker loads
+        shard_dir (str): Directory for per-chunk output files and the manifest
+        max_retries (int): Extra attempts for a chunk that fails
+        progress_stream: Stream for the progress counter, or None to disable
+        rejects_stream: Optional stream receiving rows that failed validation
+        echo_inputs (bool): Include input_features and model_info in each result
+        interval_level (float): Optional prediction interval coverage for each worker's predictor
+        explain (bool): Add per-feature contributions to each result
+
+    Returns:
+        dict: Run summary with row counts and per-chunk status
+    """
+    if shard_dir:
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def new_pool():
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(model_path, model_info_path, cache_size, cache_precision, personas_path, interval_level,
+                      explain),
+        )
+
+    start_time = time.perf_counter()
+    pool = new_pool()
+    pending = deque()  # [task, future, attempts, isolated] in input order
+    chunks = []
+    rows_read = 0
+    rows_scored = 0
+    rows_failed = 0
+
+    def rerun_in_isolation():
+        """After a worker died, rerun every lost chunk alone to find the one that kills workers."""
+        nonlocal pool
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = new_pool()
+        for entry in pending:
+            if _succeeded(entry[1]):
+                continue
+            while True:
+                future = pool.submit(_score_chunk, entry[0])
+                try:
+                    future.result()
+                except BrokenProcessPool:
+                    # Nothing else was running, so this chunk broke the pool
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = new_pool()
+                    if entry[2] < max_retries:
+                        entry[2] += 1
+                        continue
+                except Exception:
+                    pass  # An ordinary failure, retried by finish_head
+                break
+            entry[1] = future
+            entry[3] = True
+
+    def finish_head():
+        nonlocal rows_read, rows_scored, rows_failed
+        entry = pending[0]
+        task, future, attempts, isolated = entry
+        try:
+            summary = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and not isolated:
+                # Any in-flight chunk may have killed the worker; none is charged yet
+                rerun_in_isolation()
+                return
+            if attempts < max_retries:
+                entry[1] = pool.submit(_score_chunk, task)
+                entry[2] = attempts + 1
+                entry[3] = False
+                return
+            pending.popleft()
+            rows = len(task['lines'])
+            rows_failed += rows
+            print(f"\nError: chunk {task['chunk_index']} (rows {task['first_row']}-{task['first_row'] + rows - 1}) "
+                  f"failed after {attempts + 1} attempts: {e}", file=sys.stderr)
+            chunks.append(_chunk_record(task, 'failed', rows_read=rows, error=str(e)))
+            return
+
+        pending.popleft()
+        if summary['output'] is not None:
+            output_stream.write(summary['output'])
+        if rejects_stream is not None:
+            rejects_stream.write(summary['rejects'])
+        rows_read += summary['rows_read']
+        rows_scored += summary['rows_scored']
+        chunks.append(_chunk_record(task, 'ok', summary['rows_read'], summary['rows_scored']))
+        if progress_stream is not None:
+            print(f"\rScored {rows_scored:,} of {rows_read:,} rows", end='', file=progress_stream, flush=True)
+
+    try:
+        for task in _iter_tasks(input_stream, input_format, chunk_size, shard_dir, echo_inputs):
+            pending.append([task, pool.submit(_score_chunk, task), 0, False])
+            while len(pending) >= 2 * workers:
+                finish_head()
+        while pending:
+            finish_head()
+    finally:
+        pool.shutdown(wait=True)
+
+    if output_stream is not None:
+        output_stream.flush()
+    if progress_stream is not None:
+        print(file=progress_stream)
+
+    summary = {
+        'input_format': input_format,
+        'chunk_size': chunk_size,
+        'workers': workers,
+        'rows_read': rows_read,
+        'rows_scored': rows_scored,
+        'rows_failed': rows_failed,
+        'failed_chunks': sum(1 for chunk in chunks if chunk['status'] == 'failed'),
+        'elapsed_seconds': round(time.perf_counter() - start_time, 3),
+        'chunks': chunks,
+    }
+    if shard_dir:
+        manifest_path = os.path.join(shard_dir, 'manifest.json')
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+    return summary
+
+def _succeeded(future):
+    """True if the future finished with a result rather than an error or cancellation."""
+    return future.done() and not future.cancelled() and future.exception() is None
+
+def _chunk_record(task, status, rows_read=0, rows_scored=0, error=None):
+    """Manifest entry for one chunk."""
+    record = {
+        'index': task['chunk_index'],
+        'first_row': task['first_row'],
+        'rows_read': rows_read,
+        'rows_scored': rows_scored,
+        'status': status,
+    }
+    if task['shard_path'] and status == 'ok':
+        record['path'] = os.path.basename(task['shard_path'])
+    if error:
+        record['error'] = error
+    return record
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Student persona clustering and batch assignment.
+
+Fits mini-batch k-means on standardized cognitive features (the notebook's
+clustering features), evaluating every candidate k in parallel for the
+elbow curve, and names the clusters of the chosen k after the dashboard's
+personas by their centroid profiles. Batches are drawn here and fed to
+``MiniBatchKMeans.partial_fit``: its ``fit`` draws every batch through a
+probability vector over all rows, which costs O(rows) per batch.
+
+The fitted scaler and centroids are saved as plain arrays in an ``.npz``
+file. Assignment folds the scaling into the centroids, so labelling a
+batch is one matrix product and an argmin over raw feature values, cheap
+enough to run next to batch scoring (``predict.py --personas``). The
+predicted score stands in for ``assessment_score`` there.
+
+Usage:
+    python src/personas.py data/students.csv
+    python src/personas.py data/students.columns --k-range 2-8 --n-clusters 4 --output models/personas.npz
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+CLUSTERING_FEATURES = ['comprehension', 'attention', 'focus', 'retention', 'assessment_score', 'engagement_time']
+COGNITIVE_SKILLS = ['comprehension', 'attention', 'focus', 'retention']
+
+# Persona names used by the dashboard (app/api/students/route.ts)
+HIGH_ACHIEVER = 'High Achiever'
+STRUGGLING_LEARNER = 'Struggling Learner'
+FOCUSED_SPECIALIST = 'Focused Specialist'
+AVERAGE_PERFORMER = 'Average Performer'
+
+DEFAULT_PERSONA_PATH = 'models/personas.npz'
+DEFAULT_K_RANGE = range(2, 9)
+DEFAULT_N_CLUSTERS = 4
+DEFAULT_BATCH_SIZE = 4096
+
+# Mini-batch stopping rule: at most DEFAULT_MAX_STEPS batches, ending early once
+# the squared centroid shift stays below DEFAULT_TOL for CONVERGENCE_PATIENCE batches
+DEFAULT_MAX_STEPS = 1000
+DEFAULT_TOL = 1e-5
+CONVERGENCE_PATIENCE = 10
+
+# Rows per block when computing inertia over the full dataset
+INERTIA_BLOCK_SIZE = 262144
+
+class PersonaModel:
+    """
+    Fitted persona clusters: feature scaling, centroids and persona names.
+
+    Args:
+        features (list): Feature names in column order
+        mean (np.ndarray): Per-feature mean used for standardization
+        scale (np.ndarray): Per-feature standard deviation
+        centroids (np.ndarray): k x F cluster centers in standardized units
+        labels (list): Persona name of each cluster
+        metadata (dict): Optional JSON-serializable fit information
+    """
+
+    def __init__(self, features, mean, scale, centroids, labels, metadata=None):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.labels = list(labels)
+        self.metadata = metadata or {}
+
+        # ||(x - mean) / scale - c||^2 = ||.||^2 + x @ weights + offsets, and the
+        # first term is the same for every cluster, so argmin needs only the rest
+        scaled_centroids = self.centroids / self.scale
+        self._weights = -2 * scaled_centroids.T
+        self._offsets = 2 * (self.mean / self.scale) @ self.centroids.T + (self.centroids ** 2).sum(axis=1)
+
+    @property
+    def n_clusters(self):
+        return len(self.centroids)
+
+    def centroid_profiles(self):
+        """Cluster centers in original feature units, one dict per cluster."""
+        centers = self.centroids * self.scale + self.mean
+        return [dict(zip(self.features, center.tolist())) for center in centers]
+
+    def assign_matrix(self, X):
+        """
+        Nearest-centroid cluster for every row of a raw feature matrix.
+
+        Args:
+            X (np.ndarray): N x F matrix with columns in ``features`` order
+
+        Returns:
+            np.ndarray: Cluster index per row (uint8)
+        """
+        distances = np.asarray(X, dtype=np.float64) @ self._weights
+        distances += self._offsets
+        return distances.argmin(axis=1).astype(np.uint8)
+
+    def assign(self, columns):
+        """
+        Assign clusters to a batch stored column-wise.
+
+        Args:
+            columns: Mapping (dict or DataFrame) of feature name -> values
+
+        Returns:
+            np.ndarray: Cluster index per row; ``labels[i]`` names cluster i
+        """
+        X = np.column_stack([np.asarray(columns[feature], dtype=np.float64) for feature in self.features])
+        return self.assign_matrix(X)
+
+    def assign_labels(self, columns):
+        """Persona name per row, as an object array."""
+        return np.asarray(self.labels, dtype=object)[self.assign(columns)]
+
+    def save(self, path):
+        """Write the model to an uncompressed ``.npz`` file, replacing it atomically."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, mean=self.mean, scale=self.scale, centroids=self.centroids, metadata=np.asarray(json.dumps({
+                'features': self.features,
+                'labels': self.labels,
+                'fit': self.metadata,
+            })))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a model written by :meth:`save`."""
+        with np.load(path, allow_pickle=False) as data:
+            info = json.loads(str(data['metadata']))
+            return cls(info['features'], data['mean'], data['scale'], data['centroids'], info['labels'],
+                       metadata=info['fit'])
+
+def name_clusters(centers, features=CLUSTERING_FEATURES):
+    """
+    Name clusters after the dashboard personas from their centroid profiles.
+
+    The highest mean assessment score is the High Achiever cluster, the
+    lowest the Struggling Learner; of the rest, the one whose strongest
+    cognitive skill stands furthest above its average is the Focused
+    Specialist, and any others are Average Performers.
+
+    Args:
+        centers (np.ndarray): k x F cluster centers in original units
+        features (list): Feature names in column order
+
+    Returns:
+        list: Persona name per cluster
+    """
+    scores = centers[:, features.index('assessment_score')]
+    skills = centers[:, [features.index(skill) for skill in COGNITIVE_SKILLS]]
+    labels = [AVERAGE_PERFORMER] * len(centers)
+    order = np.argsort(scores)
+    labels[order[-1]] = HIGH_ACHIEVER
+    labels[order[0]] = STRUGGLING_LEARNER
+    rest = order[1:-1]
+    if len(rest) > 1:
+        spread = skills.max(axis=1) - skills.mean(axis=1)
+        labels[rest[np.argmax(spread[rest])]] = FOCUSED_SPECIALIST
+    return labels
+
+def load_features(path, features=CLUSTERING_FEATURES):
+    """
+    Load the clustering features as a float32 matrix, dropping incomplete rows.
+
+    Args:
+        path (str): CSV file, ``.columns`` directory or ``.parquet`` file
+        features (list): Columns to load, in order
+
+    Returns:
+        np.ndarray: N x F feature matrix
+    """
+    from columnar import read_table
+
+    X = read_table(path, features)[features].to_numpy(dtype=np.float32)
+    finite = np.isfinite(X).all(axis=1)
+    if not finite.all():
+        print(f"Warning: dropping {np.count_nonzero(~finite)} rows with missing or non-finite values")
+        X = X[finite]
+    return X
+
+def inertia(X_scaled, centroids, block_size=INERTIA_BLOCK_SIZE):
+    """Sum of squared distances from each row to its nearest centroid, computed in blocks."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    total = 0.0
+    for start in range(0, len(X_scaled), block_size):
+        block = X_scaled[start:start + block_size].astype(np.float64)
+        distances = block @ (-2 * centroids.T)
+        distances += centroid_norms
+        total += distances.min(axis=1).sum() + (block ** 2).sum()
+    return total
+
+def _fit_k(X_scaled, k, batch_size, n_init, seed, max_steps=DEFAULT_MAX_STEPS, tol=DEFAULT_TOL):
+    """
+    Fit mini-batch k-means for one k (runs in a joblib worker).
+
+    Batches are drawn uniformly and fed to ``partial_fit``; the run stops
+    once the centroids have moved less than ``tol`` for CONVERGENCE_PATIENCE
+    consecutive batches, so the cost depends on the batch count, not on the
+    number of rows. Of ``n_init`` runs, the one with the lowest inertia on
+    all rows is kept.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    start_time = time.perf_counter()
+    n_rows = len(X_scaled)
+    best = None
+    for init in range(n_init):
+        rng = np.random.default_rng([seed, k, init])
+        kmeans = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, n_init=1,
+                                 random_state=int(rng.integers(2 ** 31)))
+        # The first batch is larger because k-means++ initializes from it
+        kmeans.partial_fit(X_scaled[rng.integers(0, n_rows, 3 * batch_size)])
+        previous = kmeans.cluster_centers_.copy()
+        quiet_steps = 0
+        for step in range(1, max_steps):
+            kmeans.partial_fit(X_scaled[rng.integers(0, n_rows, batch_size)])
+            shift = ((kmeans.cluster_centers_ - previous) ** 2).sum()
+            previous[:] = kmeans.cluster_centers_
+            quiet_steps = quiet_steps + 1 if shift < tol else 0
+            if quiet_steps >= CONVERGENCE_PATIENCE:
+                break
+        centroids = kmeans.cluster_centers_.astype(np.float64)
+        run_inertia = inertia(X_scaled, centroids)
+        if best is None or run_inertia < best['inertia']:
+            best = {'k': k, 'inertia': run_inertia, 'n_steps': step + 1, 'centroids': centroids}
+    best['fit_seconds'] = time.perf_counter() - start_time
+    return best
+
+def fit_personas(X, k_values=DEFAULT_K_RANGE, n_clusters=DEFAULT_N_CLUSTERS, batch_size=DEFAULT_BATCH_SIZE,
+                 n_init=3, n_jobs=-1, seed=42, features=CLUSTERING_FEATURES):
+    """
+    Fit clusters for every candidate k in parallel and keep ``n_clusters``.
+
+    Args:
+        X (np.ndarray): N x F raw feature matrix
+        k_values (iterable): Candidate cluster counts for the elbow curve
+        n_clusters (int): Cluster count of the returned model
+        batch_size (int): MiniBatchKMeans batch size
+        n_init (int): Initializations per k; the best is kept
+        n_jobs (int): Parallel fits, -1 for all cores
+        seed (int): Random seed
+        features (list): Feature names in column order
+
+    Returns:
+        tuple: (PersonaModel, elbow) where elbow lists k, inertia,
+        mini-batch steps and fit seconds for each candidate
+    """
+    from joblib import Parallel, delayed
+
+    k_values = sorted(set(k_values) | {n_clusters})
+    mean = X.mean(axis=0, dtype=np.float64)
+    scale = X.std(axis=0, dtype=np.float64)
+    scale[scale == 0] = 1.0  # Constant columns, as StandardScaler does
+    X_scaled = ((X - mean) / scale).astype(np.float32)
+
+    # Large arrays are memory-mapped into the workers rather than copied per k
+    fits = Parallel(n_jobs=n_jobs)(delayed(_fit_k)(X_scaled, k, batch_size, n_init, seed) for k in k_values)
+
+    chosen = next(fit for fit in fits if fit['k'] == n_clusters)
+    centers = chosen['centroids'] * scale + mean
+    elbow = [{key: value for key, value in fit.items() if key != 'centroids'} for fit in fits]
+    model = PersonaModel(features, mean, scale, chosen['centroids'], name_clusters(centers, features), metadata={
+        'rows': len(X),
+        'n_clusters': n_clusters,
+        'batch_size': batch_size,
+        'seed': seed,
+        'elbow': elbow,
+    })
+    return model, elbow
+
+def parse_k_range(value):
+    """Parse '2-8' or '2,4,6' into a list of cluster counts."""
+    if '-' in value:
+        low, high = (int(part) for part in value.split('-', 1))
+        return list(range(low, high + 1))
+    return [int(part) for part in value.split(',')]
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Fit student persona clusters.")
+    parser.add_argument('data', nargs='?', default='data/students.csv',
+                        help="Student data: CSV, .columns directory or .parquet file (default: data/students.csv)")
+    parser.add_argument('--output', default=DEFAULT_PERSONA_PATH, help=f"Model file (default: {DEFAULT_PERSONA_PATH})")
+    parser.add_argument('--k-range', default='2-8', help="Candidate k values, e.g. 2-8 or 3,4,5 (default: 2-8)")
+    parser.add_argument('--n-clusters', type=int, default=DEFAULT_N_CLUSTERS,
+                        help=f"Clusters in the saved model (default: {DEFAULT_N_CLUSTERS})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Mini-batch size (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--n-init', type=int, default=3, help="Initializations per k (default: 3)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel fits, -1 for all cores (default: -1)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args(argv)
+    try:
+        args.k_range = parse_k_range(args.k_range)
+    except ValueError:
+        parser.error("--k-range must look like 2-8 or 2,4,6")
+    if min(args.k_range + [args.n_clusters]) < 2:
+        parser.error("cluster counts must be at least 2")
+    if args.batch_size < 1 or args.n_init < 1:
+        parser.error("--batch-size and --n-init must be at least 1")
+    return args
+
+def main():
+    """Fit the persona clusters, print the elbow table and save the model."""
+    args = parse_args()
+    try:
+        start_time = time.perf_counter()
+        X = load_features(args.data)
+        print(f"Loaded {len(X):,} rows from {args.data} in {time.perf_counter() - start_time:.2f}s")
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if len(X) < max(args.k_range + [args.n_clusters]):
+        print("Error: fewer rows than clusters")
+        sys.exit(1)
+
+    start_time = time.perf_counter()
+    model, elbow = fit_personas(X, args.k_range, args.n_clusters, args.batch_size, args.n_init, args.n_jobs,
+                                args.seed)
+    print(f"Fitted {len(elbow)} candidate k values in {time.perf_counter() - start_time:.2f}s")
+    print("\n  k      inertia  batches   fit (s)")
+    for fit in elbow:
+        marker = '  <- saved' if fit['k'] == args.n_clusters else ''
+        print(f"{fit['k']:>3} {fit['inertia']:>12,.0f} {fit['n_steps']:>8} {fit['fit_seconds']:>9.2f}{marker}")
+
+    start_time = time.perf_counter()
+    counts = np.bincount(model.assign_matrix(X), minlength=model.n_clusters)
+    assign_seconds = time.perf_counter() - start_time
+    print(f"\nPersonas ({len(X):,} rows assigned in {assign_seconds:.3f}s):")
+    for label, count, profile in zip(model.labels, counts, model.centroid_profiles()):
+        summary = ', '.join(f"{feature} {value:.1f}" for feature, value in profile.items())
+        print(f"  {label:<20} {count:>10,} ({count / len(X):.1%})  {summary}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    model.save(args.output)
+    print(f"\nPersona model saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
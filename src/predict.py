@@ -1,58 +1,207 @@
+import argparse
+import contextlib
+import csv
+import itertools
 import pickle
 import json
+import math
+import operator
 import sys
 import os
+import time
 import numpy as np
 from pathlib import Path
 
+from columnar import ColumnWriter, is_columnar_path, iter_column_chunks
+from drift import DriftMonitor, format_snapshot
+from forest import FLAT_MODEL_SUFFIX, FlatForest
+from intervals import PredictionIntervals
+from metrics import PredictorMetrics
+from personas import PersonaModel
+from prediction_cache import DEFAULT_CACHE_PRECISION, PredictionCache
+from profiling import DEFAULT_TOP, ScoringProfiler
+
+# Records scored per batch in --stream mode
+DEFAULT_CHUNK_SIZE = 10000
+
+# Path prefix of the --profile outputs
+DEFAULT_PROFILE_PREFIX = 'predict_profile'
+
+# Typical value ranges; values outside them are scored with a warning
+DEFAULT_FEATURE_RANGE = (0, 100)
+FEATURE_RANGES = {'engagement_time': (30, 300)}
+
+# Per-row flags returned by validate_columns. The first three reject the row,
+# WARNING_OUT_OF_RANGE is informational only
+ERROR_MISSING = 1
+ERROR_NOT_NUMERIC = 2
+ERROR_NOT_FINITE = 4
+WARNING_OUT_OF_RANGE = 8
+REJECT_MASK = ERROR_MISSING | ERROR_NOT_NUMERIC | ERROR_NOT_FINITE
+
+ERROR_REASONS = {
+    ERROR_MISSING: 'missing required feature',
+    ERROR_NOT_NUMERIC: 'non-numeric value',
+    ERROR_NOT_FINITE: 'NaN or infinite value',
+    WARNING_OUT_OF_RANGE: 'value outside typical range',
+}
+
+# Placeholder for absent keys when records are turned into columns
+_MISSING = object()
+
+# Exact types accepted as numbers without an isinstance check
+_NUMERIC_TYPES = frozenset({int, float, bool, np.float64, np.float32, np.int64, np.int32, np.bool_})
+# What both validators accept as a number, including subclasses
+_NUMERIC_CLASSES = (int, float, np.integer, np.floating, np.bool_)
+
+class ModelLoadError(Exception):
+    """Raised when the model or its model info cannot be loaded."""
+
 class StudentPerformancePredictor:
     """
     A class to predict student assessment scores based on cognitive skills.
     """
     
-    def __init__(self, model_path='models/final_model.pkl', model_info_path='models/model_info.pkl'):
+    def __init__(self, model_path='models/final_model.pkl', model_info_path='models/model_info.pkl', cache=None,
+                 metrics=None, personas=None, interval_level=None, explain=False, monitor_drift=False):
         """
         Initialize the predictor with the trained model.
         
         Args:
             model_path (str): Path to the trained model pickle file
             model_info_path (str): Path to the model info pickle file
+            cache (PredictionCache): Optional result cache; inputs are then
+                scored at the cache's quantization precision
+            metrics (PredictorMetrics): Registry for stage timings and row
+                counters; a new one is created if not given
+            personas (PersonaModel): Optional persona clusters; results then
+                include the persona nearest to each student's profile
+            interval_level (float): Optional coverage (e.g. 0.9); results then
+                include a prediction interval from the model's calibration
+                residuals, and confidence comes from the calibration instead
+                of the per-tree spread
+            explain (bool): Add each student's per-feature contributions to
+                the predicted score to the results
+            monitor_drift (bool): Track the distribution of scored inputs
+                against the training reference stats in the model info
+                (see drift_snapshot())
         """
         self.model_path = model_path
         self.model_info_path = model_info_path
         self.model = None
         self.model_info = None
         self.feature_names = None
+        self.model_signature = None
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else PredictorMetrics()
+        self.personas = personas
+        self.interval_level = interval_level
+        self.intervals = None
+        self.explain = explain
+        self._explainer = None
+        self.monitor_drift = monitor_drift
+        self.drift = None
         
         self.load_model()
     
+    def _resolve_model_path(self):
+        """
+        Prefer a memory-mapped flat artifact next to the pickled model.
+        
+        ``models/final_model.pkl`` resolves to ``models/final_model.forest``
+        when that directory exists and is at least as new as the pickle.
+        
+        Returns:
+            str: Path of the artifact to load
+        """
+        if not self.model_path.endswith('.pkl'):
+            return self.model_path
+        
+        flat_path = os.path.splitext(self.model_path)[0] + FLAT_MODEL_SUFFIX
+        if not os.path.isdir(flat_path):
+            return self.model_path
+        if os.path.exists(self.model_path) and os.path.getmtime(flat_path) < os.path.getmtime(self.model_path):
+            print(f"Warning: ignoring {flat_path}, it is older than {self.model_path}")
+            return self.model_path
+        return flat_path
+    
     def load_model(self):
-        """Load the trained model and model information."""
-        try:
-            # Load the main model
-            with open(self.model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            
-            # Load model info if available
-            if os.path.exists(self.model_info_path):
-                with open(self.model_info_path, 'rb') as f:
-                    self.model_info = pickle.load(f)
+        """
+        Load the trained model and model information.
+        
+        Raises:
+            ModelLoadError: If the artifact is missing or cannot be loaded
+        """
+        with self.metrics.profiled('load'):
+            start_time = time.perf_counter()
+            try:
+                # Load the main model
+                model_path = self._resolve_model_path()
+                if model_path.endswith('.npz') or os.path.isdir(model_path):
+                    # Flat-array forest: no scikit-learn import, model info is embedded,
+                    # and directory artifacts are memory-mapped and shared across processes
+                    self.model = FlatForest.load(model_path)
+                    if self.model.metadata:
+                        self.model_info = self.model.metadata
+                else:
+                    with open(self.model_path, 'rb') as f:
+                        self.model = pickle.load(f)
+                
+                # Load model info if available
+                if self.model_info:
                     self.feature_names = self.model_info['features']
-            else:
-                # Default feature names if model_info not available
-                self.feature_names = ['comprehension', 'attention', 'focus', 'retention', 'engagement_time']
-            
-            print(f"Model loaded successfully from {self.model_path}")
-            if self.model_info:
-                print(f"Model type: {self.model_info['model_type']}")
-                print(f"Model performance - R²: {self.model_info['performance']['r2']:.3f}")
+                elif os.path.exists(self.model_info_path):
+                    with open(self.model_info_path, 'rb') as f:
+                        self.model_info = pickle.load(f)
+                        self.feature_names = self.model_info['features']
+                else:
+                    # Default feature names if model_info not available
+                    self.feature_names = ['comprehension', 'attention', 'focus', 'retention', 'engagement_time']
                 
-        except FileNotFoundError as e:
-            print(f"Error: Model file not found - {e}")
-            sys.exit(1)
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            sys.exit(1)
+                self._explainer = None
+                
+                # Cached results are only valid for the model file they came from
+                stat = os.stat(model_path)
+                self.model_signature = (os.path.abspath(model_path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                if self.cache is not None:
+                    self.cache.bind_model(self.model_signature)
+                
+                if self.interval_level is not None:
+                    calibration = self.model_info.get('calibration') if self.model_info else None
+                    if calibration is None:
+                        raise ValueError("model info has no calibration residuals; retrain with src/train.py "
+                                         "or calibrate it with src/intervals.py")
+                    self.intervals = PredictionIntervals(calibration, self.interval_level)
+                
+                if self.monitor_drift:
+                    reference = self.model_info.get('drift_reference') if self.model_info else None
+                    if reference is None:
+                        raise ValueError("model info has no drift reference; retrain with src/train.py "
+                                         "or add one with src/drift.py")
+                    self.drift = DriftMonitor(reference, self.feature_names)
+                
+                if self.explain:
+                    # Fail at startup on unsupported models, and flatten pickled forests up front
+                    self._contribution_function()
+                
+                load_seconds = time.perf_counter() - start_time
+                self.metrics.observe_stage('load', load_seconds)
+                self.metrics.set_model(
+                    model_type=self.model_info['model_type'] if self.model_info else type(self.model).__name__,
+                    path=model_path,
+                    signature=f"{stat.st_size}-{stat.st_mtime_ns}",
+                    load_seconds=load_seconds,
+                )
+                
+                print(f"Model loaded successfully from {model_path}")
+                if self.model_info:
+                    print(f"Model type: {self.model_info['model_type']}")
+                    print(f"Model performance - R²: {self.model_info['performance']['r2']:.3f}")
+                    
+            except FileNotFoundError as e:
+                raise ModelLoadError(f"Model file not found - {e}") from e
+            except Exception as e:
+                raise ModelLoadError(f"Error loading model: {e}") from e
     
     def validate_input(self, input_data):
         """
@@ -64,39 +213,107 @@ class StudentPerformancePredictor:
         Returns:
             bool: True if valid, False otherwise
         """
-        required_features = self.feature_names
-        
-        # Check if all required features are present
-        missing_features = [f for f in required_features if f not in input_data]
-        if missing_features:
-            print(f"Error: Missing required features: {missing_features}")
-            return False
-        
-        # Check if values are numeric and within reasonable range
-        for feature in required_features:
-            value = input_data[feature]
+        with self.metrics.stage('validate'):
+            required_features = self.feature_names
             
-            # Check if numeric
-            if not isinstance(value, (int, float)):
-                print(f"Error: {feature} must be a number, got {type(value)}")
+            # Check if all required features are present
+            missing_features = [f for f in required_features if f not in input_data]
+            if missing_features:
+                print(f"Error: Missing required features: {missing_features}")
+                self.metrics.inc('rows_rejected_total', label=ERROR_REASONS[ERROR_MISSING])
                 return False
             
-            # Check range (0-100 for skills, 30-300 for engagement_time)
-            if feature == 'engagement_time':
-                if not (30 <= value <= 300):
-                    print(f"Warning: {feature} value {value} is outside typical range (30-300 minutes)")
-            else:
-                if not (0 <= value <= 100):
-                    print(f"Warning: {feature} value {value} is outside typical range (0-100)")
+            # Check if values are numeric and within reasonable range
+            for feature in required_features:
+                value = input_data[feature]
+            
+                # Check if numeric
+                if not isinstance(value, _NUMERIC_CLASSES):
+                    print(f"Error: {feature} must be a number, got {type(value)}")
+                    self.metrics.inc('rows_rejected_total', label=ERROR_REASONS[ERROR_NOT_NUMERIC])
+                    return False
+            
+                try:
+                    finite = math.isfinite(value)
+                except OverflowError:
+                    finite = False  # An int too large for a float, e.g. 10**400
+                if not finite:
+                    print(f"Error: {feature} must be a finite number, got {value}")
+                    self.metrics.inc('rows_rejected_total', label=ERROR_REASONS[ERROR_NOT_FINITE])
+                    return False
+            
+                # Check range (0-100 for skills, 30-300 for engagement_time)
+                low, high = FEATURE_RANGES.get(feature, DEFAULT_FEATURE_RANGE)
+                if not (low <= value <= high):
+                    unit = ' minutes' if feature == 'engagement_time' else ''
+                    print(f"Warning: {feature} value {value} is outside typical range ({low}-{high}{unit})")
+            
+            return True
+    
+    def validate_columns(self, columns, n_rows):
+        """
+        Validate a whole batch stored column-wise, without per-row Python checks.
         
-        return True
+        Args:
+            columns (dict): Feature name -> sequence or array of values
+            n_rows (int): Number of rows in the batch
+            
+        Returns:
+            tuple: (features_array, codes) - N x F float64 matrix in model
+            feature order, and a uint8 array of ERROR_*/WARNING_* flags per row
+        """
+        with self.metrics.stage('validate'):
+            features_array = np.zeros((n_rows, len(self.feature_names)))
+            codes = np.zeros(n_rows, dtype=np.uint8)
+            
+            for j, feature in enumerate(self.feature_names):
+                if feature not in columns:
+                    codes |= ERROR_MISSING
+                    continue
+                
+                values, flags = _numeric_column(columns[feature], n_rows)
+                finite = np.isfinite(values)
+                flags[~finite & (flags == 0)] |= ERROR_NOT_FINITE
+                
+                low, high = FEATURE_RANGES.get(feature, DEFAULT_FEATURE_RANGE)
+                flags[(flags == 0) & ((values < low) | (values > high))] |= WARNING_OUT_OF_RANGE
+                
+                codes |= flags
+                features_array[:, j] = np.where(finite, values, 0.0)
+            
+            self._count_rejections(codes)
+        return features_array, codes
+    
+    def _count_rejections(self, codes):
+        """Count rejected rows once each, under the first reason that rejects them."""
+        rejected = codes & REJECT_MASK
+        if not rejected.any():
+            return
+        for flag in (ERROR_MISSING, ERROR_NOT_NUMERIC, ERROR_NOT_FINITE):
+            hit = (rejected & flag) != 0
+            count = np.count_nonzero(hit)
+            if count:
+                self.metrics.inc('rows_rejected_total', count, label=ERROR_REASONS[flag])
+                rejected[hit] = 0
     
-    def predict(self, input_data):
+    def _records_to_columns(self, input_list):
+        """Pivot a list of input dictionaries into one list per model feature."""
+        with self.metrics.stage('assemble'):
+            return {
+                feature: [
+                    input_data.get(feature, _MISSING) if isinstance(input_data, dict) else _MISSING
+                    for input_data in input_list
+                ]
+                for feature in self.feature_names
+            }
+    
+    def predict(self, input_data, echo_inputs=True):
         """
         Make a prediction for a single student.
         
         Args:
             input_data (dict): Dictionary containing cognitive skills data
+            echo_inputs (bool): Include input_features and model_info in the result
             
         Returns:
             dict: Prediction results including score and confidence
@@ -106,59 +323,406 @@ class StudentPerformancePredictor:
         
         try:
             # Prepare features in the correct order
-            features = [input_data[feature] for feature in self.feature_names]
-            features_array = np.array(features).reshape(1, -1)
-            
-            # Make prediction
-            predicted_score = self.model.predict(features_array)[0]
-            
-            # Calculate prediction confidence (for Random Forest)
-            if hasattr(self.model, 'estimators_'):
-                # Get predictions from all trees
-                tree_predictions = [tree.predict(features_array)[0] for tree in self.model.estimators_]
-                prediction_std = np.std(tree_predictions)
-                confidence = max(0, 100 - (prediction_std * 10))  # Simple confidence metric
-            else:
-                confidence = 85  # Default confidence for other models
-            
-            # Ensure score is within valid range
-            predicted_score = max(0, min(100, predicted_score))
-            
-            result = {
-                'predicted_assessment_score': round(predicted_score, 2),
-                'confidence': round(confidence, 1),
-                'input_features': input_data,
-                'model_info': {
-                    'model_type': self.model_info['model_type'] if self.model_info else 'Unknown',
-                    'features_used': self.feature_names
-                }
-            }
+            features_array = self._build_feature_matrix([input_data])
             
-            return result
+            # Make prediction and confidence in one pass
+            scores, confidences = self._score_matrix(features_array)
+            
+            personas = self.assign_personas(features_array, scores)
+            intervals = self.prediction_intervals(scores)
+            explanations = self.explain_rows(features_array)
+            with self.metrics.stage('build_results'):
+                return self._build_result(input_data, scores[0], confidences[0], echo_inputs,
+                                          None if personas is None else personas[0],
+                                          None if intervals is None else intervals[0],
+                                          None if explanations is None else explanations[0])
             
         except Exception as e:
             print(f"Error making prediction: {e}")
             return None
     
-    def predict_batch(self, input_list):
+    def _build_feature_matrix(self, input_list):
+        """
+        Stack input dictionaries into an N x F feature matrix.
+        
+        Args:
+            input_list (list): List of validated input dictionaries
+            
+        Returns:
+            np.ndarray: Feature matrix with columns in model feature order
+        """
+        with self.metrics.stage('assemble'):
+            return np.array(
+                [[input_data[feature] for feature in self.feature_names] for input_data in input_list],
+                dtype=np.float64,
+            ).reshape(len(input_list), len(self.feature_names))
+    
+    def _score_matrix(self, features_array):
+        """
+        Score a feature matrix, serving repeated profiles from the cache when enabled.
+        
+        All keys are looked up first; only distinct cache misses are sent to the model.
+        
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+            
+        Returns:
+            tuple: (scores, confidences) arrays of length N
+        """
+        n_rows = len(features_array)
+        self.metrics.batch_rows.observe(n_rows)
+        try:
+            if self.cache is None:
+                scores, confidences = self._predict_matrix(features_array)
+            else:
+                scores, confidences = self._score_cached(features_array)
+        except Exception:
+            self.metrics.inc('rows_errored_total', n_rows)
+            raise
+        self.metrics.inc('rows_scored_total', n_rows)
+        if self.drift is not None:
+            with self.metrics.stage('drift'):
+                self.drift.update(features_array)
+        return scores, confidences
+    
+    def _score_cached(self, features_array):
+        """Cache-aware scoring for _score_matrix."""
+        # Model calls in between are their own stages, so the cache time is profiled in two parts
+        with self.metrics.profiled('cache'):
+            start_time = time.perf_counter()
+            keys, quantized = self.cache.quantize(features_array)
+            cached = self.cache.get_many(keys)
+            
+            scores = np.empty(len(keys))
+            confidences = np.empty(len(keys))
+            miss_rows = {}
+            uncacheable_rows = []
+            for i, (key, value) in enumerate(zip(keys, cached)):
+                if key is None:
+                    uncacheable_rows.append(i)
+                elif value is None:
+                    miss_rows.setdefault(key, []).append(i)
+                else:
+                        scores[i], confidences[i] = value
+            cache_seconds = time.perf_counter() - start_time
+        
+        if miss_rows or uncacheable_rows:
+            # Distinct misses and rows too large to quantize exactly share one model call
+            first_rows = [rows[0] for rows in miss_rows.values()]
+            model_scores, model_confidences = self._predict_matrix(quantized[first_rows + uncacheable_rows])
+            with self.metrics.profiled('cache'):
+                start_time = time.perf_counter()
+                n_misses = len(first_rows)
+                scores[uncacheable_rows] = model_scores[n_misses:]
+                confidences[uncacheable_rows] = model_confidences[n_misses:]
+                new_values = list(zip(model_scores[:n_misses].tolist(), model_confidences[:n_misses].tolist()))
+                for rows, (score, confidence) in zip(miss_rows.values(), new_values):
+                    scores[rows] = score
+                    confidences[rows] = confidence
+                self.cache.put_many(miss_rows.keys(), new_values)
+                cache_seconds += time.perf_counter() - start_time
+        
+        self.metrics.observe_stage('cache', cache_seconds)
+        return scores, confidences
+    
+    def _predict_matrix(self, features_array):
+        """
+        Predict scores and confidences for a whole feature matrix.
+        
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+            
+        Returns:
+            tuple: (scores, confidences) arrays of length N
+        """
+        tree_predictions = None
+        with self.metrics.stage('predict'):
+            if self.intervals is not None:
+                # Calibrated intervals replace the per-tree spread, so only the mean is needed
+                predicted_scores = self.model.predict(features_array)
+            elif hasattr(self.model, 'predict_trees'):
+                # Flat-array forest: every tree for the whole batch in one traversal
+                per_tree = self.model.predict_trees(features_array)
+                predicted_scores = per_tree.sum(axis=0) / len(per_tree)
+                tree_predictions = np.ascontiguousarray(per_tree.T)
+            elif hasattr(self.model, 'estimators_'):
+                # Score every tree once on the float32 matrix the forest itself
+                # uses, and derive both the forest mean (same summation order as
+                # RandomForestRegressor.predict) and the per-row spread from it
+                features_32 = np.ascontiguousarray(features_array, dtype=np.float32)
+                n_trees = len(self.model.estimators_)
+                tree_predictions = np.empty((len(features_32), n_trees))
+                predicted_scores = np.zeros(len(features_32))
+                for j, tree in enumerate(self.model.estimators_):
+                    prediction = tree.predict(features_32, check_input=False)
+                    predicted_scores += prediction
+                    tree_predictions[:, j] = prediction
+                predicted_scores /= n_trees
+            else:
+                predicted_scores = self.model.predict(features_array)
+        
+        # Calculate prediction confidence (for Random Forest)
+        with self.metrics.stage('confidence'):
+            if self.intervals is not None:
+                confidences = self.intervals.confidences(predicted_scores)
+            elif tree_predictions is not None:
+                prediction_std = np.std(tree_predictions, axis=1)
+                confidences = np.maximum(0, 100 - (prediction_std * 10))  # Simple confidence metric
+            else:
+                confidences = np.full(len(features_array), 85.0)  # Default confidence for other models
+        
+        return predicted_scores, confidences
+    
+    def assign_personas(self, features_array, scores):
+        """
+        Persona of each scored row, using the clipped predicted score as its assessment score.
+        
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+            scores (np.ndarray): Predicted scores for the rows
+            
+        Returns:
+            np.ndarray: Cluster index per row (names are ``personas.labels``),
+            or None when no persona model is loaded
+        """
+        if self.personas is None:
+            return None
+        with self.metrics.stage('persona'):
+            features_array = self._scored_features(features_array)
+            columns = {feature: features_array[:, j] for j, feature in enumerate(self.feature_names)}
+            columns['assessment_score'] = np.clip(scores, 0, 100)
+            return self.personas.assign(columns)
+    
+    def prediction_intervals(self, scores):
+        """
+        Calibrated (lower, upper) bounds for each predicted score.
+        
+        Args:
+            scores (np.ndarray): Predicted scores
+            
+        Returns:
+            list: (lower, upper) pairs, or None when intervals are not enabled
+        """
+        if self.intervals is None:
+            return None
+        with self.metrics.stage('confidence'):
+            lower, upper = self.intervals.bounds(scores)
+            return list(zip(lower.tolist(), upper.tolist()))
+    
+    def _contribution_function(self):
+        """
+        Build (once per loaded model) the function behind feature_contributions.
+        
+        Forests use decision-path attribution over the flat arrays; a pickled
+        sklearn forest is flattened in memory on first use. Scaled linear
+        pipelines are exact: ``coef * (x - mean) / scale`` per feature.
+        """
+        if self._explainer is not None:
+            return self._explainer
+        
+        model = self.model
+        if hasattr(model, 'estimators_') and not hasattr(model, 'predict_trees'):
+            model = FlatForest.from_sklearn(model)
+        if hasattr(model, 'predict_contributions'):
+            self._explainer = model.predict_contributions
+        elif hasattr(model, 'steps') and hasattr(model.steps[-1][1], 'coef_'):
+            scaler, regressor = model.steps[0][1], model.steps[-1][1]
+            weights = np.asarray(regressor.coef_, dtype=np.float64) / scaler.scale_
+            bias = float(np.ravel(regressor.intercept_)[0])
+            self._explainer = lambda X: (bias, (np.asarray(X, dtype=np.float64) - scaler.mean_) * weights)
+        else:
+            raise ValueError(f"Feature contributions are not supported for {type(self.model).__name__}")
+        return self._explainer
+    
+    def feature_contributions(self, features_array):
+        """
+        Per-feature contributions to each row's predicted score.
+        
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+            
+        Returns:
+            tuple: (baseline, contributions) - the score before any feature is
+            taken into account, and an N x F array in ``feature_names`` order;
+            each row sums with the baseline to the unclipped prediction
+        """
+        return self._contribution_function()(self._scored_features(features_array))
+    
+    def _scored_features(self, features_array):
+        """The features the model actually scores: the cache's quantized values when a cache is on."""
+        if self.cache is None:
+            return features_array
+        return self.cache.quantized_values(features_array)
+    
+    def explain_rows(self, features_array):
+        """
+        Explanation dict per row for the results.
+        
+        Args:
+            features_array (np.ndarray): N x F feature matrix
+            
+        Returns:
+            list: {'baseline', 'contributions'} dicts, or None when
+            explanations are not enabled
+        """
+        if not self.explain:
+            return None
+        with self.metrics.stage('explain'):
+            baseline, contributions = self.feature_contributions(features_array)
+            baseline = round(baseline, 2)
+            return [
+                {'baseline': baseline, 'contributions': dict(zip(self.feature_names, row))}
+                for row in np.round(contributions, 3).tolist()
+            ]
+    
+    def _build_result(self, input_data, predicted_score, confidence, echo_inputs=True, persona=None,
+                      interval=None, explanation=None):
+        """Assemble the result dictionary for one scored student."""
+        # Ensure score is within valid range
+        predicted_score = max(0, min(100, predicted_score))
+        
+        result = {
+            'predicted_assessment_score': round(predicted_score, 2),
+            'confidence': round(confidence, 1),
+        }
+        if interval is not None:
+            result['prediction_interval'] = {
+                'lower': round(interval[0], 2),
+                'upper': round(interval[1], 2),
+                'level': self.intervals.level,
+            }
+        if persona is not None:
+            result['persona'] = self.personas.labels[persona]
+        if explanation is not None:
+            result['explanation'] = explanation
+        if echo_inputs:
+            result['input_features'] = input_data
+            result['model_info'] = self.describe_model()
+        return result
+    
+    def describe_model(self):
+        """Model type and feature list reported alongside predictions."""
+        return {
+            'model_type': self.model_info['model_type'] if self.model_info else 'Unknown',
+            'features_used': self.feature_names
+        }
+    
+    def score_columns(self, columns, n_rows):
+        """
+        Validate and score a batch stored column-wise.
+        
+        Args:
+            columns (dict): Feature name -> sequence or array of values
+            n_rows (int): Number of rows in the batch
+            
+        Returns:
+            tuple: (codes, indices, features_array, scores, confidences) -
+            validation flags for every row, then the row numbers that were
+            scored with their feature rows, raw scores and confidences
+        """
+        features_array, codes = self.validate_columns(columns, n_rows)
+        indices = np.flatnonzero((codes & REJECT_MASK) == 0)
+        features_array = features_array[indices]
+        if len(indices):
+            scores, confidences = self._score_matrix(features_array)
+        else:
+            scores, confidences = np.empty(0), np.empty(0)
+        return codes, indices, features_array, scores, confidences
+    
+    def predict_batch(self, input_list, verbose=True, return_rejected=False, echo_inputs=True):
         """
         Make predictions for multiple students.
         
         Args:
             input_list (list): List of dictionaries containing cognitive skills data
+            verbose (bool): Print a throughput and validation summary when done
+            return_rejected (bool): Also return the rows that failed validation
+            echo_inputs (bool): Include input_features and model_info in each result
             
         Returns:
-            list: List of prediction results
+            list: List of prediction results, or a (results, rejected) tuple
+            when return_rejected is set; each rejected entry holds the
+            student_index, error_code and list of error reasons
         """
+        start_time = time.perf_counter()
+        
+        columns = self._records_to_columns(input_list)
+        try:
+            codes, indices, features_array, scores, confidences = self.score_columns(columns, len(input_list))
+            personas = self.assign_personas(features_array, scores)
+            intervals = self.prediction_intervals(scores)
+            explanations = self.explain_rows(features_array)
+        except Exception as e:
+            print(f"Error making batch prediction: {e}")
+            return ([], []) if return_rejected else []
+        rejected = rejected_entries(codes)
+        
         results = []
-        for i, input_data in enumerate(input_list):
-            print(f"Processing student {i+1}/{len(input_list)}")
-            result = self.predict(input_data)
-            if result:
+        personas = itertools.repeat(None) if personas is None else personas.tolist()
+        intervals = itertools.repeat(None) if intervals is None else intervals
+        explanations = itertools.repeat(None) if explanations is None else explanations
+        with self.metrics.stage('build_results'):
+            for i, score, confidence, persona, interval, explanation in zip(
+                    indices.tolist(), scores, confidences, personas, intervals, explanations):
+                result = self._build_result(input_list[i], score, confidence, echo_inputs, persona, interval,
+                                            explanation)
                 result['student_index'] = i
                 results.append(result)
         
-        return results
+        if verbose:
+            elapsed = time.perf_counter() - start_time
+            rows_per_sec = len(results) / elapsed if elapsed > 0 else float('inf')
+            print(f"Scored {len(results)}/{len(input_list)} students in {elapsed:.3f}s ({rows_per_sec:,.0f} rows/sec)")
+            for flag, reason in ERROR_REASONS.items():
+                count = np.count_nonzero(codes & flag)
+                if count:
+                    label = 'Warning' if flag == WARNING_OUT_OF_RANGE else 'Rejected'
+                    print(f"  {label}: {count} row(s) with {reason}")
+        
+        return (results, rejected) if return_rejected else results
+    
+    def drift_snapshot(self):
+        """
+        Drift of every input scored so far from the training distribution.
+        
+        Returns:
+            dict: DriftMonitor.snapshot() (PSI, KS distance and running
+            statistics per feature), or None when drift monitoring is off
+        """
+        if self.drift is None:
+            return None
+        return self.drift.snapshot()
+    
+    @contextlib.contextmanager
+    def profile(self, output_prefix=None, top=DEFAULT_TOP):
+        """
+        Profile CPU time and allocations of everything scored inside the block.
+        
+        Example:
+            with predictor.profile('predict_profile') as profiler:
+                predictor.predict_batch(students)
+            print(profiler.format_report())
+        
+        Args:
+            output_prefix (str): Write ``.txt``, ``.json`` and ``.prof`` files
+                with this prefix on exit; None keeps the report in memory only
+            top (int): Functions and allocation sites kept in the report
+            
+        Yields:
+            ScoringProfiler: The running profiler; its report is complete once the block exits
+        """
+        if self.metrics.profiler is not None:
+            raise RuntimeError("This predictor is already being profiled")
+        profiler = ScoringProfiler(top)
+        self.metrics.profiler = profiler
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            self.metrics.profiler = None
+            if output_prefix:
+                profiler.write(output_prefix)
     
     def get_feature_importance(self):
         """
@@ -175,19 +739,525 @@ class StudentPerformancePredictor:
         else:
             return None
 
+def describe_error_code(code):
+    """
+    Expand a validate_columns row code into readable reasons.
+    
+    Args:
+        code (int): Bitwise OR of ERROR_*/WARNING_* flags
+        
+    Returns:
+        list: Reason strings, rejecting errors first
+    """
+    return [reason for flag, reason in ERROR_REASONS.items() if code & flag]
+
+def rejected_entries(codes, first_row=0):
+    """
+    Describe the rows whose validation codes reject them.
+    
+    Args:
+        codes (np.ndarray): Per-row flags from validate_columns
+        first_row (int): Input row number of the first code
+        
+    Returns:
+        list: One dict per rejected row with student_index, error_code and errors
+    """
+    return [
+        {'student_index': first_row + i, 'error_code': int(codes[i]), 'errors': describe_error_code(codes[i])}
+        for i in np.flatnonzero(codes & REJECT_MASK).tolist()
+    ]
+
+def _numeric_column(values, n_rows):
+    """
+    Convert one feature column to float64 and flag unusable entries.
+    
+    Purely numeric columns convert in a single NumPy pass; columns with
+    missing entries, strings or other objects fall back to element checks.
+    
+    Integers too large for a float64 are flagged ERROR_NOT_FINITE.
+    
+    Returns:
+        tuple: (float64 values, uint8 ERROR_* flags)
+    """
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is not None and array.ndim == 1 and array.dtype.kind in 'biuf':
+        return array.astype(np.float64), np.zeros(n_rows, dtype=np.uint8)
+    
+    objects = np.fromiter(values, dtype=object, count=n_rows)
+    missing = np.fromiter(map(operator.is_, values, itertools.repeat(_MISSING)), dtype=bool, count=n_rows)
+    numeric = np.fromiter(map(_NUMERIC_TYPES.__contains__, map(type, values)), dtype=bool, count=n_rows)
+    # Rare numeric subclasses (e.g. IntEnum) miss the exact-type lookup
+    for i in np.flatnonzero(~numeric & ~missing).tolist():
+        numeric[i] = isinstance(objects[i], _NUMERIC_CLASSES)
+    
+    converted = np.zeros(n_rows)
+    flags = np.where(missing, ERROR_MISSING, np.where(numeric, 0, ERROR_NOT_NUMERIC)).astype(np.uint8)
+    try:
+        converted[numeric] = objects[numeric].astype(np.float64)
+    except OverflowError:
+        # Some huge int overflows the float conversion; find it and reject only its row
+        for i in np.flatnonzero(numeric).tolist():
+            try:
+                converted[i] = float(objects[i])
+            except OverflowError:
+                flags[i] = ERROR_NOT_FINITE
+    return converted, flags
+
+def read_records(input_stream, input_format, feature_names):
+    """
+    Lazily read student records from an NDJSON or CSV stream.
+    
+    Args:
+        input_stream: Open text stream to read from
+        input_format (str): 'ndjson' or 'csv'
+        feature_names (list): Columns to convert to numbers when reading CSV
+        
+    Yields:
+        dict: One student record per line/row
+    """
+    if input_format == 'csv':
+        for row in csv.DictReader(input_stream):
+            for feature in feature_names:
+                if feature in row:
+                    try:
+                        row[feature] = float(row[feature])
+                    except (TypeError, ValueError):
+                        pass  # Left as-is so validation rejects the row
+            yield row
+    else:
+        for line in input_stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def iter_input_chunks(input_source, input_format, feature_names, chunk_size):
+    """
+    Read input in chunks, as records for text formats or as columns for columnar data.
+    
+    Args:
+        input_source: Open text stream, or a dataset path when input_format is 'columnar'
+        input_format (str): 'ndjson', 'csv' or 'columnar'
+        feature_names (list): Model features; columnar reads load only these columns
+        chunk_size (int): Rows per chunk
+        
+    Yields:
+        tuple: (first_row, records, columns, n_rows) - records is None for
+        columnar input, columns is None for text input
+    """
+    if input_format == 'columnar':
+        for first_row, columns in iter_column_chunks(input_source, feature_names, chunk_size):
+            yield first_row, None, columns, len(next(iter(columns.values())))
+        return
+    
+    records = read_records(input_source, input_format, feature_names)
+    first_row = 0
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield first_row, chunk, None, len(chunk)
+        first_row += len(chunk)
+
+def encode_results(predictor, indices, features_array, scores, confidences, records=None,
+                   first_row=0, echo_inputs=True):
+    """
+    Encode scored rows as NDJSON text.
+    
+    Args:
+        predictor (StudentPerformancePredictor): Predictor that scored the rows
+        indices, features_array, scores, confidences: Output of score_columns
+        records (list): Original input dictionaries to echo; without them the
+            validated feature values are echoed
+        first_row (int): Input row number of the first row in the chunk
+        echo_inputs (bool): Include input_features and model_info in each result
+        
+    Returns:
+        str: One JSON result per line
+    """
+    lines = []
+    personas = predictor.assign_personas(features_array, scores)
+    personas = itertools.repeat(None) if personas is None else personas.tolist()
+    intervals = predictor.prediction_intervals(scores)
+    intervals = itertools.repeat(None) if intervals is None else intervals
+    explanations = predictor.explain_rows(features_array)
+    explanations = itertools.repeat(None) if explanations is None else explanations
+    with predictor.metrics.stage('build_results'):
+        for k, (i, score, confidence, persona, interval, explanation) in enumerate(
+                zip(indices.tolist(), scores, confidences, personas, intervals, explanations)):
+            if not echo_inputs:
+                input_data = None
+            elif records is not None:
+                input_data = records[i]
+            else:
+                input_data = dict(zip(predictor.feature_names, features_array[k].tolist()))
+            result = predictor._build_result(input_data, score, confidence, echo_inputs, persona, interval,
+                                             explanation)
+            result['student_index'] = first_row + i
+            lines.append(json.dumps(result) + '\n')
+    return ''.join(lines)
+
+def encode_chunk(predictor, records, first_row=0, echo_inputs=True):
+    """
+    Score one chunk of records and encode the output as NDJSON text.
+    
+    Args:
+        predictor (StudentPerformancePredictor): Loaded predictor
+        records (list): Input dictionaries
+        first_row (int): Input row number of the first record
+        echo_inputs (bool): Include input_features and model_info in each result
+        
+    Returns:
+        tuple: (results_text, rejects_text, rows_scored)
+    """
+    codes, indices, features_array, scores, confidences = predictor.score_columns(
+        predictor._records_to_columns(records), len(records))
+    results_text = encode_results(predictor, indices, features_array, scores, confidences,
+                                  records, first_row, echo_inputs)
+    rejects_text = ''.join(json.dumps(entry) + '\n' for entry in rejected_entries(codes, first_row))
+    return results_text, rejects_text, len(indices)
+
+def prediction_schema(predictor, echo_inputs=False):
+    """Column types of columnar prediction output."""
+    schema = {
+        'student_index': np.int64,
+        'predicted_assessment_score': np.float64,
+        'confidence': np.float64,
+    }
+    if predictor.intervals is not None:
+        schema['interval_lower'] = np.float64
+        schema['interval_upper'] = np.float64
+    if predictor.personas is not None:
+        schema['persona'] = predictor.personas.labels
+    if predictor.explain:
+        schema.update({f'contribution_{feature}': np.float64 for feature in predictor.feature_names})
+    if echo_inputs:
+        schema.update({feature: np.float64 for feature in predictor.feature_names})
+    return schema
+
+def prediction_columns(predictor, indices, features_array, scores, confidences, first_row=0, echo_inputs=False):
+    """
+    Typed output columns for one scored chunk.
+    
+    Scores are clipped to 0-100 like the JSON output but kept at full precision.
+    
+    Returns:
+        dict: Column name -> array, matching prediction_schema
+    """
+    columns = {
+        'student_index': indices + first_row,
+        'predicted_assessment_score': np.clip(scores, 0, 100),
+        'confidence': confidences,
+    }
+    if predictor.intervals is not None:
+        columns['interval_lower'], columns['interval_upper'] = predictor.intervals.bounds(scores)
+    if predictor.personas is not None:
+        columns['persona'] = predictor.assign_personas(features_array, scores)
+    if predictor.explain:
+        with predictor.metrics.stage('explain'):
+            _, contributions = predictor.feature_contributions(features_array)
+        for j, feature in enumerate(predictor.feature_names):
+            columns[f'contribution_{feature}'] = contributions[:, j]
+    if echo_inputs:
+        for j, feature in enumerate(predictor.feature_names):
+            columns[feature] = features_array[:, j]
+    return columns
+
+def stream_predictions(predictor, input_stream, output_stream, input_format='ndjson',
+                       chunk_size=DEFAULT_CHUNK_SIZE, progress_stream=sys.stderr, rejects_stream=None,
+                       echo_inputs=True):
+    """
+    Score input in fixed-size chunks, writing results as they are produced.
+    
+    Only one chunk of inputs and results is held in memory at a time.
+    
+    Args:
+        predictor (StudentPerformancePredictor): Loaded predictor
+        input_stream: Open text stream with NDJSON or CSV records, or a
+            dataset path when input_format is 'columnar'
+        output_stream: Open text stream receiving one JSON result per line,
+            or a ColumnWriter receiving typed prediction columns
+        input_format (str): 'ndjson', 'csv' or 'columnar'
+        chunk_size (int): Number of records scored per batch
+        progress_stream: Stream for the progress counter, or None to disable
+        rejects_stream: Optional stream receiving one JSON line per rejected row
+        echo_inputs (bool): Include the input features in each result
+        
+    Returns:
+        tuple: (rows_read, rows_scored)
+    """
+    rows_read = 0
+    rows_scored = 0
+    
+    chunks = iter_input_chunks(input_stream, input_format, predictor.feature_names, chunk_size)
+    for first_row, records, columns, n_rows in chunks:
+        if columns is None:
+            columns = predictor._records_to_columns(records)
+        codes, indices, features_array, scores, confidences = predictor.score_columns(columns, n_rows)
+        
+        if isinstance(output_stream, ColumnWriter):
+            with predictor.metrics.stage('build_results'):
+                output_columns = prediction_columns(predictor, indices, features_array, scores, confidences,
+                                                    first_row, echo_inputs)
+            output_stream.append(output_columns)
+        else:
+            output_stream.write(encode_results(predictor, indices, features_array, scores, confidences,
+                                               records, first_row, echo_inputs))
+        if rejects_stream is not None:
+            rejects_stream.write(''.join(json.dumps(entry) + '\n' for entry in rejected_entries(codes, first_row)))
+        
+        rows_read += n_rows
+        rows_scored += len(indices)
+        if progress_stream is not None:
+            print(f"\rScored {rows_scored:,} of {rows_read:,} rows", end='', file=progress_stream, flush=True)
+    
+    if not isinstance(output_stream, ColumnWriter):
+        output_stream.flush()
+    if progress_stream is not None:
+        print(file=progress_stream)
+    
+    return rows_read, rows_scored
+
+def infer_stream_format(path):
+    """Guess the streaming input format from a file extension."""
+    if is_columnar_path(path):
+        return 'columnar'
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+def run_stream(args):
+    """
+    Handle --stream mode: results go to the output file or stdout, everything else to stderr.
+    
+    Returns:
+        bool: True if every chunk was scored
+    """
+    results_stream = sys.stdout
+    input_format = args.format or ('ndjson' if args.input == '-' else infer_stream_format(args.input))
+    columnar_output = bool(args.output) and is_columnar_path(args.output)
+    echo_inputs = not columnar_output if args.echo_inputs is None else args.echo_inputs
+    
+    # Keep stdout clean for results; diagnostics are routed to stderr
+    with contextlib.redirect_stdout(sys.stderr), contextlib.ExitStack() as stack:
+        if args.input == '-':
+            input_stream = sys.stdin
+        elif input_format == 'columnar':
+            input_stream = args.input
+        else:
+            input_stream = stack.enter_context(open(args.input, 'r', newline=''))
+        rejects_stream = stack.enter_context(open(args.rejects, 'w')) if args.rejects else None
+        
+        if args.workers > 1 or args.shard_dir:
+            # Imported here: parallel_predict imports this module for its workers
+            from parallel_predict import score_parallel
+            
+            output_stream = stack.enter_context(open(args.output, 'w')) if args.output and not args.shard_dir else results_stream
+            summary = score_parallel(
+                input_stream, output_stream, input_format, args.chunk_size, args.workers,
+                args.model, args.model_info, args.cache_size, args.cache_precision,
+                personas_path=args.personas, shard_dir=args.shard_dir, rejects_stream=rejects_stream, echo_inputs=echo_inputs,
+                interval_level=args.intervals, explain=args.explain,
+            )
+            rows_read, rows_scored = summary['rows_read'], summary['rows_scored']
+            elapsed = summary['elapsed_seconds']
+            predictor = None
+        else:
+            predictor = create_predictor(args)
+            if columnar_output:
+                metadata = {'model_info': predictor.describe_model(), 'source': args.input}
+                if predictor.explain:
+                    # Shared by every row, so stored once instead of as a column
+                    metadata['contribution_baseline'] = predictor.feature_contributions(
+                        np.empty((0, len(predictor.feature_names))))[0]
+                output_stream = stack.enter_context(ColumnWriter(
+                    args.output, prediction_schema(predictor, echo_inputs), metadata=metadata,
+                ))
+            elif args.output:
+                output_stream = stack.enter_context(open(args.output, 'w'))
+            else:
+                output_stream = results_stream
+            start_time = time.perf_counter()
+            with profile_if_requested(predictor, args):
+                rows_read, rows_scored = stream_predictions(
+                    predictor, input_stream, output_stream, input_format, args.chunk_size,
+                    rejects_stream=rejects_stream, echo_inputs=echo_inputs,
+                )
+            elapsed = time.perf_counter() - start_time
+            summary = {'failed_chunks': 0}
+        
+        rows_per_sec = rows_scored / elapsed if elapsed > 0 else float('inf')
+        print(f"Stream prediction completed: {rows_scored}/{rows_read} rows scored "
+              f"in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec, {args.workers} worker(s))")
+        if args.shard_dir:
+            print(f"Shards and manifest saved to {args.shard_dir}")
+        elif args.output:
+            print(f"Results saved to {args.output}")
+        if args.rejects:
+            print(f"Rejected rows and reasons saved to {args.rejects}")
+        if summary['failed_chunks']:
+            print(f"Warning: {summary['failed_chunks']} chunk(s) failed ({summary['rows_failed']} rows)")
+        if predictor is not None:
+            print_cache_stats(predictor)
+            print_drift(predictor)
+            if args.metrics_file:
+                write_metrics_file(predictor, args.metrics_file)
+                print(f"Metrics saved to {args.metrics_file}")
+    
+    return summary['failed_chunks'] == 0
+
+def create_predictor(args):
+    """Build the predictor described by the command line options, exiting if the model cannot be loaded."""
+    cache = PredictionCache(args.cache_size, args.cache_precision) if args.cache_size else None
+    personas = PersonaModel.load(args.personas) if args.personas else None
+    try:
+        return StudentPerformancePredictor(args.model, args.model_info, cache=cache, personas=personas,
+                                           interval_level=args.intervals, explain=args.explain,
+                                           monitor_drift=args.monitor_drift)
+    except ModelLoadError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+@contextlib.contextmanager
+def profile_if_requested(predictor, args):
+    """Profile the enclosed scoring with --profile, reporting where the files went."""
+    if not args.profile:
+        yield
+        return
+    with predictor.profile(args.profile_output) as profiler:
+        yield
+    print(f"Profile ({profiler.wall_seconds:.2f}s, peak traced memory {profiler.peak_bytes / 1e6:.1f} MB) "
+          f"saved to {args.profile_output}.txt, .json and .prof")
+
+def print_drift(predictor):
+    """Print the input drift table when drift monitoring is on."""
+    snapshot = predictor.drift_snapshot()
+    if snapshot is not None:
+        print(format_snapshot(snapshot))
+
+def write_metrics_file(predictor, path):
+    """Write the predictor's metrics in the Prometheus text format, replacing the file atomically."""
+    with open(path + '.tmp', 'w') as f:
+        f.write(predictor.metrics.render_prometheus())
+    os.replace(path + '.tmp', path)
+
+def print_cache_stats(predictor):
+    """Print cache effectiveness when caching is enabled."""
+    if predictor.cache is not None:
+        stats = predictor.cache.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions "
+              f"(hit rate {stats['hit_rate']:.1%}, {stats['size']}/{stats['max_size']} entries)")
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Predict student assessment scores from cognitive skills.",
+        epilog="Examples:\n"
+               "  python predict.py examples/sample_input.json\n"
+               "  python predict.py '{\"comprehension\": 75, \"attention\": 80, ...}'\n"
+               "  python predict.py --stream students.csv results.ndjson\n"
+               "  python predict.py --stream students.columns predictions.columns\n"
+               "  python predict.py --stream --workers 8 --shard-dir out/ students.ndjson\n"
+               "  cat students.ndjson | python predict.py --stream - > results.ndjson",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('input', help="Input JSON file or JSON string ('-' reads stdin in --stream mode)")
+    parser.add_argument('output', nargs='?', help="Optional output file")
+    parser.add_argument('--model', default='models/final_model.pkl',
+                        help="Trained model: pickled sklearn forest, .forest directory or .npz artifact "
+                             "(a newer .forest next to the pickle is picked automatically)")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle")
+    parser.add_argument('--personas',
+                        help="Persona model from src/personas.py (e.g. models/personas.npz); "
+                             "each result then includes the student's persona")
+    parser.add_argument('--intervals', type=float, metavar='LEVEL',
+                        help="Add a calibrated prediction interval at this coverage (e.g. 0.9) to every "
+                             "result; needs calibration residuals in the model info (src/train.py, src/intervals.py)")
+    parser.add_argument('--explain', action='store_true',
+                        help="Add each student's per-feature contributions to the predicted score (decision-path "
+                             "attribution for forests) to every result")
+    parser.add_argument('--monitor-drift', action='store_true',
+                        help="Report how far the scored inputs drift from the training data (PSI and KS per "
+                             "feature); needs drift reference stats in the model info (src/train.py, src/drift.py)")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="Cache up to this many distinct feature vectors (default: 0, disabled)")
+    parser.add_argument('--cache-precision', type=int, default=DEFAULT_CACHE_PRECISION,
+                        help=f"Decimals kept in cache keys; inputs are scored at this precision "
+                             f"(default: {DEFAULT_CACHE_PRECISION})")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream NDJSON/CSV input in chunks and write NDJSON results incrementally")
+    parser.add_argument('--format', choices=['ndjson', 'csv', 'columnar'],
+                        help="Input format for --stream (default: from file extension, ndjson for stdin); "
+                             "columnar means a .columns directory or .parquet file")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Records scored per batch in --stream mode (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--rejects',
+                        help="With --stream, write rows that fail validation (with reasons) to this NDJSON file")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Score --stream chunks in this many worker processes (default: 1)")
+    parser.add_argument('--shard-dir',
+                        help="With --stream, write one NDJSON file per chunk plus manifest.json here "
+                             "instead of a single in-order output")
+    parser.add_argument('--metrics-file',
+                        help="Write stage timings and row counters here in the Prometheus text format "
+                             "when done (e.g. for a node_exporter textfile collector)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the scoring run (cProfile and tracemalloc) and write a ranked report of "
+                             "stages, functions and allocation sites")
+    parser.add_argument('--profile-output', default=DEFAULT_PROFILE_PREFIX,
+                        help=f"Path prefix of the --profile .txt report, .json dump and .prof cProfile stats "
+                             f"(default: {DEFAULT_PROFILE_PREFIX})")
+    parser.add_argument('--echo-inputs', action=argparse.BooleanOptionalAction, default=None,
+                        help="Include input features (and model_info in JSON) with every result "
+                             "(default: on for JSON output, off for .columns/.parquet output)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.cache_size < 0:
+        parser.error("--cache-size must not be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.intervals is not None and not 0 < args.intervals < 1:
+        parser.error("--intervals must be between 0 and 1")
+    if (args.workers > 1 or args.shard_dir or args.rejects) and not args.stream:
+        parser.error("--workers, --shard-dir and --rejects require --stream")
+    columnar = args.format == 'columnar' or is_columnar_path(args.input) or (args.output and is_columnar_path(args.output))
+    if columnar and not args.stream:
+        parser.error(".columns/.parquet input or output requires --stream")
+    if columnar and (args.workers > 1 or args.shard_dir):
+        parser.error(".columns/.parquet input or output is scored in a single process; drop --workers/--shard-dir")
+    if args.metrics_file and (args.workers > 1 or args.shard_dir):
+        parser.error("--metrics-file covers a single process; drop --workers/--shard-dir")
+    if args.profile and (args.workers > 1 or args.shard_dir):
+        parser.error("--profile covers a single process; drop --workers/--shard-dir")
+    if args.monitor_drift and (args.workers > 1 or args.shard_dir):
+        parser.error("--monitor-drift covers a single process; drop --workers/--shard-dir")
+    if args.format == 'columnar' and args.input == '-':
+        parser.error("columnar input must be a .columns directory or .parquet file, not stdin")
+    return args
+
 def main():
     """
     Main function to handle command line usage.
     """
-    if len(sys.argv) < 2:
-        print("Usage: python predict.py <input_json_file> [output_file]")
-        print("       python predict.py '{\"comprehension\": 75, \"attention\": 80, ...}'")
-        sys.exit(1)
+    args = parse_args()
+    
+    if args.stream:
+        try:
+            if not run_stream(args):
+                sys.exit(1)
+        except json.JSONDecodeError as e:
+            print(f"Error: Invalid JSON format - {e}", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
     
     # Initialize predictor
-    predictor = StudentPerformancePredictor()
+    predictor = create_predictor(args)
     
-    input_arg = sys.argv[1]
+    input_arg = args.input
     
     try:
         # Check if input is a file path or JSON string
@@ -202,17 +1272,21 @@ def main():
         # Handle single prediction or batch prediction
         if isinstance(input_data, list):
             # Batch prediction
-            results = predictor.predict_batch(input_data)
+            with profile_if_requested(predictor, args):
+                results = predictor.predict_batch(input_data, echo_inputs=args.echo_inputs is not False)
             print(f"\nBatch prediction completed for {len(results)} students")
+            print_cache_stats(predictor)
+            print_drift(predictor)
         else:
             # Single prediction
-            result = predictor.predict(input_data)
+            with profile_if_requested(predictor, args):
+                result = predictor.predict(input_data, echo_inputs=args.echo_inputs is not False)
             results = [result] if result else []
         
         # Output results
-        if len(sys.argv) > 2:
+        if args.output:
             # Save to output file
-            output_file = sys.argv[2]
+            output_file = args.output
             with open(output_file, 'w') as f:
                 json.dump(results, f, indent=2)
             print(f"Results saved to {output_file}")
@@ -230,6 +1304,10 @@ def main():
             print("-" * 30)
             for feature, imp in sorted(importance.items(), key=lambda x: x[1], reverse=True):
                 print(f"{feature}: {imp:.4f}")
+        
+        if args.metrics_file:
+            write_metrics_file(predictor, args.metrics_file)
+            print(f"Metrics saved to {args.metrics_file}")
     
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON format - {e}")
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Long-lived local prediction server.
+
+Loads StudentPerformancePredictor once and serves HTTP/JSON on localhost.
+Requests that arrive within a short window are micro-batched into a single
+model call, so concurrent dashboard traffic shares one forest prediction.
+GET /metrics exposes per-stage latency histograms and row counters in the
+Prometheus text format; GET /metrics.json returns the same as JSON.
+With --monitor-drift, GET /drift (optionally ?version=v2) reports how far
+the inputs scored so far have drifted from the model's training data.
+With --students, GET /students and GET /students/<id> search and page the
+indexed student store (src/student_store.py) for the dashboard's table.
+
+Models come from a ModelRegistry (src/model_registry.py): --model is served
+as version ``current``, or --model-dir serves every version in a directory
+(POST /predict?version=v2). Versions load on first use, and a model
+replaced on disk is reloaded in the background and swapped in between
+batches.
+
+Usage:
+    python src/predict_server.py --port 8765
+    curl -s localhost:8765/predict -d '{"comprehension": 75, "attention": 80, ...}'
+    python src/predict_server.py --model-dir models/
+    curl -s 'localhost:8765/predict?version=v2' -d '{"comprehension": 75, "attention": 80, ...}'
+    python src/predict_server.py --monitor-drift
+    curl -s localhost:8765/drift
+    python src/predict_server.py --students data/students.csv
+    curl -s 'localhost:8765/students?search=alex&class=A&limit=20'
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from model_registry import DEFAULT_MEMORY_LIMIT_MB, DEFAULT_POLL_INTERVAL, DEFAULT_VERSION, ModelRegistry
+from personas import PersonaModel
+from predict import ModelLoadError, StudentPerformancePredictor
+from prediction_cache import DEFAULT_CACHE_PRECISION, DEFAULT_CACHE_SIZE, PredictionCache
+from student_store import DEFAULT_PAGE_SIZE, StudentStore
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+# Largest /predict body accepted; a 10k-row batch is about 1.5 MB
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+class MicroBatcher:
+    """
+    Collects single predictions from many threads and scores them together.
+
+    The first queued request opens a batch window of ``max_wait_ms``; every
+    request that arrives before the window closes (up to ``max_batch_size``)
+    is scored in the same model call. Each request carries the predictor it
+    was validated with, so a batch spanning a model reload or several
+    versions is scored as one call per predictor.
+    """
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, input_data, predictor):
+        """
+        Queue one validated input for scoring.
+
+        Args:
+            input_data (dict): Validated input features
+            predictor (StudentPerformancePredictor): Model version to score it with
+
+        Returns:
+            Future: Resolves to the prediction result dict
+        """
+        future = Future()
+        self._queue.put((input_data, predictor, future))
+        return future
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            groups = {}
+            for input_data, predictor, future in batch:
+                groups.setdefault(id(predictor), (predictor, []))[1].append((input_data, future))
+            for predictor, requests in groups.values():
+                self._score(predictor, requests)
+
+    def _score(self, predictor, requests):
+        inputs = [input_data for input_data, _ in requests]
+        try:
+            features_array = predictor._build_feature_matrix(inputs)
+            scores, confidences = predictor._score_matrix(features_array)
+            personas = predictor.assign_personas(features_array, scores)
+            intervals = predictor.prediction_intervals(scores)
+            explanations = predictor.explain_rows(features_array)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+
+        personas = [None] * len(inputs) if personas is None else personas.tolist()
+        intervals = [None] * len(inputs) if intervals is None else intervals
+        explanations = [None] * len(inputs) if explanations is None else explanations
+        with predictor.metrics.stage('build_results'):
+            results = [predictor._build_result(input_data, score, confidence, persona=persona,
+                                               interval=interval, explanation=explanation)
+                       for input_data, score, confidence, persona, interval, explanation
+                       in zip(inputs, scores, confidences, personas, intervals, explanations)]
+        for (_, future), result in zip(requests, results):
+            future.set_result(result)
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler for /predict, /students, /drift, /health and /metrics."""
+
+    protocol_version = 'HTTP/1.1'
+    # Small JSON responses on a keep-alive socket would otherwise wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send_text(200, self.server.registry.get().metrics.render_prometheus(),
+                            'text/plain; version=0.0.4; charset=utf-8')
+        elif self.path == '/metrics.json':
+            self._send_json(200, self.server.registry.get().metrics.snapshot())
+        elif self.path == '/health':
+            registry = self.server.registry
+            predictor = registry.get()
+            self._send_json(200, {
+                'status': 'ok',
+                'model_type': predictor.model_info['model_type'] if predictor.model_info else 'Unknown',
+                'features': predictor.feature_names,
+                'cache': predictor.cache.stats() if predictor.cache is not None else None,
+                'students': self.server.students.n_rows if self.server.students is not None else None,
+                'default_version': registry.default_version,
+                'model_versions': registry.versions(),
+            })
+        elif self.path == '/drift' or self.path.startswith('/drift?'):
+            self._send_drift()
+        elif self.path == '/students' or self.path.startswith(('/students?', '/students/')):
+            self._send_students()
+        else:
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+
+    def _predictor_for(self, query):
+        """
+        Predictor for the request's ?version= (default version if absent).
+
+        Returns:
+            tuple: (version, predictor), or (version, None) after an error
+            response has been sent
+        """
+        registry = self.server.registry
+        version = parse_qs(query).get('version', [registry.default_version])[0]
+        try:
+            return version, registry.get(version)
+        except KeyError:
+            self._send_json(404, {'error': f'Unknown model version: {version}', 'versions': registry.names()})
+        except ModelLoadError as e:
+            self._send_json(503, {'error': f'Model version {version} is unavailable - {e}'})
+        return version, None
+
+    def _send_drift(self):
+        version, predictor = self._predictor_for(urlsplit(self.path).query)
+        if predictor is None:
+            return
+        snapshot = predictor.drift_snapshot()
+        if snapshot is None:
+            self._send_json(404, {'error': 'Drift monitoring is off; start the server with --monitor-drift'})
+            return
+        self._send_json(200, snapshot, {'X-Model-Version': version})
+
+    def _send_students(self):
+        store = self.server.students
+        if store is None:
+            self._send_json(404, {'error': 'Student store not loaded (start the server with --students)'})
+            return
+
+        url = urlsplit(self.path)
+        if url.path.startswith('/students/'):
+            student = store.get(unquote(url.path[len('/students/'):]))
+            if student is None:
+                self._send_json(404, {'error': 'Student not found'})
+            else:
+                self._send_json(200, {'student': student})
+            return
+
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        try:
+            result = store.query(
+                search=params.get('search') or None,
+                class_name=params.get('class') or None,
+                persona=params.get('persona') or None,
+                limit=int(params.get('limit', DEFAULT_PAGE_SIZE)),
+                after=params.get('after') or None,
+                page=int(params.get('page', 1)),
+            )
+        except ValueError as e:
+            self._send_json(400, {'error': f'Invalid query parameter - {e}'})
+            return
+        except KeyError as e:
+            self._send_json(400, {'error': str(e.args[0])})
+            return
+        self._send_json(200, result)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/predict':
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_BYTES:
+            # The body cannot be skipped reliably, so this connection is not reused
+            self.close_connection = True
+            status = 413 if length > MAX_BODY_BYTES else 400
+            self._send_json(status, {'error': f'Content-Length must be between 0 and {MAX_BODY_BYTES} bytes',
+                                     'content_length': self.headers.get('Content-Length')})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': f'Invalid JSON format - {e}'})
+            return
+
+        # Held for the whole request, so a concurrent reload cannot switch models mid-request
+        version, predictor = self._predictor_for(url.query)
+        if predictor is None:
+            return
+
+        is_batch = isinstance(payload, list)
+        inputs = payload if is_batch else [payload]
+
+        for input_data in inputs:
+            if not isinstance(input_data, dict) or not predictor.validate_input(input_data):
+                self._send_json(400, {'error': 'Invalid input features',
+                                      'required_features': predictor.feature_names})
+                return
+
+        try:
+            futures = [self.server.batcher.submit(input_data, predictor) for input_data in inputs]
+            results = [future.result(timeout=self.server.request_timeout) for future in futures]
+        except Exception as e:
+            self._send_json(500, {'error': f'Error making prediction: {e}'})
+            return
+
+        self._send_json(200, results if is_batch else results[0], {'X-Model-Version': version})
+
+    def _send_json(self, status, body, headers=None):
+        self._send_text(status, json.dumps(body), 'application/json', headers)
+
+    def _send_text(self, status, text, content_type, headers=None):
+        data = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class PredictionServer(ThreadingHTTPServer):
+    """Threaded HTTP server that shares one model registry, micro-batcher and optional student store."""
+
+    daemon_threads = True
+
+    def __init__(self, address, registry, batcher, request_timeout=5.0, verbose=False, students=None):
+        super().__init__(address, PredictionRequestHandler)
+        self.registry = registry
+        self.batcher = batcher
+        self.students = students
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Serve StudentPerformancePredictor over HTTP/JSON.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument('--model', default='models/final_model.pkl', help="Path to the trained model")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Path to the model info")
+    parser.add_argument('--model-dir',
+                        help="Serve every model version in this directory instead of --model "
+                             "(final_model.pkl as 'current', final_model.v2.pkl as 'v2', ...)")
+    parser.add_argument('--default-version', default=DEFAULT_VERSION,
+                        help=f"Version used when a request names none (default: {DEFAULT_VERSION})")
+    parser.add_argument('--memory-limit-mb', type=float, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"Model artifact MB kept loaded; least recently used versions are dropped "
+                             f"beyond it (default: {DEFAULT_MEMORY_LIMIT_MB})")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between checks for replaced model files, 0 to disable "
+                             f"(default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument('--personas', help="Persona model (e.g. models/personas.npz) to label each prediction")
+    parser.add_argument('--intervals', type=float, metavar='LEVEL',
+                        help="Add a calibrated prediction interval at this coverage (e.g. 0.9) to every prediction")
+    parser.add_argument('--explain', action='store_true',
+                        help="Add per-feature contributions to the predicted score to every prediction")
+    parser.add_argument('--monitor-drift', action='store_true',
+                        help="Track input drift from the training data per model version and serve it at /drift")
+    parser.add_argument('--students',
+                        help="Student data (CSV, .columns or .parquet) to serve at /students; "
+                             "personas come from --personas when given")
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f"Largest micro-batch sent to the model (default: {DEFAULT_MAX_BATCH_SIZE})")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f"How long a batch window stays open (default: {DEFAULT_MAX_WAIT_MS})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Cached feature vectors, 0 disables the cache (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument('--cache-precision', type=int, default=DEFAULT_CACHE_PRECISION,
+                        help=f"Decimals kept in cache keys (default: {DEFAULT_CACHE_PRECISION})")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+    if args.reload_interval < 0:
+        parser.error("--reload-interval must not be negative")
+    return args
+
+def main():
+    """Start the prediction server."""
+    args = parse_args()
+
+    personas = PersonaModel.load(args.personas) if args.personas else None
+
+    def create_predictor(model_path, model_info_path):
+        # Each version (and each reload) gets its own cache, bound to that model file
+        cache = PredictionCache(args.cache_size, args.cache_precision) if args.cache_size else None
+        return StudentPerformancePredictor(model_path, model_info_path, cache=cache, personas=personas,
+                                           interval_level=args.intervals, explain=args.explain,
+                                           monitor_drift=args.monitor_drift)
+
+    registry_options = {'predictor_factory': create_predictor, 'memory_limit_mb': args.memory_limit_mb,
+                        'default_version': args.default_version}
+    if args.model_dir:
+        registry = ModelRegistry.discover(args.model_dir, **registry_options)
+    else:
+        registry = ModelRegistry(**registry_options)
+        registry.register(args.default_version, args.model, args.model_info)
+    try:
+        # Load the default version up front so the first request does not wait for it
+        registry.get()
+    except (KeyError, ModelLoadError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Model versions: {', '.join(registry.names())} (default: {registry.default_version})")
+    if args.reload_interval:
+        registry.start_watching(args.reload_interval)
+    batcher = MicroBatcher(args.max_batch_size, args.max_wait_ms)
+    students = None
+    if args.students:
+        start_time = time.perf_counter()
+        students = StudentStore.load(args.students, personas)
+        print(f"Indexed {students.n_rows:,} students from {args.students} in {time.perf_counter() - start_time:.2f}s")
+    server = PredictionServer((args.host, args.port), registry, batcher, verbose=args.verbose, students=students)
+
+    print(f"Prediction server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down prediction server")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
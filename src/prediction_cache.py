@@ -0,0 +1,148 @@
+"""
+In-process LRU cache for prediction results.
+
+Feature vectors are quantized to a fixed number of decimals and used as keys,
+so repeated and near-identical skill profiles are scored once. Entries belong
+to one model file; binding the cache to a different model clears it.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_CACHE_PRECISION = 1
+# Scaled values must stay below 2**53 to round-trip exactly through int64 and float64
+MAX_EXACT_STEPS = 2.0 ** 53
+
+class PredictionCache:
+    """
+    Bounded LRU cache mapping quantized feature vectors to (score, confidence).
+
+    Args:
+        max_size (int): Maximum number of cached feature vectors
+        precision (int): Decimals kept when quantizing features into keys
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, precision=DEFAULT_CACHE_PRECISION):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.precision = precision
+        self._scale = 10.0 ** precision
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_signature = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def quantize(self, features_array):
+        """
+        Quantize an N x F feature matrix.
+
+        Rows with a non-finite value or one too large to quantize exactly get
+        the key None and keep their original values; they are scored as given
+        and never cached.
+
+        Returns:
+            tuple: (keys, quantized) - one hashable key (or None) per row, and
+            the float matrix the keys represent, which is what gets scored
+        """
+        features_array, steps, cacheable = self._steps(features_array)
+        # One fixed-width bytes object per row
+        keys = steps.view(np.dtype((np.void, steps.dtype.itemsize * steps.shape[1]))).ravel().tolist()
+        quantized = self._unscale(features_array, steps, cacheable)
+        for i in np.flatnonzero(~cacheable).tolist():
+            keys[i] = None
+        return keys, quantized
+
+    def quantized_values(self, features_array):
+        """The matrix quantize() would score, without building keys."""
+        return self._unscale(*self._steps(features_array))
+
+    def _steps(self, features_array):
+        features_array = np.asarray(features_array, dtype=np.float64)
+        scaled = features_array * self._scale
+        # NaN compares False, so it is uncacheable too
+        cacheable = np.all(np.abs(scaled) < MAX_EXACT_STEPS, axis=1)
+        if not cacheable.all():
+            scaled = np.where(cacheable[:, None], scaled, 0.0)
+        return features_array, np.ascontiguousarray(np.rint(scaled).astype(np.int64)), cacheable
+
+    def _unscale(self, features_array, steps, cacheable):
+        quantized = steps / self._scale
+        if not cacheable.all():
+            uncacheable = np.flatnonzero(~cacheable)
+            quantized[uncacheable] = features_array[uncacheable]
+        return quantized
+
+    def bind_model(self, signature):
+        """Associate the cache with a model file, clearing it if the model changed."""
+        with self._lock:
+            if self._model_signature is not None and signature != self._model_signature:
+                self._entries.clear()
+                self.invalidations += 1
+            self._model_signature = signature
+
+    def get_many(self, keys):
+        """
+        Look up many keys at once.
+
+        Returns:
+            list: Cached (score, confidence) tuples, None for misses and None keys
+        """
+        values = []
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    values.append(None)
+                    continue
+                value = self._entries.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def put_many(self, keys, values):
+        """Insert (score, confidence) tuples, evicting least recently used entries."""
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Snapshot of cache effectiveness.
+
+        Returns:
+            dict: Size, hits, misses, evictions, invalidations and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'precision': self.precision,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,246 @@
+"""
+CPU and allocation profiling of scoring runs.
+
+ScoringProfiler runs cProfile and tracemalloc around a block of scoring
+calls. While it is attached to a predictor's PredictorMetrics, every
+``metrics.stage(...)`` block also records its calls, time and peak traced
+memory, so the report shows which stage (predict, confidence, build_results,
+...) allocates the most next to the hottest functions.
+
+``write(prefix)`` produces three files:
+    - ``prefix.txt``: ranked report (stages, top functions by own time,
+      top allocation sites)
+    - ``prefix.json``: the same data, machine-readable
+    - ``prefix.prof``: raw cProfile statistics for pstats or snakeviz
+
+Tracing allocations slows scoring down, so profile a representative slice
+of a job rather than a production run. Stage memory is tracked for the
+thread that owns the profiler.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+DEFAULT_TOP = 25
+# Frames kept per allocation; 1 groups allocations by the line that made them
+TRACEMALLOC_FRAMES = 1
+# A new high-water snapshot is only taken once traced memory has grown this much
+SNAPSHOT_MIN_GROWTH_BYTES = 1024 * 1024
+
+class _StageFrame:
+    __slots__ = ('name', 'start_bytes', 'peak_bytes', 'start_time', 'start_overhead')
+
+    def __init__(self, name, start_bytes, start_time, start_overhead):
+        self.name = name
+        self.start_bytes = start_bytes
+        self.peak_bytes = start_bytes
+        self.start_time = start_time
+        self.start_overhead = start_overhead
+
+class _ProfiledStage:
+    """Wraps a metrics StageTimer and reports the stage to the profiler."""
+
+    __slots__ = ('profiler', 'name', 'timer')
+
+    def __init__(self, profiler, name, timer):
+        self.profiler = profiler
+        self.name = name
+        self.timer = timer
+
+    def __enter__(self):
+        self.profiler._enter_stage(self.name)
+        self.timer.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.__exit__(exc_type, exc, tb)
+        self.profiler._exit_stage()
+
+class ScoringProfiler:
+    """
+    cProfile plus tracemalloc over a scoring run, with per-stage peak memory.
+
+    Args:
+        top (int): Functions and allocation sites kept in the report
+    """
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self._profile = cProfile.Profile()
+        self._stack = []
+        self._stages = {}
+        self._thread = None
+        self._owns_tracemalloc = False
+        self._snapshot = None
+        self._snapshot_bytes = -1
+        self._run_peak = 0
+        # Seconds spent taking snapshots, left out of the wall and stage times
+        self._overhead = 0.0
+        self.wall_seconds = None
+        self.peak_bytes = None
+
+    def start(self):
+        """Start tracing allocations and profiling the calling thread."""
+        self._thread = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start_time = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        """Stop profiling and keep the allocation snapshot for the report."""
+        self._profile.disable()
+        self.wall_seconds = time.perf_counter() - self._start_time - self._overhead
+        self.peak_bytes = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+        self._snapshot_if_highest(final=True)
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+    def _snapshot_if_highest(self, final=False):
+        """
+        Keep an allocation snapshot of the highest memory seen at a stage boundary.
+
+        Snapshots are taken with cProfile paused, so they never show up among
+        the hot functions, and only after meaningful growth, since each one
+        walks every traced block.
+        """
+        current = tracemalloc.get_traced_memory()[0]
+        if current <= self._snapshot_bytes + (0 if self._snapshot is None else SNAPSHOT_MIN_GROWTH_BYTES):
+            return
+        start_time = time.perf_counter()
+        if not final:
+            self._profile.disable()
+        self._snapshot_bytes = current
+        self._snapshot = tracemalloc.take_snapshot()
+        if not final:
+            self._profile.enable()
+        self._overhead += time.perf_counter() - start_time
+
+    def stage(self, name, timer):
+        """Profiled wrapper around a metrics stage timer (see PredictorMetrics.stage)."""
+        if threading.get_ident() != self._thread:
+            return timer
+        return _ProfiledStage(self, name, timer)
+
+    def _enter_stage(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        # Every stage resets tracemalloc's peak, so the run's peak is tracked here
+        self._run_peak = max(self._run_peak, peak)
+        if self._stack:
+            # The peak is reset for the inner stage, so fold the outer one's peak so far into it first
+            self._stack[-1].peak_bytes = max(self._stack[-1].peak_bytes, peak)
+        tracemalloc.reset_peak()
+        self._stack.append(_StageFrame(name, current, time.perf_counter(), self._overhead))
+
+    def _exit_stage(self):
+        frame = self._stack.pop()
+        frame.peak_bytes = max(frame.peak_bytes, tracemalloc.get_traced_memory()[1])
+        seconds = time.perf_counter() - frame.start_time - (self._overhead - frame.start_overhead)
+        # Taken before the caller drops the stage's results
+        self._snapshot_if_highest()
+        if self._stack:
+            self._stack[-1].peak_bytes = max(self._stack[-1].peak_bytes, frame.peak_bytes)
+
+        stats = self._stages.setdefault(frame.name, {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0})
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['peak_bytes'] = max(stats['peak_bytes'], frame.peak_bytes - frame.start_bytes)
+
+    def report(self):
+        """
+        Ranked profile of the run.
+
+        Returns:
+            dict: 'wall_seconds', 'peak_memory_bytes', 'stages' (calls, seconds
+            and peak bytes above the stage's starting memory, slowest first),
+            'functions' (top by own time) and 'allocations' (top sites by
+            size when traced memory was highest at a stage boundary)
+        """
+        stats = pstats.Stats(self._profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        allocations = []
+        if self._snapshot is not None:
+            allocations = self._snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            ]).statistics('lineno')[:self.top]
+        return {
+            'wall_seconds': self.wall_seconds,
+            'peak_memory_bytes': self.peak_bytes,
+            'stages': dict(sorted(self._stages.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+            'functions': [
+                {
+                    'function': name,
+                    'file': filename,
+                    'line': line,
+                    'calls': calls,
+                    'primitive_calls': primitive_calls,
+                    'own_seconds': own_seconds,
+                    'cumulative_seconds': cumulative_seconds,
+                }
+                for (filename, line, name), (primitive_calls, calls, own_seconds, cumulative_seconds, _)
+                in functions
+            ],
+            'allocations': [
+                {
+                    'file': stat.traceback[0].filename,
+                    'line': stat.traceback[0].lineno,
+                    'size_bytes': stat.size,
+                    'count': stat.count,
+                }
+                for stat in allocations
+            ],
+        }
+
+    def format_report(self, report=None):
+        """Human-readable version of report()."""
+        report = report or self.report()
+        lines = [
+            f"Wall time {report['wall_seconds']:.3f}s, peak traced memory {report['peak_memory_bytes'] / 1e6:.1f} MB",
+            '',
+            'Stages (slowest first; peak is above the memory at stage start):',
+            f"  {'stage':<16}{'calls':>10}{'seconds':>12}{'peak MB':>12}",
+        ]
+        for name, stats in report['stages'].items():
+            lines.append(f"  {name:<16}{stats['calls']:>10,}{stats['seconds']:>12.4f}{stats['peak_bytes'] / 1e6:>12.2f}")
+
+        lines += ['', 'Top functions by own time:',
+                  f"  {'calls':>10}{'own s':>10}{'cum s':>10}  function"]
+        for entry in report['functions']:
+            location = f"{os.path.basename(entry['file'])}:{entry['line']}" if entry['line'] else entry['file']
+            lines.append(f"  {entry['calls']:>10,}{entry['own_seconds']:>10.4f}{entry['cumulative_seconds']:>10.4f}"
+                         f"  {entry['function']} ({location})")
+
+        lines += ['', f"Top allocation sites at the memory high-water mark ({self._snapshot_bytes / 1e6:.1f} MB):",
+                  f"  {'MB':>10}{'blocks':>10}  location"]
+        for entry in report['allocations']:
+            lines.append(f"  {entry['size_bytes'] / 1e6:>10.3f}{entry['count']:>10,}  {entry['file']}:{entry['line']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, prefix):
+        """
+        Write ``prefix.txt``, ``prefix.json`` and ``prefix.prof``, each replaced atomically.
+
+        Returns:
+            list: Paths written
+        """
+        report = self.report()
+        outputs = (
+            (f'{prefix}.txt', lambda f: f.write(self.format_report(report))),
+            (f'{prefix}.json', lambda f: json.dump(report, f, indent=2)),
+        )
+        for path, write in outputs:
+            with open(path + '.tmp', 'w') as f:
+                write(f)
+            os.replace(path + '.tmp', path)
+        self._profile.dump_stats(f'{prefix}.prof.tmp')
+        os.replace(f'{prefix}.prof.tmp', f'{prefix}.prof')
+        return [path for path, _ in outputs] + [f'{prefix}.prof']
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+In-memory student store with indexed search and keyset pagination.
+
+Students are held column-wise (fixed-width ID bytes, category codes for
+name, class and persona, one NumPy array per score), so a million students
+take a few tens of MB. Three indexes answer queries without touching
+every record:
+    - an ID index (IDs sorted once, looked up with binary search) for exact
+      lookups, ID-prefix search and resolving pagination cursors
+    - a trigram index over the distinct names for substring search, with
+      queries shorter than three characters matched as name prefixes
+    - class and persona codes, combined with the search result as one
+      vectorized mask
+
+Pages are ``limit`` students after a cursor (the last student_id of the
+previous page) in data order, so deep pages cost the same as the first.
+Results use the dashboard's ``Student`` JSON shape.
+
+Usage:
+    python src/student_store.py data/students.csv --search "alex" --class A --limit 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+import numpy as np
+
+from aggregates import PERSONAS, rule_personas
+from columnar import is_columnar_path, read_columns
+
+SCORE_FIELDS = ['comprehension', 'attention', 'focus', 'retention', 'assessment_score', 'engagement_time']
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 1000
+
+# Names shorter than this are matched by prefix instead of trigrams
+TRIGRAM_LENGTH = 3
+
+def _trigrams(text):
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+def _categorize(values):
+    """Distinct values and per-row codes of a string column."""
+    categories, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return categories.tolist(), codes.astype(np.uint32 if len(categories) > 65535 else np.uint16)
+
+class StudentStore:
+    """
+    Column-oriented student records with ID, name, class and persona indexes.
+
+    Args:
+        columns (dict): student_id (bytes or str), name and class (strings or
+            codes), and the SCORE_FIELDS arrays
+        categories (dict): Optional category labels for name/class given as codes
+        personas (PersonaModel): Optional persona clusters; without one the
+            dashboard's rule-based personas are used
+    """
+
+    def __init__(self, columns, categories=None, personas=None):
+        categories = categories or {}
+        self.n_rows = len(columns['student_id'])
+        self.ids = np.asarray(columns['student_id']).astype('S')
+        self.scores = {field: np.asarray(columns[field]) for field in SCORE_FIELDS}
+
+        for field in ('name', 'class'):
+            if categories.get(field) is not None:
+                labels, codes = list(categories[field]), np.asarray(columns[field])
+            else:
+                labels, codes = _categorize(columns[field])
+            setattr(self, f'{field}_labels', labels)
+            setattr(self, f'{field}_codes', codes)
+
+        if personas is not None:
+            self.persona_labels = list(personas.labels)
+            self.persona_codes = personas.assign(self.scores)
+        else:
+            self.persona_labels = list(PERSONAS)
+            self.persona_codes = rule_personas(self.scores).astype(np.uint8)
+
+        # ID index: lower-cased IDs in sorted order plus their row numbers
+        lowered = np.char.lower(self.ids)
+        self._id_order = np.argsort(lowered, kind='stable')
+        self._sorted_ids = lowered[self._id_order]
+
+        # Name indexes over distinct names: trigram -> name codes, and sorted names for prefixes
+        self._name_lower = [name.lower() for name in self.name_labels]
+        trigram_index = defaultdict(list)
+        for code, name in enumerate(self._name_lower):
+            for trigram in _trigrams(name):
+                trigram_index[trigram].append(code)
+        self._trigram_index = {trigram: np.asarray(codes, dtype=np.int64) for trigram, codes in trigram_index.items()}
+        self._name_prefix_order = np.argsort(np.asarray(self._name_lower, dtype=object)).astype(np.int64)
+        self._sorted_names = [self._name_lower[code] for code in self._name_prefix_order]
+
+    @classmethod
+    def load(cls, path, personas=None):
+        """
+        Load students from a CSV file or columnar dataset.
+
+        Args:
+            path (str): ``.csv`` file, ``.columns`` directory or ``.parquet`` file
+            personas (PersonaModel): Optional persona clusters
+
+        Returns:
+            StudentStore: The indexed store
+        """
+        fields = ['student_id', 'name', 'class'] + SCORE_FIELDS
+        if is_columnar_path(path):
+            arrays, info = read_columns(path, fields)
+            categories = {field: info['columns'][field]['categories'] for field in ('name', 'class')}
+            return cls(arrays, categories, personas)
+
+        import pandas as pd
+
+        df = pd.read_csv(path, usecols=fields, dtype={'student_id': str, 'name': 'category', 'class': 'category'})
+        columns = {field: df[field].to_numpy() for field in ['student_id'] + SCORE_FIELDS}
+        categories = {}
+        for field in ('name', 'class'):
+            columns[field] = df[field].cat.codes.to_numpy()
+            categories[field] = [str(label) for label in df[field].cat.categories]
+        return cls(columns, categories, personas)
+
+    def find_row(self, student_id):
+        """Row number of ``student_id`` (case-insensitive), or None."""
+        key = student_id.lower().encode()
+        position = np.searchsorted(self._sorted_ids, key)
+        if position < self.n_rows and self._sorted_ids[position] == key:
+            return int(self._id_order[position])
+        return None
+
+    def get(self, student_id):
+        """One student as a ``Student`` dict, or None if the ID is unknown."""
+        row = self.find_row(student_id)
+        return None if row is None else self.records(np.array([row]))[0]
+
+    def _id_prefix_rows(self, prefix):
+        key = prefix.lower().encode()
+        start = np.searchsorted(self._sorted_ids, key, side='left')
+        end = np.searchsorted(self._sorted_ids, key + b'\xff', side='left')
+        return self._id_order[start:end]
+
+    def _matching_names(self, query):
+        """Codes of the distinct names containing ``query`` (or starting with it, for short queries)."""
+        query = query.lower()
+        if len(query) < TRIGRAM_LENGTH:
+            start = np.searchsorted(np.asarray(self._sorted_names, dtype=object), query, side='left')
+            end = start
+            while end < len(self._sorted_names) and self._sorted_names[end].startswith(query):
+                end += 1
+            return self._name_prefix_order[start:end]
+
+        candidates = None
+        for trigram in _trigrams(query):
+            codes = self._trigram_index.get(trigram)
+            if codes is None:
+                return np.empty(0, dtype=np.int64)
+            candidates = codes if candidates is None else np.intersect1d(candidates, codes, assume_unique=True)
+        # Trigrams can match out of order; confirm the substring on the few candidates left
+        return np.asarray([code for code in candidates.tolist() if query in self._name_lower[code]], dtype=np.int64)
+
+    def _filter_mask(self, search=None, class_name=None, persona=None):
+        """Boolean mask of matching rows, or None when nothing is filtered."""
+        mask = None
+        if search:
+            name_match = np.zeros(len(self.name_labels), dtype=bool)
+            name_match[self._matching_names(search)] = True
+            mask = name_match[self.name_codes]
+            mask[self._id_prefix_rows(search)] = True
+        for value, labels, codes in ((class_name, self.class_labels, self.class_codes),
+                                     (persona, self.persona_labels, self.persona_codes)):
+            if value is None:
+                continue
+            matches = codes == labels.index(value) if value in labels else np.zeros(self.n_rows, dtype=bool)
+            mask = matches if mask is None else mask & matches
+        return mask
+
+    def query(self, search=None, class_name=None, persona=None, limit=DEFAULT_PAGE_SIZE, after=None, page=None):
+        """
+        One page of students matching every given filter, in data order.
+
+        Args:
+            search (str): Case-insensitive name substring (prefix below three
+                characters) or student_id prefix
+            class_name (str): Exact class
+            persona (str): Exact persona name
+            limit (int): Page size
+            after (str): Keyset cursor - the last student_id of the previous page
+            page (int): 1-based page number, used when no cursor is given
+
+        Returns:
+            dict: 'students' (Student dicts) and 'pagination' with page,
+            limit, total, totalPages and nextCursor (None on the last page)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        mask = self._filter_mask(search, class_name, persona)
+        rows = np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+        total = len(rows)
+
+        if after is not None:
+            cursor_row = self.find_row(after)
+            if cursor_row is None:
+                raise KeyError(f"Unknown cursor: {after}")
+            start = int(np.searchsorted(rows, cursor_row, side='right'))
+        else:
+            start = (max(1, int(page or 1)) - 1) * limit
+        page_rows = rows[start:start + limit]
+        has_more = start + limit < total
+
+        return {
+            'students': self.records(page_rows),
+            'pagination': {
+                'page': start // limit + 1,
+                'limit': limit,
+                'total': total,
+                'totalPages': -(-total // limit),
+                'nextCursor': self.ids[page_rows[-1]].decode() if has_more and len(page_rows) else None,
+            },
+        }
+
+    def records(self, rows):
+        """Students at the given row numbers as ``Student`` dicts."""
+        names = [self.name_labels[code] for code in self.name_codes[rows].tolist()]
+        classes = [self.class_labels[code] for code in self.class_codes[rows].tolist()]
+        personas = [self.persona_labels[code] for code in self.persona_codes[rows].tolist()]
+        scores = {field: array[rows].tolist() for field, array in self.scores.items()}
+        return [
+            {
+                'student_id': student_id.decode(),
+                'name': names[k],
+                'class': classes[k],
+                **{field: scores[field][k] for field in SCORE_FIELDS},
+                'persona': personas[k],
+            }
+            for k, student_id in enumerate(self.ids[rows].tolist())
+        ]
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Query the indexed student store.")
+    parser.add_argument('data', nargs='?', default='data/students.csv',
+                        help="Student data: CSV, .columns directory or .parquet file (default: data/students.csv)")
+    parser.add_argument('--search', help="Name substring or student_id prefix")
+    parser.add_argument('--class', dest='class_name', help="Only this class")
+    parser.add_argument('--persona', help="Only this persona")
+    parser.add_argument('--limit', type=int, default=DEFAULT_PAGE_SIZE, help=f"Page size (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument('--after', help="Cursor: the last student_id of the previous page")
+    parser.add_argument('--personas', help="Persona model from src/personas.py instead of the rule-based personas")
+    return parser.parse_args(argv)
+
+def main():
+    """Load the store and print one page of results as JSON."""
+    args = parse_args()
+    personas = None
+    if args.personas:
+        from personas import PersonaModel
+
+        personas = PersonaModel.load(args.personas)
+
+    start_time = time.perf_counter()
+    try:
+        store = StudentStore.load(args.data, personas)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Loaded and indexed {store.n_rows:,} students in {time.perf_counter() - start_time:.2f}s", file=sys.stderr)
+
+    start_time = time.perf_counter()
+    try:
+        result = store.query(args.search, args.class_name, args.persona, args.limit, args.after)
+    except KeyError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Query took {(time.perf_counter() - start_time) * 1000:.2f} ms", file=sys.stderr)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Train the assessment score model outside the notebook.
+
+Loads the five cognitive features and the target from CSV (read in chunks)
+or a columnar dataset, runs a cross-validated hyperparameter search for
+RandomForestRegressor (or, with ``--estimator sgd``, a linear SGDRegressor
+baseline) across all cores, refits the best candidate and
+writes ``models/final_model.pkl`` and ``models/model_info.pkl`` in the
+format StudentPerformancePredictor loads. Holdout residuals are stored as
+``model_info['calibration']`` for prediction intervals (see intervals.py),
+and the training rows' feature distributions as ``model_info['drift_reference']``
+for input drift monitoring (see drift.py).
+
+The feature matrix is converted once to float32 (what the trees use
+internally), so no fit copies it again; joblib memory-maps that one copy
+into every worker instead of pickling it per candidate and fold.
+
+Usage:
+    python src/train.py data/students.csv
+    python src/train.py data/students.columns --cv 5 --search-rows 200000 --export-forest
+    python src/train.py data/students.csv --estimator sgd --output-dir models/linear
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from columnar import is_columnar_path, read_columns
+from drift import reference_stats
+from intervals import calibrate
+
+DEFAULT_FEATURES = ['comprehension', 'attention', 'focus', 'retention', 'engagement_time']
+DEFAULT_TARGET = 'assessment_score'
+
+# Centered on the notebook's RandomForestRegressor(n_estimators=100, max_depth=10)
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [100],
+    'max_depth': [8, 10, 14],
+    'min_samples_leaf': [1, 5],
+}
+
+# Online linear baseline; it can later be updated with partial_fit (see update_model.py)
+DEFAULT_SGD_PARAM_GRID = {
+    'sgdregressor__alpha': [1e-5, 1e-4, 1e-3],
+}
+
+ESTIMATORS = {
+    'random_forest': ('RandomForestRegressor', DEFAULT_PARAM_GRID),
+    'sgd': ('SGDRegressor', DEFAULT_SGD_PARAM_GRID),
+}
+
+# Rows per pandas chunk when reading CSV
+CSV_CHUNK_SIZE = 500000
+
+def load_training_data(path, features=DEFAULT_FEATURES, target=DEFAULT_TARGET):
+    """
+    Load the feature matrix and target, reading only the needed columns.
+
+    Args:
+        path (str): CSV file, ``.columns`` directory or ``.parquet`` file
+        features (list): Feature columns in model order
+        target (str): Target column
+
+    Returns:
+        tuple: (X, y) - N x F float32 feature matrix and float64 target
+    """
+    columns = list(features) + [target]
+    if is_columnar_path(path):
+        arrays, _ = read_columns(path, columns)
+        X = np.column_stack([arrays[feature] for feature in features]).astype(np.float32)
+        y = np.asarray(arrays[target], dtype=np.float64)
+    else:
+        import pandas as pd
+
+        # Convert chunk by chunk so the full file never exists as a DataFrame
+        X_parts, y_parts = [], []
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=CSV_CHUNK_SIZE):
+            X_parts.append(chunk[features].to_numpy(dtype=np.float32))
+            y_parts.append(chunk[target].to_numpy(dtype=np.float64))
+        X = np.concatenate(X_parts) if X_parts else np.empty((0, len(features)), dtype=np.float32)
+        y = np.concatenate(y_parts) if y_parts else np.empty(0)
+
+    finite = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    if not finite.all():
+        print(f"Warning: dropping {np.count_nonzero(~finite)} rows with missing or non-finite values")
+        X, y = X[finite], y[finite]
+    return np.ascontiguousarray(X), y
+
+def make_estimator(estimator, seed, n_jobs=1, **params):
+    """
+    Build an unfitted model.
+
+    Args:
+        estimator (str): 'random_forest' or 'sgd' (scaled SGDRegressor pipeline)
+        seed (int): Random state
+        n_jobs (int): Threads used by a forest's fit
+        **params: Parameters passed to set_params
+
+    Returns:
+        The estimator
+    """
+    if estimator == 'sgd':
+        model = make_pipeline(StandardScaler(), SGDRegressor(random_state=seed))
+    else:
+        model = RandomForestRegressor(random_state=seed, n_jobs=n_jobs)
+    return model.set_params(**params)
+
+def search_hyperparameters(X, y, param_grid, cv=5, n_jobs=-1, seed=42, search_rows=None,
+                           estimator='random_forest'):
+    """
+    Cross-validated grid search over the estimator's parameters.
+
+    Candidates and folds run in parallel; each forest is fit single-threaded
+    so the pool is not oversubscribed.
+
+    Args:
+        X (np.ndarray): Training features
+        y (np.ndarray): Training target
+        param_grid (dict): Parameter name -> candidate values
+        cv (int): Number of folds
+        n_jobs (int): Parallel fits, -1 for all cores
+        seed (int): Seed for fold shuffling, subsampling and the forests
+        search_rows (int): Search on a random subset of this many rows
+        estimator (str): Key of ESTIMATORS
+
+    Returns:
+        tuple: (best_params, candidates, search_seconds) where candidates
+        holds params, mean/std R² and fit/score times for every candidate
+    """
+    if search_rows and search_rows < len(X):
+        rows = np.random.default_rng(seed).choice(len(X), search_rows, replace=False)
+        X, y = X[rows], y[rows]
+
+    search = GridSearchCV(
+        make_estimator(estimator, seed),
+        param_grid,
+        scoring='r2',
+        cv=KFold(n_splits=cv, shuffle=True, random_state=seed),
+        n_jobs=n_jobs,
+        pre_dispatch='2*n_jobs',
+        refit=False,
+    )
+    start_time = time.perf_counter()
+    search.fit(X, y)
+    search_seconds = time.perf_counter() - start_time
+
+    results = search.cv_results_
+    candidates = []
+    for i, params in enumerate(results['params']):
+        candidates.append({
+            'params': params,
+            'mean_r2': float(results['mean_test_score'][i]),
+            'std_r2': float(results['std_test_score'][i]),
+            'rank': int(results['rank_test_score'][i]),
+            'mean_fit_seconds': float(results['mean_fit_time'][i]),
+            'std_fit_seconds': float(results['std_fit_time'][i]),
+            'mean_score_seconds': float(results['mean_score_time'][i]),
+        })
+    return search.best_params_, candidates, search_seconds
+
+def evaluate(model, X, y, predictions=None):
+    """MAE, RMSE and R² on held-out data, as reported by the notebook."""
+    if predictions is None:
+        predictions = model.predict(X)
+    return {
+        'mae': float(mean_absolute_error(y, predictions)),
+        'rmse': float(np.sqrt(mean_squared_error(y, predictions))),
+        'r2': float(r2_score(y, predictions)),
+    }
+
+def save_artifact(model, model_info, output_dir, suffix=''):
+    """
+    Atomically write ``final_model{suffix}.pkl`` and ``model_info{suffix}.pkl``.
+
+    Returns:
+        tuple: (model_path, model_info_path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, obj in ((f'final_model{suffix}.pkl', model), (f'model_info{suffix}.pkl', model_info)):
+        path = os.path.join(output_dir, name)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(obj, f)
+        os.replace(path + '.tmp', path)
+        paths.append(path)
+    return tuple(paths)
+
+def train(data_path, output_dir='models', param_grid=None, cv=5, n_jobs=-1, test_size=0.2, seed=42,
+          search_rows=None, features=DEFAULT_FEATURES, target=DEFAULT_TARGET, estimator='random_forest'):
+    """
+    Run the full pipeline and write the model artifacts.
+
+    Args:
+        data_path (str): Training data (CSV, ``.columns`` or ``.parquet``)
+        output_dir (str): Directory for final_model.pkl and model_info.pkl
+        param_grid (dict): Search space; defaults to DEFAULT_PARAM_GRID
+        cv (int): Cross-validation folds
+        n_jobs (int): Parallel jobs, -1 for all cores
+        test_size (float): Fraction held out for the reported performance
+        seed (int): Random seed for splitting, searching and fitting
+        search_rows (int): Optional cap on rows used by the search
+        features (list): Feature columns in model order
+        target (str): Target column
+        estimator (str): Key of ESTIMATORS
+
+    Returns:
+        dict: The model_info that was written
+    """
+    total_start = time.perf_counter()
+    model_type, default_grid = ESTIMATORS[estimator]
+    param_grid = param_grid or default_grid
+
+    start_time = time.perf_counter()
+    X, y = load_training_data(data_path, features, target)
+    load_seconds = time.perf_counter() - start_time
+    print(f"Loaded {len(X):,} rows from {data_path} in {load_seconds:.2f}s")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    n_candidates = int(np.prod([len(values) for values in param_grid.values()]))
+    print(f"Searching {n_candidates} candidates x {cv} folds on {min(len(X_train), search_rows or len(X_train)):,} rows...")
+    best_params, candidates, search_seconds = search_hyperparameters(
+        X_train, y_train, param_grid, cv, n_jobs, seed, search_rows, estimator)
+    for candidate in sorted(candidates, key=lambda c: c['rank']):
+        print(f"  R² {candidate['mean_r2']:.4f} ± {candidate['std_r2']:.4f}  "
+              f"fit {candidate['mean_fit_seconds']:.2f}s  {candidate['params']}")
+    print(f"Best parameters: {best_params} (search took {search_seconds:.2f}s)")
+
+    start_time = time.perf_counter()
+    model = make_estimator(estimator, seed, n_jobs, **best_params)
+    model.fit(X_train, y_train)
+    if estimator == 'random_forest':
+        # Parallelism is a training setting; scoring builds its own batches
+        model.set_params(n_jobs=None)
+    refit_seconds = time.perf_counter() - start_time
+
+    predictions = model.predict(X_test)
+    performance = evaluate(model, X_test, y_test, predictions)
+    print(f"Holdout - MAE: {performance['mae']:.3f}, RMSE: {performance['rmse']:.3f}, R²: {performance['r2']:.3f}")
+    # Holdout residuals were never seen by the fit, so they calibrate the prediction intervals
+    calibration = calibrate(y_test, predictions)
+
+    model_info = {
+        'model': model,
+        'features': list(features),
+        'model_type': model_type,
+        'performance': performance,
+        'calibration': calibration,
+        # What the model was fit on, for monitoring the inputs it is later asked to score
+        'drift_reference': reference_stats(X_train, features),
+        'version': 1,
+        'training': {
+            'data_path': data_path,
+            'target': target,
+            'rows': len(X),
+            'train_rows': len(X_train),
+            'test_rows': len(X_test),
+            'cv_folds': cv,
+            'n_jobs': n_jobs,
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'search_rows': search_rows,
+            'param_grid': param_grid,
+            'best_params': best_params,
+            'candidates': candidates,
+            'timings': {
+                'load_seconds': load_seconds,
+                'search_seconds': search_seconds,
+                'refit_seconds': refit_seconds,
+                'total_seconds': time.perf_counter() - total_start,
+            },
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+        },
+    }
+
+    model_path, model_info_path = save_artifact(model, model_info, output_dir)
+    print(f"Model saved to {model_path}")
+    print(f"Model info saved to {model_info_path}")
+    return model_info
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Train the assessment score model.")
+    parser.add_argument('data', nargs='?', default='data/students.csv',
+                        help="Training data: CSV, .columns directory or .parquet file (default: data/students.csv)")
+    parser.add_argument('--output-dir', default='models', help="Where to write the model files (default: models)")
+    parser.add_argument('--estimator', choices=list(ESTIMATORS), default='random_forest',
+                        help="Model to train; 'sgd' is a scaled linear baseline that update_model.py "
+                             "can update with partial_fit (default: random_forest)")
+    parser.add_argument('--param-grid', type=json.loads,
+                        help='Search space as JSON, e.g. \'{"max_depth": [10, 20], "n_estimators": [100]}\'')
+    parser.add_argument('--cv', type=int, default=5, help="Cross-validation folds (default: 5)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel jobs, -1 for all cores (default: -1)")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Holdout fraction (default: 0.2)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument('--search-rows', type=int,
+                        help="Run the search on a random sample of this many training rows; "
+                             "the final model is still fit on all of them")
+    parser.add_argument('--export-forest', action='store_true',
+                        help="Also export the model to models/final_model.forest for fast loading")
+    args = parser.parse_args(argv)
+    if args.cv < 2:
+        parser.error("--cv must be at least 2")
+    if not 0 < args.test_size < 1:
+        parser.error("--test-size must be between 0 and 1")
+    if args.search_rows is not None and args.search_rows < args.cv:
+        parser.error("--search-rows must be at least --cv")
+    if args.export_forest and args.estimator != 'random_forest':
+        parser.error("--export-forest requires --estimator random_forest")
+    return args
+
+def main():
+    """Train, evaluate and save the model."""
+    args = parse_args()
+    try:
+        train(args.data, args.output_dir, args.param_grid, args.cv, args.n_jobs, args.test_size,
+              args.seed, args.search_rows, estimator=args.estimator)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.export_forest:
+        from forest import FLAT_MODEL_SUFFIX, export_model
+
+        output_path = os.path.join(args.output_dir, f'final_model{FLAT_MODEL_SUFFIX}')
+        forest = export_model(os.path.join(args.output_dir, 'final_model.pkl'), output_path,
+                              os.path.join(args.output_dir, 'model_info.pkl'))
+        print(f"Exported {forest.n_trees} trees to {output_path}")
+
+if __name__ == "__main__":
+    main()
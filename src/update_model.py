@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Fold a new cohort into an existing model without retraining from scratch.
+
+Two update modes, chosen by the type of the loaded model:
+    - RandomForestRegressor: warm-start adds ``--add-trees`` trees fitted on
+      the new data only, then optionally retires the oldest ``--retire-trees``
+      so the forest keeps tracking recent cohorts at a bounded size
+    - SGDRegressor pipeline (``train.py --estimator sgd``): ``partial_fit``
+      passes over the new data; the scaler fitted at training time is kept so
+      earlier coefficients stay meaningful
+
+Only the new data is read and fitted, so an update costs time proportional
+to the new cohort. Part of it is held out to report accuracy before and
+after; ``--eval-data`` adds a second report on an earlier holdout set to
+show how much the update forgets.
+
+Each update writes a new version next to the input, e.g.
+``models/final_model.v2.pkl`` and ``models/model_info.v2.pkl``, which
+StudentPerformancePredictor loads with ``--model``/``--model-info``.
+``--promote`` also replaces ``models/final_model.pkl`` and
+``models/model_info.pkl``.
+
+Usage:
+    python src/update_model.py data/new_cohort.csv --add-trees 20 --retire-trees 20
+    python src/update_model.py data/new_cohort.columns --promote --export-forest
+    python src/update_model.py data/new_cohort.csv --model models/linear/final_model.pkl \\
+        --model-info models/linear/model_info.pkl --epochs 5
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from intervals import calibrate
+from train import DEFAULT_TARGET, evaluate, load_training_data, save_artifact
+
+def load_artifact(model_path, model_info_path):
+    """
+    Load a pickled model and its model info.
+
+    Returns:
+        tuple: (model, model_info)
+    """
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(model_info_path, 'rb') as f:
+        model_info = pickle.load(f)
+    return model, model_info
+
+def update_forest(model, X, y, add_trees, retire_trees=0, seed=42, n_jobs=-1):
+    """
+    Add trees fitted on new data to a fitted forest, retiring the oldest.
+
+    Args:
+        model (RandomForestRegressor): Fitted forest, updated in place
+        X (np.ndarray): New training features
+        y (np.ndarray): New training target
+        add_trees (int): Trees to fit on the new data
+        retire_trees (int): Oldest trees to drop afterwards
+        seed (int): Random state for the new trees
+        n_jobs (int): Parallel tree fits, -1 for all cores
+
+    Returns:
+        RandomForestRegressor: The updated forest
+    """
+    n_trees = len(model.estimators_)
+    if retire_trees >= n_trees + add_trees:
+        raise ValueError(f"Cannot retire {retire_trees} of {n_trees + add_trees} trees")
+
+    # warm_start fits only the trees beyond the existing estimators_
+    model.set_params(warm_start=True, n_estimators=n_trees + add_trees, random_state=seed, n_jobs=n_jobs)
+    model.fit(X, y)
+
+    if retire_trees:
+        model.estimators_ = model.estimators_[retire_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_), n_jobs=None)
+    return model
+
+def update_linear(model, X, y, epochs=1):
+    """
+    Continue training an SGDRegressor pipeline on new data with partial_fit.
+
+    Args:
+        model (Pipeline): Fitted StandardScaler + SGDRegressor pipeline, updated in place
+        X (np.ndarray): New training features
+        y (np.ndarray): New training target
+        epochs (int): Passes over the new data
+
+    Returns:
+        Pipeline: The updated pipeline
+    """
+    # Transform with the original scaler; refitting it would shift every coefficient
+    X_scaled = model[:-1].transform(X)
+    regressor = model[-1]
+    for _ in range(epochs):
+        regressor.partial_fit(X_scaled, y)
+    return model
+
+def update_model(data_path, model_path='models/final_model.pkl', model_info_path='models/model_info.pkl',
+                 output_dir=None, add_trees=20, retire_trees=0, epochs=1, test_size=0.2, seed=42, n_jobs=-1,
+                 eval_data=None, promote=False):
+    """
+    Update a saved model with a new cohort and write the next version.
+
+    Args:
+        data_path (str): New cohort (CSV, ``.columns`` or ``.parquet``)
+        model_path (str): Pickled model to start from
+        model_info_path (str): Its model info pickle
+        output_dir (str): Where to write the new version; defaults to the model's directory
+        add_trees (int): Trees to add (forests)
+        retire_trees (int): Oldest trees to drop (forests)
+        epochs (int): partial_fit passes (linear models)
+        test_size (float): Fraction of the new data held out for the report
+        seed (int): Random seed for the split and the new trees
+        n_jobs (int): Parallel tree fits, -1 for all cores
+        eval_data (str): Optional earlier holdout set, also evaluated before and after
+        promote (bool): Also overwrite final_model.pkl and model_info.pkl
+
+    Returns:
+        tuple: (model_info, paths) - the new model info and the
+        (model_path, model_info_path) of the written version
+    """
+    total_start = time.perf_counter()
+    model, model_info = load_artifact(model_path, model_info_path)
+    features = model_info['features']
+    target = model_info.get('training', {}).get('target', DEFAULT_TARGET)
+    version = model_info.get('version', 1) + 1
+
+    start_time = time.perf_counter()
+    X, y = load_training_data(data_path, features, target)
+    load_seconds = time.perf_counter() - start_time
+    print(f"Loaded {len(X):,} new rows from {data_path} in {load_seconds:.2f}s")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    evaluation_sets = {'new_holdout': (X_test, y_test)}
+    if eval_data:
+        evaluation_sets['eval_data'] = load_training_data(eval_data, features, target)
+    before = {name: evaluate(model, *data) for name, data in evaluation_sets.items()}
+    n_trees_before = len(model.estimators_) if hasattr(model, 'estimators_') else None
+
+    start_time = time.perf_counter()
+    if hasattr(model, 'estimators_'):
+        # A fresh stream per version, so new trees never reuse earlier trees' seeds
+        tree_seed = int(np.random.SeedSequence([seed, version]).generate_state(1)[0])
+        update_forest(model, X_train, y_train, add_trees, retire_trees, tree_seed, n_jobs)
+        mode = 'warm_start'
+        print(f"Added {add_trees} trees, retired {retire_trees}: {n_trees_before} -> {len(model.estimators_)} trees")
+    elif hasattr(model, '__getitem__') and hasattr(model[-1], 'partial_fit'):
+        update_linear(model, X_train, y_train, epochs)
+        mode = 'partial_fit'
+        print(f"Ran {epochs} partial_fit pass(es) over {len(X_train):,} rows")
+    else:
+        raise ValueError(f"{model_info['model_type']} supports neither warm_start trees nor partial_fit")
+    update_seconds = time.perf_counter() - start_time
+
+    after = {name: evaluate(model, *data) for name, data in evaluation_sets.items()}
+    # Intervals must describe the updated model, so recalibrate on the new holdout
+    calibration = calibrate(y_test, model.predict(X_test))
+    for name in evaluation_sets:
+        print(f"{name:<12} before - MAE: {before[name]['mae']:.3f}, R²: {before[name]['r2']:.3f}   "
+              f"after - MAE: {after[name]['mae']:.3f}, R²: {after[name]['r2']:.3f}")
+
+    new_info = dict(model_info)
+    new_info.update({
+        'model': model,
+        'performance': after['new_holdout'],
+        'calibration': calibration,
+        'version': version,
+        'parent': {'version': version - 1, 'model_path': model_path},
+    })
+    new_info['updates'] = list(model_info.get('updates', [])) + [{
+        'version': version,
+        'mode': mode,
+        'data_path': data_path,
+        'rows': len(X),
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'eval_data': eval_data,
+        'add_trees': add_trees if mode == 'warm_start' else None,
+        'retire_trees': retire_trees if mode == 'warm_start' else None,
+        'n_trees': len(model.estimators_) if mode == 'warm_start' else None,
+        'epochs': epochs if mode == 'partial_fit' else None,
+        'performance_before': before,
+        'performance_after': after,
+        'timings': {
+            'load_seconds': load_seconds,
+            'update_seconds': update_seconds,
+            'total_seconds': time.perf_counter() - total_start,
+        },
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }]
+
+    output_dir = output_dir or os.path.dirname(model_path) or '.'
+    new_model_path, new_info_path = save_artifact(model, new_info, output_dir, suffix=f'.v{version}')
+    print(f"Version {version} saved to {new_model_path} and {new_info_path}")
+    if promote:
+        new_model_path, new_info_path = save_artifact(model, new_info, output_dir)
+        print(f"Promoted version {version} to {new_model_path}")
+    return new_info, (new_model_path, new_info_path)
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Update a trained model with a new cohort.")
+    parser.add_argument('data', help="New cohort: CSV, .columns directory or .parquet file")
+    parser.add_argument('--model', default='models/final_model.pkl', help="Pickled model to update")
+    parser.add_argument('--model-info', default='models/model_info.pkl', help="Model info pickle")
+    parser.add_argument('--output-dir', help="Where to write the new version (default: the model's directory)")
+    parser.add_argument('--add-trees', type=int, default=20, help="Trees fitted on the new data (default: 20)")
+    parser.add_argument('--retire-trees', type=int, default=0,
+                        help="Drop this many of the oldest trees after adding (default: 0)")
+    parser.add_argument('--epochs', type=int, default=1, help="partial_fit passes for linear models (default: 1)")
+    parser.add_argument('--test-size', type=float, default=0.2,
+                        help="Fraction of the new data held out for the before/after report (default: 0.2)")
+    parser.add_argument('--eval-data', help="Earlier holdout data to also evaluate before and after")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel tree fits, -1 for all cores (default: -1)")
+    parser.add_argument('--promote', action='store_true',
+                        help="Also replace final_model.pkl and model_info.pkl with the new version")
+    parser.add_argument('--export-forest', action='store_true',
+                        help="Also export the new version to a .forest directory for fast loading")
+    args = parser.parse_args(argv)
+    if args.add_trees < 0 or args.retire_trees < 0 or args.epochs < 1:
+        parser.error("--add-trees and --retire-trees must not be negative and --epochs must be at least 1")
+    if not 0 < args.test_size < 1:
+        parser.error("--test-size must be between 0 and 1")
+    return args
+
+def main():
+    """Update the model, report accuracy and save the new version."""
+    args = parse_args()
+    try:
+        _, (model_path, model_info_path) = update_model(args.data, args.model, args.model_info, args.output_dir, args.add_trees,
+                                  args.retire_trees, args.epochs, args.test_size, args.seed, args.n_jobs,
+                                  args.eval_data, args.promote)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.export_forest:
+        from forest import FLAT_MODEL_SUFFIX, export_model
+
+        output_path = os.path.splitext(model_path)[0] + FLAT_MODEL_SUFFIX
+        forest = export_model(model_path, output_path, model_info_path)
+        print(f"Exported {forest.n_trees} trees to {output_path}")
+
+if __name__ == "__main__":
+    main()